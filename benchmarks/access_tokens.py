@@ -0,0 +1,51 @@
+"""
+Benchmark LTI 1.3 access token issuing and checking, with signed JWTs and with reference tokens.
+
+Usage:
+
+    python benchmarks/access_tokens.py
+"""
+from utils import report, setup_django
+
+setup_django()
+
+# pylint: disable=wrong-import-position
+from Cryptodome.PublicKey import RSA  # noqa: E402
+from django.test import override_settings  # noqa: E402
+
+from lti_consumer.lti_1p3.consumer import LtiConsumer1p3  # noqa: E402
+
+SCOPES = 'https://purl.imsglobal.org/spec/lti-ags/scope/score'
+CLAIMS = {'sub': '1', 'iss': 'https://platform.example', 'scopes': SCOPES}
+
+
+def main():
+    """
+    Time minting and checking access tokens in both modes.
+    """
+    consumer = LtiConsumer1p3(
+        iss='https://platform.example',
+        lti_oidc_url='https://tool.example/oidc',
+        lti_launch_url='https://tool.example/launch',
+        client_id='1',
+        deployment_id='1',
+        rsa_key=RSA.generate(2048).export_key('PEM'),
+        rsa_key_id='1',
+        redirect_uris=['https://tool.example/launch'],
+    )
+
+    # pylint: disable=protected-access
+    jwt_token = consumer._mint_access_token(CLAIMS, expiration=3600)
+    report('JWT: mint', lambda: consumer._mint_access_token(CLAIMS, expiration=3600), 200)
+    with override_settings(LTI_1P3_VERIFIED_TOKEN_CACHE_MAX_TTL=0):
+        report('JWT: check (RSA verification)', lambda: consumer.check_token(jwt_token, [SCOPES]), 200)
+    report('JWT: check (verified token cache)', lambda: consumer.check_token(jwt_token, [SCOPES]), 2000)
+
+    with override_settings(LTI_1P3_REFERENCE_ACCESS_TOKENS_ENABLED=True):
+        reference_token = consumer._mint_access_token(CLAIMS, expiration=3600)
+        report('Reference token: mint', lambda: consumer._mint_access_token(CLAIMS, expiration=3600), 2000)
+        report('Reference token: check', lambda: consumer.check_token(reference_token, [SCOPES]), 2000)
+
+
+if __name__ == '__main__':
+    main()
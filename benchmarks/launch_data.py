@@ -0,0 +1,82 @@
+"""
+Benchmark the size and speed of the compact encoding of LTI 1.3 launch data against pickling the attrs instances.
+
+Launch data is written to the Django cache, which pickles it, so both are measured as pickles.
+
+Usage:
+
+    python benchmarks/launch_data.py
+"""
+import pickle
+
+from utils import report, setup_django
+
+setup_django()
+
+# pylint: disable=wrong-import-position
+from lti_consumer.data import Lti1p3LaunchData, Lti1p3ProctoringLaunchData  # noqa: E402
+
+LAUNCH_DATA = {
+    'minimal': Lti1p3LaunchData(
+        user_id='1',
+        user_role='student',
+        config_id='6c440bf4-face-beef-face-e8bcfb1e53bd',
+        resource_link_id='block-v1:edX+DemoX+Demo_Course+type@lti_consumer+block@1',
+    ),
+    'student view': Lti1p3LaunchData(
+        user_id='1',
+        user_role='student',
+        config_id='6c440bf4-face-beef-face-e8bcfb1e53bd',
+        resource_link_id='block-v1:edX+DemoX+Demo_Course+type@lti_consumer+block@1',
+        external_user_id='0fc0d45c-1d2c-4c5e-a1b1-0f1e43c9c8ba',
+        preferred_username='learner',
+        name='Learner Name',
+        email='learner@example.com',
+        launch_presentation_document_target='iframe',
+        context_id='course-v1:edX+DemoX+Demo_Course',
+        context_type=['course_offering'],
+        context_title='Demo Course - edX',
+        context_label='course-v1:edX+DemoX+Demo_Course',
+        custom_parameters={'course_name': 'Demo Course'},
+    ),
+    'proctoring': Lti1p3LaunchData(
+        user_id='1',
+        user_role='student',
+        config_id='6c440bf4-face-beef-face-e8bcfb1e53bd',
+        resource_link_id='block-v1:edX+DemoX+Demo_Course+type@sequential+block@exam',
+        message_type='LtiStartProctoring',
+        proctoring_launch_data=Lti1p3ProctoringLaunchData(
+            attempt_number=1,
+            start_assessment_url='https://lms.example/api/lti_consumer/v1/start_proctoring_assessment',
+            assessment_control_url='https://lms.example/api/lti_consumer/v1/assessment_control',
+            assessment_control_actions=['pause', 'terminate'],
+        ),
+    ),
+}
+
+
+def main():
+    """
+    Print the pickled size of each encoding, and time encoding and decoding them.
+    """
+    for name, launch_data in LAUNCH_DATA.items():
+        pickled = pickle.dumps(launch_data)
+        pickled_compact = pickle.dumps(launch_data.to_compact())
+        print(f'{name}: pickle {len(pickled)} bytes, compact {len(pickled_compact)} bytes')
+
+        report(f'{name}: pickle dumps', lambda launch_data=launch_data: pickle.dumps(launch_data), 10000)
+        report(
+            f'{name}: compact dumps',
+            lambda launch_data=launch_data: pickle.dumps(launch_data.to_compact()),
+            10000,
+        )
+        report(f'{name}: pickle loads', lambda pickled=pickled: pickle.loads(pickled), 10000)
+        report(
+            f'{name}: compact loads',
+            lambda pickled_compact=pickled_compact: Lti1p3LaunchData.from_compact(pickle.loads(pickled_compact)),
+            10000,
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Benchmark signing and verifying LTI 1.3 platform JWTs with each supported signing algorithm.
+
+Usage:
+
+    python benchmarks/signing_algorithms.py
+"""
+from utils import report, setup_django
+
+setup_django()
+
+# pylint: disable=wrong-import-position
+from lti_consumer.lti_1p3.constants import LTI_1P3_SIGNING_ALGORITHMS  # noqa: E402
+from lti_consumer.lti_1p3.key_handlers import PlatformKeyHandler  # noqa: E402
+from lti_consumer.models import generate_lti_1p3_private_key  # noqa: E402
+
+MESSAGE = {
+    'iss': 'https://platform.example',
+    'sub': '1',
+    'scopes': 'https://purl.imsglobal.org/spec/lti-ags/scope/score',
+}
+
+
+def main():
+    """
+    Time key generation, signing and verification for every signing algorithm.
+    """
+    for algorithm in LTI_1P3_SIGNING_ALGORITHMS:
+        key_pem = generate_lti_1p3_private_key(algorithm)
+        key_handler = PlatformKeyHandler(key_pem=key_pem, kid='1', algorithm=algorithm)
+        token = key_handler.encode_and_sign(MESSAGE, expiration=3600)
+
+        report(f'{algorithm}: generate key', lambda algorithm=algorithm: generate_lti_1p3_private_key(algorithm), 5)
+        report(
+            f'{algorithm}: sign',
+            lambda key_handler=key_handler: key_handler.encode_and_sign(MESSAGE, expiration=3600),
+            200,
+        )
+        report(
+            f'{algorithm}: verify',
+            lambda key_handler=key_handler, token=token: key_handler.validate_and_decode(token),
+            200,
+        )
+        print(f'{algorithm}: token size {len(token)} bytes')
+
+
+if __name__ == '__main__':
+    main()
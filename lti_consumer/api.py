@@ -5,12 +5,16 @@ Some methods are meant to be used inside the XBlock, so they
 return plaintext to allow easy testing/mocking.
 """
 
+import hashlib
 import json
 import logging
+from collections import defaultdict
 
+from edx_django_utils.cache import TieredCache
 from opaque_keys.edx.keys import CourseKey
 
 from lti_consumer.lti_1p3.constants import LTI_1P3_ROLE_MAP
+from lti_consumer.lti_1p3.consumer_cache import consumer_template_cache
 
 from .filters import get_external_config_from_filter
 from .models import CourseAllowPIISharingInLTIFlag, Lti1p3Passport, LtiConfiguration, LtiDlContentItem
@@ -129,44 +133,79 @@ def _get_config_by_config_id(config_id):
     return LtiConfiguration.objects.get(config_id=config_id)
 
 
-def _get_lti_config_for_block(block):
+def _get_block_lti_version_and_config_store(block):
     """
-    Retrieves or creates a LTI Configuration for a block.
-
-    This wraps around `_get_or_create_local_lti_config` and handles the block and modulestore
-    bits of configuration.
+    Returns the LTI version and config store used by a block's LTI Configuration.
     """
     if block.config_type == 'database':
-        lti_config = _get_or_create_local_lti_config(
-            block.lti_version,
-            block,
-            LtiConfiguration.CONFIG_ON_DB,
-        )
-    elif block.config_type == 'external':
+        return block.lti_version, LtiConfiguration.CONFIG_ON_DB
+    if block.config_type == 'external':
         config = get_external_config_from_filter(
             {"course_key": block.scope_ids.usage_id.context_key},
             block.external_config
         )
-        lti_config = _get_or_create_local_lti_config(
-            config.get("version"),
-            block,
-            LtiConfiguration.CONFIG_EXTERNAL,
-        )
-    else:
-        lti_config = _get_or_create_local_lti_config(
-            block.lti_version,
-            block,
-            LtiConfiguration.CONFIG_ON_XBLOCK,
-        )
-    return lti_config
+        return config.get("version"), LtiConfiguration.CONFIG_EXTERNAL
+    return block.lti_version, LtiConfiguration.CONFIG_ON_XBLOCK
+
+
+def _get_lti_config_for_block(block):
+    """
+    Retrieves or creates a LTI Configuration for a block.
+
+    This wraps around `_get_or_create_local_lti_config` and handles the block and modulestore
+    bits of configuration.
+    """
+    lti_version, config_store = _get_block_lti_version_and_config_store(block)
+    return _get_or_create_local_lti_config(lti_version, block, config_store)
+
+
+def _get_block_config_fingerprint(block, lti_version, config_store):
+    """
+    Returns a digest of the block field values `_get_or_create_local_lti_config` reconciles.
+    """
+    values = [
+        block.scope_ids.usage_id,
+        config_store,
+        lti_version or block.lti_version,
+        block.external_config,
+        block.lti_1p3_passport_id,
+        block.lti_1p3_tool_key_mode,
+        block.lti_1p3_tool_public_key,
+        block.lti_1p3_tool_keyset_url,
+    ]
+    return hashlib.sha256(json.dumps([str(value) for value in values]).encode('utf-8')).hexdigest()
 
 
 def config_id_for_block(block):
     """
     Returns the externally facing config_id of the LTI Configuration used by this block,
     creating one if required. That ID is suitable for use in launch data or get_consumer.
+
+    The config_id of a block is cached along with a digest of its field values and
+    the version stamp of its configuration, so unchanged blocks resolve without
+    database queries. Configurations are only reconciled with the block when either
+    changes.
     """
-    config = _get_lti_config_for_block(block)
+    lti_version, config_store = _get_block_lti_version_and_config_store(block)
+    fingerprint = _get_block_config_fingerprint(block, lti_version, config_store)
+    cache_key = get_cache_key(app="lti", key="block_config", location=str(block.scope_ids.usage_id))
+
+    cached = get_data_from_cache(cache_key)
+    if cached and cached['fingerprint'] == fingerprint:
+        if cached['version_stamp'] == consumer_template_cache.get_version_stamp(cached['config_id']):
+            return cached['config_id']
+
+    config = _get_or_create_local_lti_config(lti_version, block, config_store)
+    TieredCache.set_all_tiers(
+        cache_key,
+        {
+            # The passport may have been split from a shared one, which changes the block's fields.
+            'fingerprint': _get_block_config_fingerprint(block, lti_version, config_store),
+            'version_stamp': consumer_template_cache.get_version_stamp(config.config_id),
+            'config_id': config.config_id,
+        },
+        django_cache_timeout=consumer_template_cache.ttl,
+    )
     return config.config_id
 
 
@@ -238,17 +277,10 @@ def get_lti_1p3_launch_info(
     }
 
 
-def get_lti_1p3_launch_start_url(
-    launch_data,
-    deep_link_launch=False,
-    dl_content_id=None,
-):
+def _prepare_lti_1p3_launch_start_url(lti_consumer, launch_data, deep_link_launch=False, dl_content_id=None):
     """
-    Computes and retrieves the LTI URL that starts the OIDC flow.
+    Sets the message hint of the launch_data and returns the LTI URL that starts the OIDC flow.
     """
-    # Retrieve LTI consumer
-    lti_consumer = get_lti_consumer(launch_data.config_id)
-
     # Include a message hint in the launch_data depending on LTI launch type
     # Case 1: Performs Deep Linking configuration flow. Triggered by staff users to
     # configure tool options and select content to be presented.
@@ -263,6 +295,39 @@ def get_lti_1p3_launch_start_url(
     return lti_consumer.prepare_preflight_url(launch_data)
 
 
+def get_lti_1p3_launch_start_url(
+    launch_data,
+    deep_link_launch=False,
+    dl_content_id=None,
+):
+    """
+    Computes and retrieves the LTI URL that starts the OIDC flow.
+    """
+    # Retrieve LTI consumer
+    lti_consumer = get_lti_consumer(launch_data.config_id)
+
+    return _prepare_lti_1p3_launch_start_url(lti_consumer, launch_data, deep_link_launch, dl_content_id)
+
+
+def _get_lti_1p3_content_url(lti_config, lti_consumer, content_items, launch_data):
+    """
+    Returns the URL the LTI consumer should launch to, given the configuration's LTI DL content items.
+
+    Same as `get_lti_1p3_content_url`, for a configuration, consumer and content items already fetched.
+    """
+    # If there's no content items, return normal LTI launch URL
+    if not content_items:
+        return _prepare_lti_1p3_launch_start_url(lti_consumer, launch_data)
+
+    # If there's a single `ltiResourceLink` content, return the launch
+    # url for that specific deep link
+    if len(content_items) == 1 and content_items[0].content_type == LtiDlContentItem.LTI_RESOURCE_LINK:
+        return _prepare_lti_1p3_launch_start_url(lti_consumer, launch_data, dl_content_id=content_items[0].id)
+
+    # If there's more than one content item, return content presentation URL
+    return get_lti_deeplinking_content_url(lti_config.id, launch_data)
+
+
 def get_lti_1p3_content_url(
     launch_data,
 ):
@@ -298,6 +363,54 @@ def get_lti_1p3_content_url(
     return get_lti_deeplinking_content_url(lti_config.id, launch_data)
 
 
+def get_lti_1p3_content_urls(launch_data_list):
+    """
+    Computes and returns which URL the LTI consumer should launch to for many launches at once.
+
+    Bulk version of `get_lti_1p3_content_url` meant for pages showing many LTI blocks
+    (e.g. units or library collections), with the launch data of each block from
+    `LtiConsumerXBlock.get_lti_1p3_launch_data`. Configurations, passports and LTI DL
+    content items are fetched with a constant number of queries, and each configuration's
+    consumer is built once.
+
+    Returns the URLs in the same order as `launch_data_list`. Raises
+    `LtiConfiguration.DoesNotExist` if a configuration doesn't exist.
+    """
+    config_ids = {str(launch_data.config_id) for launch_data in launch_data_list}
+    if not config_ids:
+        return []
+
+    lti_configs = {
+        str(lti_config.config_id): lti_config
+        for lti_config in LtiConfiguration.objects.filter(config_id__in=config_ids).select_related('lti_1p3_passport')
+    }
+    missing_config_ids = config_ids - set(lti_configs)
+    if missing_config_ids:
+        raise LtiConfiguration.DoesNotExist(f"LTI configurations not found: {', '.join(sorted(missing_config_ids))}")
+
+    content_items = defaultdict(list)
+    for content_item in LtiDlContentItem.objects.filter(
+        lti_configuration__in=lti_configs.values(),
+    ).only('id', 'content_type', 'lti_configuration_id').order_by('id'):
+        content_items[content_item.lti_configuration_id].append(content_item)
+
+    lti_consumers = {}
+    urls = []
+    for launch_data in launch_data_list:
+        lti_config = lti_configs[str(launch_data.config_id)]
+        config_content_items = content_items[lti_config.id]
+
+        lti_consumer = None
+        if len(config_content_items) <= 1:
+            if lti_config.id not in lti_consumers:
+                lti_consumers[lti_config.id] = lti_config.get_lti_consumer()
+            lti_consumer = lti_consumers[lti_config.id]
+
+        urls.append(_get_lti_1p3_content_url(lti_config, lti_consumer, config_content_items, launch_data))
+
+    return urls
+
+
 def get_deep_linking_data(deep_linking_id, config_id):
     """
     Retrieves deep linking attributes.
@@ -3,10 +3,87 @@ This modules provides public data structures to represent LTI 1.3 launch data th
 by users of this library.
 """
 
-from attrs import define, field, validators
+from attrs import NOTHING, asdict, define, field, fields_dict, frozen, validators
 
 from lti_consumer.lti_1p3.constants import LTI_PROCTORING_ASSESSMENT_CONTROL_ACTIONS
 
+# Version of the compact encoding of launch data, see Lti1p3LaunchData.to_compact. Never reorder the fields of
+# an existing version: add a new version with its own field order, and keep decoding the previous ones for
+# launches started before a deploy.
+LAUNCH_DATA_COMPACT_VERSION = 1
+
+# Field order of the compact encodings, most commonly set fields first so trailing defaults can be dropped.
+_LAUNCH_DATA_COMPACT_FIELDS = {
+    1: (
+        'user_id',
+        'user_role',
+        'config_id',
+        'resource_link_id',
+        'external_user_id',
+        'context_id',
+        'context_type',
+        'context_title',
+        'context_label',
+        'launch_presentation_document_target',
+        'custom_parameters',
+        'preferred_username',
+        'name',
+        'email',
+        'launch_presentation_return_url',
+        'message_type',
+        'deep_linking_content_item_id',
+        'proctoring_launch_data',
+    ),
+}
+_PROCTORING_LAUNCH_DATA_COMPACT_FIELDS = {
+    1: (
+        'attempt_number',
+        'start_assessment_url',
+        'assessment_control_url',
+        'assessment_control_actions',
+    ),
+}
+
+
+def _to_compact_values(instance, field_names, convert=None):
+    """
+    Return the values of `field_names` on an attrs instance, with defaults replaced by None and trailing Nones dropped.
+    """
+    attributes = fields_dict(type(instance))
+    values = []
+    for name in field_names:
+        value = getattr(instance, name)
+        if value == attributes[name].default:
+            value = None
+        elif convert and name in convert:
+            value = convert[name](value)
+        values.append(value)
+
+    while values and values[-1] is None:
+        values.pop()
+    return values
+
+
+def _from_compact_values(cls, field_names, values, convert=None):
+    """
+    Return an instance of an attrs class from values returned by `_to_compact_values`.
+
+    None stands for the default value of fields that have one. Required fields may be None themselves (e.g.
+    user_role), so they are always passed, as None if they were dropped.
+    """
+    if len(values) > len(field_names):
+        raise ValueError(f"Too many values to decode a compact {cls.__name__}.")
+
+    attributes = fields_dict(cls)
+    kwargs = {}
+    for index, name in enumerate(field_names):
+        value = values[index] if index < len(values) else None
+        if value is not None:
+            kwargs[name] = convert[name](value) if convert and name in convert else value
+        elif attributes[name].default is NOTHING:
+            kwargs[name] = None
+    return cls(**kwargs)
+
 
 @define
 class Lti1p3ProctoringLaunchData:
@@ -40,6 +117,20 @@ class Lti1p3ProctoringLaunchData:
         )],
     )
 
+    def to_compact(self, version=LAUNCH_DATA_COMPACT_VERSION):
+        """
+        Return the values of this instance in the field order of a compact encoding version, see
+        Lti1p3LaunchData.to_compact.
+        """
+        return _to_compact_values(self, _PROCTORING_LAUNCH_DATA_COMPACT_FIELDS[version])
+
+    @classmethod
+    def from_compact(cls, values, version=LAUNCH_DATA_COMPACT_VERSION):
+        """
+        Return an instance from values returned by `to_compact`.
+        """
+        return _from_compact_values(cls, _PROCTORING_LAUNCH_DATA_COMPACT_FIELDS[version], values)
+
 
 @define
 class Lti1p3LaunchData:
@@ -107,3 +198,95 @@ class Lti1p3LaunchData:
         validator=validators.optional((validators.instance_of(Lti1p3ProctoringLaunchData))),
     )
     custom_parameters = field(default={})
+
+    def to_compact(self):
+        """
+        Return a compact, schema versioned encoding of this instance, made of builtin types only.
+
+        The encoding is a list starting with LAUNCH_DATA_COMPACT_VERSION, followed by the field values in the order
+        of that version. Values equal to their default are encoded as None, and trailing ones are dropped. Unlike
+        pickles, it doesn't depend on the layout of the class, so launches started before a deploy changing the
+        fields still work, and it can be serialized to JSON. The config_id is encoded as a string.
+        """
+        version = LAUNCH_DATA_COMPACT_VERSION
+        return [version, *_to_compact_values(self, _LAUNCH_DATA_COMPACT_FIELDS[version], convert={
+            'config_id': str,
+            'proctoring_launch_data': lambda value: value.to_compact(version),
+        })]
+
+    @classmethod
+    def from_compact(cls, data):
+        """
+        Return an instance from an encoding returned by `to_compact`, in any supported version.
+
+        Fields encoded as None get their default value. Raises ValueError if the encoding is invalid.
+        """
+        if not data or data[0] not in _LAUNCH_DATA_COMPACT_FIELDS:
+            raise ValueError("Unsupported compact Lti1p3LaunchData version.")
+
+        version = data[0]
+        return _from_compact_values(cls, _LAUNCH_DATA_COMPACT_FIELDS[version], data[1:], convert={
+            'proctoring_launch_data': lambda value: Lti1p3ProctoringLaunchData.from_compact(value, version),
+        })
+
+
+# Version of the dict encoding of resolved configurations, see Lti1p3ResolvedConfiguration.to_dict. Bump it when a
+# field is renamed or its values change meaning; fields added with a default don't need a new version.
+RESOLVED_CONFIG_DICT_VERSION = 1
+
+
+@frozen
+class Lti1p3ResolvedConfiguration:
+    """
+    The Lti1p3ResolvedConfiguration class is a snapshot of the LTI 1.3 settings of an LtiConfiguration, read in one
+    pass from wherever the configuration is stored (XBlock fields, the LtiConfiguration itself or an external
+    configuration), so setting up a consumer doesn't load the block or call the external configuration filter once
+    per setting. It doesn't hold any private key.
+
+    * lti_1p3_oidc_url: The tool's OIDC login initiation URL.
+    * lti_1p3_launch_url: The launch URL (target_link_uri) of the tool.
+    * lti_1p3_redirect_uris: The redirect URIs the tool may use, already defaulted to the launch URLs if none are set.
+    * lti_1p3_tool_public_key: The tool's public key.
+    * lti_1p3_tool_keyset_url: The tool's JWKS URL.
+    * lti_advantage_ags_mode: The LTI Advantage Assignment and Grade Services mode.
+    * lti_advantage_deep_linking_enabled: Whether LTI Advantage Deep Linking is enabled.
+    * lti_advantage_deep_linking_launch_url: The LTI Advantage Deep Linking launch URL.
+    * lti_advantage_enable_nrps: Whether LTI Advantage Names and Role Provisioning Services is enabled.
+    * lineitem_defaults (optional): Values of the line item created for the declarative AGS mode, read from the block.
+        It is None if the block wasn't loaded to resolve the configuration.
+    """
+    lti_1p3_oidc_url = field()
+    lti_1p3_launch_url = field()
+    lti_1p3_redirect_uris = field()
+    lti_1p3_tool_public_key = field()
+    lti_1p3_tool_keyset_url = field()
+    lti_advantage_ags_mode = field()
+    lti_advantage_deep_linking_enabled = field()
+    lti_advantage_deep_linking_launch_url = field()
+    lti_advantage_enable_nrps = field()
+    lineitem_defaults = field(default=None)
+
+    def to_dict(self):
+        """
+        Return a schema versioned encoding of this instance as a dict of its field values.
+
+        Unlike pickles of the instance, it doesn't depend on the layout of the class, so it can be shared by processes
+        running different releases during a deploy. Values are kept as is: lineitem_defaults holds datetimes, so the
+        dict isn't JSON serializable.
+        """
+        return {'version': RESOLVED_CONFIG_DICT_VERSION, **asdict(self, recurse=False)}
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Return an instance from an encoding returned by `to_dict`.
+
+        Unknown keys are ignored. Raises ValueError if the encoding has another version or misses a required field.
+        """
+        if not isinstance(data, dict) or data.get('version') != RESOLVED_CONFIG_DICT_VERSION:
+            raise ValueError("Unsupported Lti1p3ResolvedConfiguration encoding version.")
+
+        try:
+            return cls(**{name: data[name] for name in fields_dict(cls) if name in data})
+        except TypeError as exc:
+            raise ValueError(f"Invalid Lti1p3ResolvedConfiguration encoding: {exc}") from exc
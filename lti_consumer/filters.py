@@ -1,10 +1,34 @@
 """
 Module that contains the openedx filters for this XBlock
 """
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from typing import Dict
 
+from django.conf import settings
+from edx_django_utils.cache import TieredCache, get_cache_key
 from openedx_filters.tooling import OpenEdxPublicFilter
 
+# Number of seconds the configurations returned by the LTIConfigurationListed
+# filter are reused. Setting it to 0 disables the cache.
+# Can be overridden with the LTI_EXTERNAL_CONFIG_CACHE_TTL setting.
+DEFAULT_EXTERNAL_CONFIG_CACHE_TTL = 60
+
+# Number of seconds an empty filter result (unknown config_id) is reused, kept
+# short so newly created configurations show up quickly.
+# Can be overridden with the LTI_EXTERNAL_CONFIG_CACHE_NEGATIVE_TTL setting.
+DEFAULT_EXTERNAL_CONFIG_CACHE_NEGATIVE_TTL = 10
+
+# Maximum number of filter results kept in the process cache, least recently
+# used entries are evicted first.
+# Can be overridden with the LTI_EXTERNAL_CONFIG_CACHE_MAX_ENTRIES setting.
+DEFAULT_EXTERNAL_CONFIG_CACHE_MAX_ENTRIES = 1024
+
+_MISSING = object()
+
 
 class LTIConfigurationListed(OpenEdxPublicFilter):
     """
@@ -28,13 +52,172 @@ class LTIConfigurationListed(OpenEdxPublicFilter):
         return data.get("context"), data.get("config_id"), data.get("configurations")
 
 
+class ExternalConfigCache:
+    """
+    Cache of LTIConfigurationListed filter results keyed by context and config_id.
+
+    Results hold key material (LTI 1.3 private keys, LTI 1.1 secrets), so they are
+    only kept in the memory of the process that ran the filter, never in the Django
+    cache. Empty results are cached too, for a shorter time. Concurrent misses for
+    the same key in a process wait for a single filter run instead of all running
+    the pipeline. Every key includes a version stamp of its config_id and a global
+    one, stored in the Django cache, so `invalidate` drops results for every
+    context in every process at once.
+    """
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'LTI_EXTERNAL_CONFIG_CACHE_TTL', DEFAULT_EXTERNAL_CONFIG_CACHE_TTL)
+
+    @property
+    def negative_ttl(self):
+        return getattr(
+            settings, 'LTI_EXTERNAL_CONFIG_CACHE_NEGATIVE_TTL', DEFAULT_EXTERNAL_CONFIG_CACHE_NEGATIVE_TTL,
+        )
+
+    @property
+    def max_entries(self):
+        return getattr(
+            settings, 'LTI_EXTERNAL_CONFIG_CACHE_MAX_ENTRIES', DEFAULT_EXTERNAL_CONFIG_CACHE_MAX_ENTRIES,
+        )
+
+    @staticmethod
+    def _get_version_cache_key(config_id):
+        return get_cache_key(app="lti", key="external_config_version", config_id=config_id)
+
+    def _get_version_stamp(self, config_id):
+        """
+        Return the current version stamp of a configuration (None for the global one), creating it if needed.
+        """
+        cache_key = self._get_version_cache_key(config_id)
+        cached = TieredCache.get_cached_response(cache_key)
+        if cached.is_found:
+            return cached.value
+
+        version_stamp = uuid.uuid4().hex
+        # Stamps must outlive the results keyed by them.
+        TieredCache.set_all_tiers(cache_key, version_stamp, django_cache_timeout=self.ttl * 2)
+        return version_stamp
+
+    def _get_cache_key(self, context, config_id):
+        return get_cache_key(
+            app="lti",
+            key="external_config",
+            context=sorted((str(key), str(value)) for key, value in (context or {}).items()),
+            config_id=config_id,
+            version=self._get_version_stamp(config_id),
+            global_version=self._get_version_stamp(None),
+        )
+
+    def invalidate(self, config_id=None):
+        """
+        Drop the cached results of a configuration, or of every configuration if no config_id is given.
+
+        Results listing all configurations (empty config_id) are dropped in both cases.
+        """
+        if config_id is None:
+            TieredCache.delete_all_tiers(self._get_version_cache_key(None))
+            return
+        TieredCache.delete_all_tiers(self._get_version_cache_key(config_id))
+        TieredCache.delete_all_tiers(self._get_version_cache_key(''))
+
+    def _get_key_lock(self, cache_key):
+        """
+        Return the lock of a cache key, counting the caller as one of its users.
+        """
+        with self._lock:
+            key_lock = self._key_locks.get(cache_key)
+            if key_lock is None:
+                key_lock = self._key_locks[cache_key] = [threading.Lock(), 0]
+            key_lock[1] += 1
+            return key_lock
+
+    def _release_key_lock(self, cache_key, key_lock):
+        """
+        Stop using the lock of a cache key, dropping it once nobody uses it.
+        """
+        with self._lock:
+            key_lock[1] -= 1
+            if not key_lock[1]:
+                del self._key_locks[cache_key]
+
+    def _get_entry(self, cache_key):
+        """
+        Return a copy of the cached result of a cache key, or `_MISSING` if it's missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                return _MISSING
+            if entry[1] <= time.time():
+                del self._entries[cache_key]
+                return _MISSING
+            self._entries.move_to_end(cache_key)
+            return copy.deepcopy(entry[0])
+
+    def _set_entry(self, cache_key, result, timeout):
+        """
+        Cache a copy of a result for `timeout` seconds, evicting the least recently used entries.
+        """
+        with self._lock:
+            self._entries[cache_key] = (copy.deepcopy(result), time.time() + timeout)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_fetch(self, context, config_id, fetch):
+        """
+        Return the cached filter result for `context` and `config_id`, calling `fetch()` on a miss.
+
+        Errors raised by `fetch` are not cached. Callers get a copy of the result they can modify.
+        """
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return fetch()
+
+        cache_key = self._get_cache_key(context, config_id)
+        cached = self._get_entry(cache_key)
+        if cached is not _MISSING:
+            return cached
+
+        key_lock = self._get_key_lock(cache_key)
+        try:
+            with key_lock[0]:
+                # Another thread may have fetched it while we waited.
+                cached = self._get_entry(cache_key)
+                if cached is not _MISSING:
+                    return cached
+
+                result = fetch()
+                timeout = self.ttl if result else min(self.negative_ttl, self.ttl)
+                if timeout > 0:
+                    self._set_entry(cache_key, result, timeout)
+                return result
+        finally:
+            self._release_key_lock(cache_key, key_lock)
+
+
+external_config_cache = ExternalConfigCache()
+
+
 def get_external_config_from_filter(context, config_id=''):
     """
     Thin wrapper around the LTIConfigurationListed filter to get the external
     configuration values using a certain context and config_id.
+
+    Results are cached (see `ExternalConfigCache`); filter plugins should call
+    `lti_consumer.models.invalidate_external_config_cache` when a configuration changes.
     """
-    # .. filter: org.openedx.xblock.lti_consumer.configuration.listed.v1
-    _, _, configurations = LTIConfigurationListed.run_filter(context=context, config_id=config_id, configurations={})
-    if config_id:
-        return configurations.get(config_id, {})
-    return configurations
+    def fetch():
+        # .. filter: org.openedx.xblock.lti_consumer.configuration.listed.v1
+        _, _, configurations = LTIConfigurationListed.run_filter(
+            context=context, config_id=config_id, configurations={},
+        )
+        if config_id:
+            return configurations.get(config_id, {})
+        return configurations
+
+    return external_config_cache.get_or_fetch(context, config_id, fetch)
@@ -0,0 +1,305 @@
+"""
+Deferred publication of LTI AGS grades to the LMS
+
+By default the grade of an LtiAgsScore is published in its post_save signal, in
+the request of the tool submitting it. Setting LTI_AGS_GRADE_PUBLISH_BACKEND to
+the dotted path of one of the backends below makes the signal only queue the
+score: its grade is published after the transaction saving it commits, and the
+scores of a line item queued together are published at once, loading the block
+once. Grades are always published from the latest score of each user, so scores
+superseded before their grade is published are skipped.
+"""
+import functools
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.module_loading import import_string
+from edx_django_utils.cache import get_cache_key
+
+from lti_consumer.models import LtiAgsLineItem, LtiAgsScore
+from lti_consumer.plugin import compat
+
+log = logging.getLogger(__name__)
+
+# Number of seconds the task queue backend waits before publishing queued grades,
+# so further scores of the same users submitted meanwhile are published together.
+# Can be overridden with the LTI_AGS_GRADE_PUBLISH_DELAY setting.
+DEFAULT_GRADE_PUBLISH_DELAY = 5
+
+# Number of seconds after which a grade queued in the task queue backend is queued
+# again, in case the task publishing it was lost.
+GRADE_PUBLISH_PENDING_TIMEOUT = 300
+
+# Difference under which a grade published to the LMS is considered equal to the
+# normalized score it was published from.
+GRADE_RECONCILIATION_TOLERANCE = 1e-6
+
+
+def get_grade_publish_backend():
+    """
+    Return the grade publish backend set in LTI_AGS_GRADE_PUBLISH_BACKEND, or None to publish grades immediately.
+    """
+    backend_path = getattr(settings, 'LTI_AGS_GRADE_PUBLISH_BACKEND', None)
+    if not backend_path:
+        return None
+    return _load_grade_publish_backend(backend_path)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_grade_publish_backend(backend_path):
+    return import_string(backend_path)()
+
+
+def block_accepts_grades(block):
+    """
+    Return whether grades can be published to a block: it's graded, and not past due unless it accepts late grades.
+    """
+    return block.has_score and (not block.is_past_due() or block.accept_grades_past_due)
+
+
+def publish_score_grade(instance, block=None):
+    """
+    Publish the grade of a score to its block in the LMS, if the score is FullyGraded.
+
+    `block` is the block of the score's line item if it's already loaded. Returns the
+    block once it's loaded, so publishing the grades of many scores loads it once.
+    """
+    line_item = instance.line_item
+    lti_config = line_item.lti_configuration
+
+    # Only save score if the `line_item.resource_link_id` is the same as
+    # `lti_configuration.location` to prevent LTI tools to alter grades they don't
+    # have permissions to.
+    # TODO: This security mechanism will need to be reworked once we enable LTI 1.3
+    # reusability to allow one configuration to save scores on multiple placements,
+    # but still locking down access to the items that are using the LTI configuration.
+    if line_item.resource_link_id != lti_config.location:
+        log.warning(
+            "LTI tool tried publishing score %r to block %s (outside allowed scope of: %s).",
+            instance,
+            line_item.resource_link_id,
+            lti_config.location,
+        )
+        return block
+
+    # Before starting to publish grades to the LMS, check that:
+    # 1. The grade being submitted in the final one - `FullyGraded`
+    # 2. This LineItem is linked to a LMS grade - the `LtiResouceLinkId` field is set
+    # 3. There's a valid grade in this score - `scoreGiven` is set
+    if instance.grading_progress == LtiAgsScore.FULLY_GRADED \
+            and line_item.resource_link_id \
+            and instance.score_given:
+        try:
+            # Load block using LMS APIs and check if the block is graded and still accept grades.
+            block = block or compat.load_block_as_user(line_item.resource_link_id)
+            if block_accepts_grades(block):
+                # Map external ID to platform user
+                user = compat.get_user_from_external_user_id(instance.user_id)
+
+                # The LTI AGS spec allow tools to send grades higher than score maximum, so
+                # we have to cap the score sent to the gradebook to the maximum allowed value.
+                # Also, this is an normalized score ranging from 0 to 1.
+                score = min(instance.score_given, instance.score_maximum) / instance.score_maximum
+
+                # Set module score using XBlock custom method to do so.
+                # This saves the score on both the XBlock's K/V store as well as in
+                # the LMS database.
+                log.info(
+                    "Publishing LTI grade from block %s to LMS. User: %s (score: %s)",
+                    block.scope_ids.usage_id,
+                    user,
+                    score,
+                )
+                block.set_user_module_score(user, score, block.max_score(), instance.comment)
+
+        # This is a catch all exception to catch and log any issues related to loading the block
+        # from the modulestore and other LMS API calls
+        except Exception as exc:
+            log.exception(
+                "Error while publishing score %r to block %s to LMS: %s",
+                instance,
+                line_item.resource_link_id,
+                exc,
+            )
+            raise exc
+
+    return block
+
+
+def publish_line_item_grades(line_item_id, user_ids):
+    """
+    Publish the grades of the latest scores of users on a line item.
+
+    Errors are logged and don't stop the grades of the other users from being published.
+    Returns the ids of the users whose grade failed to be published.
+    """
+    line_item = LtiAgsLineItem.objects.select_related('lti_configuration').filter(pk=line_item_id).first()
+    if line_item is None:
+        return []
+
+    block = None
+    failed_user_ids = []
+    for score in line_item.scores.filter(user_id__in=user_ids).order_by('id'):
+        try:
+            block = publish_score_grade(score, block)
+        except Exception:  # pylint: disable=broad-exception-caught
+            # Already logged by publish_score_grade.
+            failed_user_ids.append(score.user_id)
+    return failed_user_ids
+
+
+def find_mismatched_grades(scores):
+    """
+    Return the scores whose grade in the LMS differs from them, or is missing.
+
+    `scores` are fully graded scores, with their line item and configuration selected.
+    Scores whose grade isn't published, because their line item is outside of the
+    configuration's block, their block doesn't accept grades (see `block_accepts_grades`)
+    or their user is unknown, are skipped. The users of the scores are looked up at
+    once, and the block and LMS grades once per line item.
+    """
+    scores_by_line_item = {}
+    for score in scores:
+        line_item = score.line_item
+        if line_item.resource_link_id and line_item.resource_link_id == line_item.lti_configuration.location:
+            scores_by_line_item.setdefault(line_item, []).append(score)
+
+    for line_item in list(scores_by_line_item):
+        try:
+            block = compat.load_block_as_user(line_item.resource_link_id)
+        except Exception:  # pylint: disable=broad-exception-caught
+            log.exception("Error while loading block %s to reconcile its grades.", line_item.resource_link_id)
+            block = None
+        if block is None or not block_accepts_grades(block):
+            del scores_by_line_item[line_item]
+    if not scores_by_line_item:
+        return []
+
+    users = compat.get_users_from_external_user_ids([
+        score.user_id for line_item_scores in scores_by_line_item.values() for score in line_item_scores
+    ])
+
+    mismatched = []
+    for line_item, line_item_scores in scores_by_line_item.items():
+        line_item_scores = [score for score in line_item_scores if score.user_id in users]
+        module_scores = compat.get_module_scores(
+            line_item.resource_link_id,
+            [users[score.user_id] for score in line_item_scores],
+        )
+        for score in line_item_scores:
+            grade, max_grade = module_scores.get(users[score.user_id].id, (None, None))
+            expected = min(score.score_given, score.score_maximum) / score.score_maximum
+            if grade is None or not max_grade or abs(grade / max_grade - expected) > GRADE_RECONCILIATION_TOLERANCE:
+                mismatched.append(score)
+    return mismatched
+
+
+class GradePublishBackend:
+    """
+    Base class of the grade publish backends.
+
+    Scores queued while a transaction is open are grouped by line item, and each
+    line item is handed to `dispatch` once the transaction commits. Scores queued
+    outside of a transaction are dispatched right away.
+    """
+    def __init__(self):
+        self._local = threading.local()
+
+    def enqueue(self, score):
+        """
+        Queue the grade of a score to be published once the current transaction commits.
+        """
+        state = self._local.__dict__
+        if state.get('registered') and not self._is_flush_registered(state['registered']):
+            # The transaction the flush was registered in was rolled back, so were its scores.
+            state.pop('pending', None)
+            state['registered'] = None
+        state.setdefault('pending', {}).setdefault(score.line_item_id, set()).add(score.user_id)
+        if not state.get('registered'):
+            # Kept to find it among the commit callbacks, and set before registering it since
+            # it runs right away outside of a transaction.
+            state['registered'] = flush = self.flush
+            transaction.on_commit(flush)
+
+    @staticmethod
+    def _is_flush_registered(flush):
+        """
+        Return whether a flush is still waiting for the current transaction to commit.
+        """
+        return any(callback is flush for _, callback, _ in transaction.get_connection().run_on_commit)
+
+    def flush(self):
+        """
+        Dispatch the scores queued by this thread.
+        """
+        self._local.__dict__['registered'] = None
+        pending = self._local.__dict__.pop('pending', {})
+        for line_item_id, user_ids in pending.items():
+            self.dispatch(line_item_id, sorted(user_ids))
+
+    def dispatch(self, line_item_id, user_ids):
+        """
+        Publish, or arrange publishing, the grades of the latest scores of users on a line item.
+        """
+        raise NotImplementedError
+
+
+class InProcessGradePublishBackend(GradePublishBackend):
+    """
+    Publish grades in the process saving the scores, once their transaction commits.
+
+    Meant for tests and development, where there's no task queue.
+    """
+    def dispatch(self, line_item_id, user_ids):
+        publish_line_item_grades(line_item_id, user_ids)
+
+
+class CeleryGradePublishBackend(GradePublishBackend):
+    """
+    Publish grades in a Celery task, LTI_AGS_GRADE_PUBLISH_DELAY seconds after the scores are saved.
+
+    A user's grade is only queued once until the task publishing it starts, so
+    scores submitted meanwhile don't queue more tasks and the task publishes the
+    latest one. Pending grades are tracked in the Django cache, which must be
+    shared by the workers (e.g. memcached or redis).
+    """
+    @property
+    def delay(self):
+        return getattr(settings, 'LTI_AGS_GRADE_PUBLISH_DELAY', DEFAULT_GRADE_PUBLISH_DELAY)
+
+    @staticmethod
+    def _get_pending_cache_key(line_item_id, user_id):
+        return get_cache_key(app="lti", key="grade_publish_pending", line_item_id=line_item_id, user_id=user_id)
+
+    def dispatch(self, line_item_id, user_ids):
+        timeout = self.delay + GRADE_PUBLISH_PENDING_TIMEOUT
+        user_ids = [
+            user_id for user_id in user_ids
+            if cache.add(self._get_pending_cache_key(line_item_id, user_id), True, timeout)
+        ]
+        if user_ids:
+            self.schedule(line_item_id, user_ids)
+
+    def schedule(self, line_item_id, user_ids):
+        """
+        Queue the Celery task publishing the grades of users on a line item.
+        """
+        # Celery isn't a dependency of this package, only of the platforms using this backend.
+        from celery import current_app  # pylint: disable=import-error,import-outside-toplevel
+        current_app.send_task(
+            'lti_consumer.tasks.publish_lti_ags_grades',
+            args=(line_item_id, user_ids),
+            countdown=self.delay,
+        )
+
+    @classmethod
+    def run(cls, line_item_id, user_ids):
+        """
+        Publish the queued grades of users on a line item, from the Celery task.
+        """
+        # Scores saved from now on queue their grade again, even if they are published now.
+        cache.delete_many([cls._get_pending_cache_key(line_item_id, user_id) for user_id in user_ids])
+        publish_line_item_grades(line_item_id, user_ids)
@@ -125,6 +125,14 @@ LTI_1P3_ACCESS_TOKEN_SCOPES = [
 
 LTI_1P3_ACS_SCOPE = 'https://purl.imsglobal.org/spec/lti-ap/scope/control.all'
 
+# Algorithms the platform can sign its JWTs with (launch messages and access tokens),
+# mapped to the JWK key type of the keys they use.
+LTI_1P3_SIGNING_ALGORITHMS = {
+    'RS256': 'RSA',
+    'ES256': 'EC',
+}
+LTI_1P3_DEFAULT_SIGNING_ALGORITHM = 'RS256'
+
 LTI_DEEP_LINKING_ACCEPTED_TYPES = [
     'ltiResourceLink',
     'link',
@@ -1,6 +1,7 @@
 """
 LTI 1.3 Consumer implementation
 """
+import copy
 import logging
 from urllib.parse import urlencode
 import uuid
@@ -9,7 +10,11 @@ from edx_django_utils.monitoring import function_trace
 from django.conf import settings
 
 from lti_consumer.lti_1p3.exceptions import InvalidClaimValue
-from lti_consumer.utils import cache_lti_1p3_launch_data, check_token_claim, get_data_from_cache
+from lti_consumer.utils import (
+    check_token_claim,
+    get_lti_1p3_launch_data_from_message_hint,
+    get_lti_1p3_message_hint,
+)
 
 from . import constants, exceptions
 from .constants import (
@@ -25,6 +30,7 @@ from .key_handlers import ToolKeyHandler, PlatformKeyHandler
 from .ags import LtiAgs
 from .deep_linking import LtiDeepLinking
 from .nprs import LtiNrps
+from .token_cache import access_token_reuse_cache, reference_token_store, verified_token_cache
 
 log = logging.getLogger(__name__)
 
@@ -47,9 +53,13 @@ class LtiConsumer1p3:
             redirect_uris,
             tool_key=None,
             tool_keyset_url=None,
+            signing_algorithm=constants.LTI_1P3_DEFAULT_SIGNING_ALGORITHM,
     ):
         """
         Initialize LTI 1.3 Consumer class
+
+        `signing_algorithm` is the algorithm used to sign the JWTs issued by the
+        platform with `rsa_key`, which must be a key suitable for that algorithm.
         """
         self.iss = iss
         self.oidc_url = lti_oidc_url
@@ -59,7 +69,7 @@ class LtiConsumer1p3:
         self.redirect_uris = redirect_uris
 
         # Set up platform message signature class
-        self.key_handler = PlatformKeyHandler(rsa_key, rsa_key_id)
+        self.key_handler = PlatformKeyHandler(rsa_key, rsa_key_id, signing_algorithm)
 
         # Set up tool public key verification class
         self.tool_jwt = ToolKeyHandler(
@@ -77,6 +87,10 @@ class LtiConsumer1p3:
         # Extra claims - used by LTI Advantage
         self.extra_claims = {}
 
+        # Launch message claims that don't change between launches, compiled on the
+        # first launch. The holder is shared with clones (see `_get_static_claims`).
+        self._static_claims = [None]
+
     def _get_target_link_uri(self, launch_data):  # pylint: disable=unused-argument
         """
         Return the target_link_uri to use for the provided launch data.
@@ -130,8 +144,9 @@ class LtiConsumer1p3:
         # the two requests. A simple example is the intended LTI launch message of the LTI launch. This value is
         # known at the time that preflight request is made, but it is not accessible when the tool responds to the
         # preflight request and the platform must craft a launch request. This library stores the launch_data in the
-        # cache and includes the cache key as the lti_message_hint query or form parameter to retrieve it later.
-        launch_data_key = cache_lti_1p3_launch_data(launch_data)
+        # cache and includes the cache key as the lti_message_hint query or form parameter to retrieve it later, or
+        # includes the encrypted launch_data itself in the lti_message_hint if stateless message hints are enabled.
+        launch_data_key = get_lti_1p3_message_hint(launch_data)
 
         oidc_url = self.oidc_url + "?"
 
@@ -311,24 +326,25 @@ class LtiConsumer1p3:
             "https://purl.imsglobal.org/spec/lti/claim/custom": custom_parameters
         }
 
-    def get_lti_launch_message(
-            self,
-            include_extra_claims=True,
-            target_link_uri=None,
-    ):
+    def _get_static_claims(self):
         """
-        Build LTI message from class parameters
+        Return the launch message claims that are the same for every launch of this consumer.
 
-        This will add all required parameters from the LTI 1.3 spec and any additional ones set in
-        the configuration and JTW encode the message using the provided key.
+        Returns a tuple with the base claims (message type, version, issuer, aud,
+        azp and deployment ID) and the platform instance claim. They are compiled
+        once and shared with the clones of this consumer, so a consumer template
+        compiles them for all the launches using it. They are compiled again if the
+        values they are built from change. The returned dicts must not be modified.
         """
-        # Start from base message
-        lti_message = LTI_BASE_MESSAGE.copy()
+        platform_name = str(settings.PLATFORM_NAME)
+        key = (self.iss, self.client_id, self.deployment_id, platform_name)
+        compiled_key, base_claims, platform_instance_claim = self._static_claims[0] or (None, None, None)
+        if compiled_key == key:
+            return base_claims, platform_instance_claim
 
-        target_link_uri = target_link_uri or self.launch_url
+        base_claims = {
+            **LTI_BASE_MESSAGE,
 
-        # Add base parameters
-        lti_message.update({
             # Issuer
             "iss": self.iss,
 
@@ -340,12 +356,39 @@ class LtiConsumer1p3:
             # String that identifies the platform-tool integration governing the message
             # http://www.imsglobal.org/spec/lti/v1p3/#lti-deployment-id-claim
             "https://purl.imsglobal.org/spec/lti/claim/deployment_id": self.deployment_id,
+        }
 
-            # Target Link URI: actual endpoint for the LTI resource to display
-            # MUST be the same value as the target_link_uri passed by the platform in the OIDC login request
-            # http://www.imsglobal.org/spec/lti/v1p3/#target-link-uri
-            "https://purl.imsglobal.org/spec/lti/claim/target_link_uri": target_link_uri,
-        })
+        # The GUID must be consistent across platform deployments, so we have opted to generate a UUID
+        # based on a namespace identifier and the platform name itself.
+        guid = uuid.uuid5(uuid.NAMESPACE_DNS, platform_name)
+        platform_instance_claim = {
+            "https://purl.imsglobal.org/spec/lti/claim/tool_platform": {'guid': str(guid), 'name': platform_name},
+        }
+
+        # Replaced as a whole, so clones compiling them concurrently never see a partial result.
+        self._static_claims[0] = (key, base_claims, platform_instance_claim)
+        return base_claims, platform_instance_claim
+
+    def get_lti_launch_message(
+            self,
+            include_extra_claims=True,
+            target_link_uri=None,
+    ):
+        """
+        Build LTI message from class parameters
+
+        This will add all required parameters from the LTI 1.3 spec and any additional ones set in
+        the configuration and JTW encode the message using the provided key.
+        """
+        base_claims, platform_instance_claim = self._get_static_claims()
+
+        # Start from base message, with the issuer, aud, azp and deployment ID claims
+        lti_message = dict(base_claims)
+
+        # Target Link URI: actual endpoint for the LTI resource to display
+        # MUST be the same value as the target_link_uri passed by the platform in the OIDC login request
+        # http://www.imsglobal.org/spec/lti/v1p3/#target-link-uri
+        lti_message["https://purl.imsglobal.org/spec/lti/claim/target_link_uri"] = target_link_uri or self.launch_url
 
         # Check if user data is set, then append it to lti message
         # Raise if isn't set, since some user data is required for the launch
@@ -373,13 +416,6 @@ class LtiConsumer1p3:
                 lti_message.update(self.lti_claim_launch_presentation)
 
             # Platform instance claim
-            # The GUID must be consistent across platform deployments, so we have opted to generate a UUID
-            # based on a namespace identifier and the platform name itself.
-            guid = uuid.uuid5(uuid.NAMESPACE_DNS, str(settings.PLATFORM_NAME))
-            platform_instance_claim = {'guid': str(guid), 'name': str(settings.PLATFORM_NAME)}
-            platform_instance_claim = {
-                "https://purl.imsglobal.org/spec/lti/claim/tool_platform": platform_instance_claim
-            }
             lti_message.update(platform_instance_claim)
 
             # Custom variables claim
@@ -500,24 +536,46 @@ class LtiConsumer1p3:
         # https://tools.ietf.org/html/rfc6749
         scopes_str = " ".join(valid_scopes)
 
-        # This response is compliant with RFC 6749
-        # https://tools.ietf.org/html/rfc6749#section-4.4.3
-        return {
-            "access_token": self.key_handler.encode_and_sign(
+        # Tokens recently minted for the same scopes are handed out again
+        # when access token reuse is enabled.
+        access_token, expires_in = access_token_reuse_cache.get_or_mint(
+            self.iss,
+            self.client_id,
+            self.key_handler.key.key_id if self.key_handler.key else None,
+            valid_scopes,
+            # Create token valid for 3600 seconds (1h) as per specification
+            # https://www.imsglobal.org/spec/security/v1p0/#expires_in-values-and-renewing-the-access-token
+            3600,
+            lambda: self._mint_access_token(
                 {
                     "sub": self.client_id,
                     "iss": self.iss,
                     "scopes": scopes_str
                 },
-                # Create token valid for 3600 seconds (1h) as per specification
-                # https://www.imsglobal.org/spec/security/v1p0/#expires_in-values-and-renewing-the-access-token
                 expiration=3600
             ),
+        )
+
+        # This response is compliant with RFC 6749
+        # https://tools.ietf.org/html/rfc6749#section-4.4.3
+        return {
+            "access_token": access_token,
             "token_type": "bearer",
-            "expires_in": 3600,
+            "expires_in": expires_in,
             "scope": scopes_str
         }
 
+    def _mint_access_token(self, claims, expiration):
+        """
+        Return a new access token for `claims`.
+
+        Tokens are signed JWTs, or opaque reference tokens whose claims are
+        stored in the cache when reference tokens are enabled.
+        """
+        if reference_token_store.enabled:
+            return reference_token_store.issue(claims, expiration=expiration)
+        return self.key_handler.encode_and_sign(claims, expiration=expiration)
+
     def _validate_preflight_response(self, response):
         """
         Validates a preflight response to be used in a launch request
@@ -536,15 +594,39 @@ class LtiConsumer1p3:
         except AssertionError as err:
             raise exceptions.PreflightRequestValidationFailure() from err
 
-    def check_token(self, token, allowed_scopes=None):
+    def decode_access_token(self, token):
         """
-        Check if token has access to allowed scopes.
+        Validate an access token issued by the platform and return its claims.
+
+        Verified tokens are cached until they expire, so the signature of a
+        token is only checked the first time it's used. Reference tokens are
+        resolved from the cache, and must have been issued to this consumer.
         """
-        token_contents = self.key_handler.validate_and_decode(
+        if reference_token_store.is_reference_token(token):
+            token_contents = reference_token_store.resolve(token)
+            if not token_contents or token_contents.get('iss') != self.iss \
+                    or token_contents.get('sub') != self.client_id:
+                raise exceptions.UnauthorizedToken()
+            return token_contents
+
+        kid = self.key_handler.key.key_id if self.key_handler.key else None
+        return verified_token_cache.get_or_verify(
             token,
-            # The issuer of the token is the platform
-            iss=self.iss,
+            self.iss,
+            kid,
+            # The issuer of the token is the platform.
+            lambda access_token: self.key_handler.validate_and_decode(access_token, iss=self.iss),
         )
+
+    def check_token(self, token, allowed_scopes=None, token_contents=None):
+        """
+        Check if token has access to allowed scopes.
+
+        `token_contents` can be set to the claims already returned by
+        `decode_access_token` for this token, to skip decoding it again.
+        """
+        if token_contents is None:
+            token_contents = self.decode_access_token(token)
         # Tokens are space separated
         token_scopes = token_contents['scopes'].split(' ')
 
@@ -565,6 +647,17 @@ class LtiConsumer1p3:
             raise ValueError('Invalid extra claim: is not a dict.')
         self.extra_claims.update(claim)
 
+    def clone(self):
+        """
+        Return a copy of this consumer that request specific claims can be set on without altering this one.
+
+        Key handlers and LTI Advantage services are shared with the copy, since
+        they don't change once the consumer is set up.
+        """
+        consumer = copy.copy(self)
+        consumer.extra_claims = dict(self.extra_claims)
+        return consumer
+
 
 class LtiAdvantageConsumer(LtiConsumer1p3):
     """
@@ -588,6 +681,7 @@ class LtiAdvantageConsumer(LtiConsumer1p3):
         # LTI Advantage services
         self.ags = None
         self.dl = None
+        self._dl_launch_claim = None
 
         # LTI NRPS Variables
         self.nrps = None
@@ -674,6 +768,9 @@ class LtiAdvantageConsumer(LtiConsumer1p3):
         """
         self.dl = LtiDeepLinking(deep_linking_launch_url, deep_linking_return_url)
 
+        # Compiled once, and shared with clones, since it's the same for every deep linking launch.
+        self._dl_launch_claim = self.dl.get_lti_deep_linking_launch_claim()
+
     def generate_launch_request(
             self,
             preflight_response,
@@ -684,7 +781,7 @@ class LtiAdvantageConsumer(LtiConsumer1p3):
         Overrides method from LtiConsumer1p3 to allow handling LTI Deep linking messages
         """
         lti_message_hint = preflight_response.get('lti_message_hint')
-        launch_data = get_data_from_cache(lti_message_hint)
+        launch_data = get_lti_1p3_launch_data_from_message_hint(lti_message_hint)
 
         if not launch_data:
             log.warning(f'There was a cache miss during an LTI 1.3 launch when using the cache_key {lti_message_hint}.')
@@ -707,10 +804,8 @@ class LtiAdvantageConsumer(LtiConsumer1p3):
                 "https://purl.imsglobal.org/spec/lti/claim/message_type": "LtiDeepLinkingRequest",
             })
             # Include deep linking claim
-            lti_launch_message.update(
-                # TODO: Add extra settings
-                self.dl.get_lti_deep_linking_launch_claim()
-            )
+            # TODO: Add extra settings
+            lti_launch_message.update(self._dl_launch_claim or self.dl.get_lti_deep_linking_launch_claim())
 
             # Nonce from OIDC preflight launch request
             lti_launch_message.update({
@@ -819,6 +914,7 @@ class LtiProctoringConsumer(LtiConsumer1p3):
         redirect_uris,
         tool_key=None,
         tool_keyset_url=None,
+        signing_algorithm=constants.LTI_1P3_DEFAULT_SIGNING_ALGORITHM,
     ):
         """
         Initialize the LtiProctoringConsumer by delegating to LtiConsumer1p3's __init__ method.
@@ -833,7 +929,8 @@ class LtiProctoringConsumer(LtiConsumer1p3):
             rsa_key_id,
             redirect_uris,
             tool_key,
-            tool_keyset_url
+            tool_keyset_url,
+            signing_algorithm,
         )
         self.proctoring_data = {}
 
@@ -846,6 +943,11 @@ class LtiProctoringConsumer(LtiConsumer1p3):
             if key in LTI_PROCTORING_DATA_KEYS:
                 self.proctoring_data[key] = value
 
+    def clone(self):
+        consumer = super().clone()
+        consumer.proctoring_data = dict(self.proctoring_data)
+        return consumer
+
     def _get_base_claims(self):
         """
         Returns claims common to all LTI Proctoring Services LTI launch messages, to be used when creating LTI launch
@@ -906,7 +1008,7 @@ class LtiProctoringConsumer(LtiConsumer1p3):
         the set_extra_claim method to include these additional claims in the LTI launch message.
         """
         lti_message_hint = preflight_response.get('lti_message_hint')
-        launch_data = get_data_from_cache(lti_message_hint)
+        launch_data = get_lti_1p3_launch_data_from_message_hint(lti_message_hint)
 
         if launch_data.message_type == "LtiStartProctoring":
             proctoring_claims = self.get_start_proctoring_claims()
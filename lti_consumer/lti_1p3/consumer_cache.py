@@ -0,0 +1,125 @@
+"""
+LTI 1.3 - Consumer cache
+
+Process-wide cache of fully set up LTI 1.3 consumers, so launches, access
+token requests and LTI Advantage calls don't rebuild the consumer (reading the
+configuration, loading keys and setting up AGS, Deep Linking and NRPS) every time.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from edx_django_utils.cache import TieredCache, get_cache_key
+
+# Maximum number of consumer templates kept in the process cache, least
+# recently used entries are evicted first. Setting it to 0 disables the cache.
+# Can be overridden with the LTI_1P3_CONSUMER_CACHE_MAX_ENTRIES setting.
+DEFAULT_CONSUMER_CACHE_MAX_ENTRIES = 256
+
+# Number of seconds a consumer template is reused at most, which bounds how long
+# changes that don't invalidate it (e.g. to external configurations) take to apply.
+# Can be overridden with the LTI_1P3_CONSUMER_CACHE_TTL setting.
+DEFAULT_CONSUMER_CACHE_TTL = 300
+
+
+class ConsumerTemplateCache:
+    """
+    Cache of LTI 1.3 consumer templates keyed by configuration id and version stamp.
+
+    The version stamp of a configuration is a random value stored in the Django
+    cache (shared by all workers) and dropped by `invalidate` whenever the
+    configuration, its passport, its line items or its block change, so every
+    process stops using its template at once. Templates are never handed out:
+    callers get a clone they can add request specific claims to.
+    """
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_entries(self):
+        return getattr(settings, 'LTI_1P3_CONSUMER_CACHE_MAX_ENTRIES', DEFAULT_CONSUMER_CACHE_MAX_ENTRIES)
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'LTI_1P3_CONSUMER_CACHE_TTL', DEFAULT_CONSUMER_CACHE_TTL)
+
+    @staticmethod
+    def _get_version_cache_key(config_id):
+        return get_cache_key(app="lti", key="consumer_version", config_id=str(config_id))
+
+    def get_version_stamp(self, config_id):
+        """
+        Return the current version stamp of a configuration, creating one if there is none.
+        """
+        cache_key = self._get_version_cache_key(config_id)
+        cached = TieredCache.get_cached_response(cache_key)
+        if cached.is_found:
+            return cached.value
+
+        version_stamp = uuid.uuid4().hex
+        TieredCache.set_all_tiers(cache_key, version_stamp, django_cache_timeout=self.ttl)
+        return version_stamp
+
+    def invalidate(self, config_id):
+        """
+        Drop the version stamp of a configuration, so its consumer is built again on next use.
+        """
+        TieredCache.delete_all_tiers(self._get_version_cache_key(config_id))
+
+    def clear(self):
+        """
+        Drop all templates of this process and reset the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def get_stats(self):
+        """
+        Return the cache hit/miss counters and current size.
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+            }
+
+    def get_or_build(self, config_id, build):
+        """
+        Return a clone of the consumer template of a configuration, calling `build()` on a miss.
+
+        Errors raised by `build` are not cached.
+        """
+        if self.max_entries <= 0:
+            return build()
+
+        entry_key = (str(config_id), self.get_version_stamp(config_id))
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(entry_key)
+                self.hits += 1
+                return entry[0].clone()
+            self.misses += 1
+
+        template = build()
+
+        with self._lock:
+            self._entries[entry_key] = (template, now + self.ttl)
+            self._entries.move_to_end(entry_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return template.clone()
+
+
+consumer_template_cache = ConsumerTemplateCache()
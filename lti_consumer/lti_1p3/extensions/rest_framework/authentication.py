@@ -61,7 +61,7 @@ class Lti1p3ApiAuthentication(authentication.BaseAuthentication):
         # This doesn't validate specific permissions, just checks if the token
         # is valid or not.
         try:
-            lti_consumer.check_token(auth[1])
+            token_contents = lti_consumer.decode_access_token(auth[1])
         except Exception as err:
             msg = _('Invalid token signature.')
             raise exceptions.AuthenticationFailed(msg) from err
@@ -72,8 +72,11 @@ class Lti1p3ApiAuthentication(authentication.BaseAuthentication):
         # With the LTI Configuration and consumer attached to the request
         # the views and permissions classes can make use of the
         # current LTI context to retrieve settings and decode the token passed.
+        # The decoded token is kept as well, so the permission classes can
+        # check its scopes without verifying its signature again.
         request.lti_configuration = lti_configuration
         request.lti_consumer = lti_consumer
+        request.lti_token_contents = token_contents
 
         # This isn't tied to any authentication backend on Django (it's just
         # used for LTI endpoints), but we need to return some kind of User
@@ -24,7 +24,11 @@ class LTIBasePermissions(permissions.BasePermission):
         scopes = self.get_permission_scopes(request, view)
 
         if scopes:
-            return request.lti_consumer.check_token(auth_token, scopes)
+            return request.lti_consumer.check_token(
+                auth_token,
+                scopes,
+                token_contents=getattr(request, 'lti_token_contents', None),
+            )
 
         return False
 
@@ -69,7 +73,7 @@ class LtiAgsPermissions(LTIBasePermissions):
             scopes = [
                 'https://purl.imsglobal.org/spec/lti-ags/scope/result.readonly'
             ]
-        elif view.action in ['scores']:
+        elif view.action in ['scores', 'scores_batch']:
             scopes = [
                 'https://purl.imsglobal.org/spec/lti-ags/scope/score',
             ]
@@ -0,0 +1,247 @@
+"""
+LTI 1.3 - Key caches
+
+Process-wide caches used by the key handlers, so tool keysets
+aren't fetched on every access token or deep linking request and
+keys aren't parsed again every time a consumer is instanced.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+from django.conf import settings
+from edx_django_utils.cache import TieredCache, get_cache_key
+from jwt.api_jwk import PyJWKSet
+
+from . import exceptions
+
+log = logging.getLogger(__name__)
+
+# Number of seconds a tool keyset is reused before being fetched again.
+# Can be overridden with the LTI_1P3_TOOL_JWKS_CACHE_TTL setting.
+DEFAULT_TOOL_JWKS_CACHE_TTL = 300
+
+# Maximum number of keyset URLs kept in the process cache, least
+# recently used entries are evicted first.
+# Can be overridden with the LTI_1P3_TOOL_JWKS_CACHE_MAX_ENTRIES setting.
+DEFAULT_TOOL_JWKS_CACHE_MAX_ENTRIES = 512
+
+# Minimum number of seconds between two forced refreshes of the same keyset URL,
+# so tokens with made up key ids can't be used to hammer the tool's keyset endpoint.
+# Can be overridden with the LTI_1P3_TOOL_JWKS_MIN_REFRESH_INTERVAL setting.
+DEFAULT_TOOL_JWKS_MIN_REFRESH_INTERVAL = 30
+
+# Maximum number of parsed keys kept in the process registry, least
+# recently used entries are evicted first.
+# Can be overridden with the LTI_1P3_PARSED_KEY_REGISTRY_MAX_ENTRIES setting.
+DEFAULT_PARSED_KEY_REGISTRY_MAX_ENTRIES = 1024
+
+
+class ToolKeyset:
+    """
+    Keyset loaded from a tool's keyset URL.
+
+    Keys are indexed by key id once, when the keyset is loaded, so
+    tokens can be matched with their signing key without trying every key.
+    """
+    __slots__ = ('keys', 'keys_by_kid', 'fetched_at', 'expires_at')
+
+    def __init__(self, keys, fetched_at, ttl):
+        self.keys = keys
+        self.keys_by_kid = {key.key_id: key for key in keys if key.key_id is not None}
+        self.fetched_at = fetched_at
+        self.expires_at = fetched_at + ttl
+
+
+class ToolKeysetCache:
+    """
+    Cache of tool JWKS documents keyed by keyset URL.
+
+    Keysets are looked up in an in-process LRU first, then in the Django cache
+    (shared by all workers), and are only fetched from the tool when both miss
+    or when a refresh is forced because a token uses an unknown key id.
+    """
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'LTI_1P3_TOOL_JWKS_CACHE_TTL', DEFAULT_TOOL_JWKS_CACHE_TTL)
+
+    @property
+    def max_entries(self):
+        return getattr(settings, 'LTI_1P3_TOOL_JWKS_CACHE_MAX_ENTRIES', DEFAULT_TOOL_JWKS_CACHE_MAX_ENTRIES)
+
+    @property
+    def min_refresh_interval(self):
+        return getattr(settings, 'LTI_1P3_TOOL_JWKS_MIN_REFRESH_INTERVAL', DEFAULT_TOOL_JWKS_MIN_REFRESH_INTERVAL)
+
+    @staticmethod
+    def _get_shared_cache_key(keyset_url):
+        return get_cache_key(app="lti", key="tool_jwks", keyset_url=keyset_url)
+
+    def clear(self):
+        """
+        Drop all keysets stored in this process.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def get_keys(self, keyset_url, force_refresh=False):
+        """
+        Return the list of PyJWK objects published on `keyset_url`.
+        """
+        return self.get_keyset(keyset_url, force_refresh=force_refresh).keys
+
+    def get_keyset(self, keyset_url, force_refresh=False):
+        """
+        Return the ToolKeyset published on `keyset_url`.
+
+        When `force_refresh` is set, the cached keyset is bypassed unless it was
+        loaded less than `min_refresh_interval` seconds ago.
+        """
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(keyset_url)
+            if entry:
+                self._entries.move_to_end(keyset_url)
+
+        if entry:
+            if not force_refresh and entry.expires_at > now:
+                return entry
+            if force_refresh and now - entry.fetched_at < self.min_refresh_interval:
+                return entry
+
+        # Another worker may have already fetched (or refreshed) this keyset.
+        shared = TieredCache.get_cached_response(self._get_shared_cache_key(keyset_url))
+        if shared.is_found:
+            fetched_at = shared.value['fetched_at']
+            if force_refresh:
+                # Only reuse a keyset refreshed after the one we already have.
+                is_usable = entry is not None and fetched_at > entry.fetched_at
+            else:
+                is_usable = fetched_at + self.ttl > now
+            if is_usable:
+                return self._store(keyset_url, shared.value['jwks'], fetched_at)
+
+        jwks = self._fetch(keyset_url)
+        TieredCache.set_all_tiers(
+            self._get_shared_cache_key(keyset_url),
+            {'jwks': jwks, 'fetched_at': now},
+            django_cache_timeout=self.ttl,
+        )
+        return self._store(keyset_url, jwks, now)
+
+    @staticmethod
+    def _fetch(keyset_url):
+        """
+        Retrieve the JWKS document from the tool.
+        """
+        try:
+            jwks = jwt.PyJWKClient(keyset_url).fetch_data()
+            # Make sure the document can be loaded before caching it.
+            PyJWKSet.from_dict(jwks)
+        except Exception as err:
+            # Broad Exception is required here because many different scenarios
+            # are being handled as an invalid key when the JWK loading fails.
+            log.warning(
+                'An error was encountered while importing the LTI tool\'s keys from a JWKS URL. '
+                'The RSA keys could not be loaded.'
+            )
+            raise exceptions.NoSuitableKeys() from err
+        return jwks
+
+    def _store(self, keyset_url, jwks, fetched_at):
+        """
+        Parse and store a keyset in the process cache, evicting the oldest entries if needed.
+        """
+        entry = ToolKeyset(PyJWKSet.from_dict(jwks).keys, fetched_at, self.ttl)
+
+        with self._lock:
+            self._entries[keyset_url] = entry
+            self._entries.move_to_end(keyset_url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return entry
+
+
+class ParsedKeyRegistry:
+    """
+    Registry of parsed key objects, keyed by key id and a hash of the key contents.
+
+    Parsing a PEM key and converting it to a JWK is expensive compared to looking
+    up an already parsed key, and the same few keys are loaded on every launch,
+    token and LTI Advantage request. Since the key contents are part of the
+    registry key, rotated keys are parsed again and never served from stale entries.
+    """
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_entries(self):
+        return getattr(
+            settings,
+            'LTI_1P3_PARSED_KEY_REGISTRY_MAX_ENTRIES',
+            DEFAULT_PARSED_KEY_REGISTRY_MAX_ENTRIES,
+        )
+
+    def clear(self):
+        """
+        Drop all parsed keys and reset the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def get_stats(self):
+        """
+        Return the registry hit/miss counters and current size.
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+            }
+
+    def get_or_parse(self, kind, key_material, kid, parse):
+        """
+        Return the parsed key for `key_material`, calling `parse(key_material, kid)` on a miss.
+
+        `kind` separates the different parsed representations (e.g. platform
+        private keys and tool public keys). Parsing errors are not cached.
+        """
+        if isinstance(key_material, str):
+            key_material = key_material.encode('utf-8')
+        registry_key = (kind, kid, hashlib.sha256(key_material).hexdigest())
+
+        with self._lock:
+            parsed = self._entries.get(registry_key)
+            if parsed is not None:
+                self._entries.move_to_end(registry_key)
+                self.hits += 1
+                return parsed
+            self.misses += 1
+
+        parsed = parse(key_material, kid)
+
+        with self._lock:
+            self._entries[registry_key] = parsed
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return parsed
+
+
+tool_keyset_cache = ToolKeysetCache()
+parsed_key_registry = ParsedKeyRegistry()
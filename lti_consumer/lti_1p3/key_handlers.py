@@ -4,7 +4,7 @@ LTI 1.3 - Access token library
 This handles validating messages sent by the tool and generating
 access token with LTI scopes.
 """
-import copy
+import functools
 import json
 import math
 import sys
@@ -16,6 +16,8 @@ from edx_django_utils.monitoring import function_trace
 from jwt.api_jwk import PyJWK
 
 from . import exceptions
+from .constants import LTI_1P3_DEFAULT_SIGNING_ALGORITHM
+from .key_cache import parsed_key_registry, tool_keyset_cache
 
 log = logging.getLogger(__name__)
 
@@ -49,42 +51,40 @@ class ToolKeyHandler:
 
         # Import from public key
         if public_key:
-            try:
-                # Import Key and save to internal state
-                algo_obj = jwt.get_algorithm_by_name('RS256')
-                public_key = algo_obj.prepare_key(public_key)
-                public_jwk = json.loads(algo_obj.to_jwk(public_key))
-                self.public_key = PyJWK.from_dict(public_jwk)
-            except jwt.exceptions.InvalidKeyError as err:
-                log.warning(
-                    'An error was encountered while loading the LTI tool\'s key from the public key. '
-                    'The RSA key could not parsed.'
-                )
-                raise exceptions.InvalidRsaKey() from err
+            self.public_key = parsed_key_registry.get_or_parse(
+                'tool_public_key',
+                public_key,
+                None,
+                self._parse_public_key,
+            )
+
+    @staticmethod
+    def _parse_public_key(public_key, kid):  # pylint: disable=unused-argument
+        """
+        Parse the tool RSA public key into a PyJWK.
+        """
+        try:
+            algo_obj = jwt.get_algorithm_by_name('RS256')
+            public_key = algo_obj.prepare_key(public_key)
+            public_jwk = json.loads(algo_obj.to_jwk(public_key))
+            return PyJWK.from_dict(public_jwk)
+        except jwt.exceptions.InvalidKeyError as err:
+            log.warning(
+                'An error was encountered while loading the LTI tool\'s key from the public key. '
+                'The RSA key could not parsed.'
+            )
+            raise exceptions.InvalidRsaKey() from err
 
     def _get_keyset(self):
         """
         Get keyset from available sources.
 
-        If using a RSA key, forcefully set the key id
-        to match the one from the JWT token.
+        Keysets fetched from the tool's keyset URL are cached process-wide.
         """
         keyset = []
 
         if self.keyset_url:
-            try:
-                keys = jwt.PyJWKClient(self.keyset_url).get_jwk_set()
-            except Exception as err:
-                # Broad Exception is required here because jwkest raises
-                # an Exception object explicitly.
-                # Beware that many different scenarios are being handled
-                # as an invalid key when the JWK loading fails.
-                log.warning(
-                    'An error was encountered while importing the LTI tool\'s keys from a JWKS URL. '
-                    'The RSA keys could not be loaded.'
-                )
-                raise exceptions.NoSuitableKeys() from err
-            keyset.extend(keys.keys)
+            keyset.extend(tool_keyset_cache.get_keys(self.keyset_url))
 
         if self.public_key:
             # Add to keyset
@@ -92,6 +92,50 @@ class ToolKeyHandler:
 
         return keyset
 
+    @staticmethod
+    def _get_token_kid(token):
+        """
+        Return the key id from the JWT header without verifying the token, if any.
+
+        Raises MalformedJwtToken if the key id isn't a string.
+        """
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+        except jwt.exceptions.DecodeError:
+            # Malformed tokens are rejected later on, when decoding.
+            return None
+        except jwt.exceptions.InvalidTokenError as err:
+            # PyJWT rejects headers whose key id isn't a string.
+            raise exceptions.MalformedJwtToken() from err
+        if kid is not None and not isinstance(kid, str):
+            raise exceptions.MalformedJwtToken()
+        return kid
+
+    def _get_keys_for_kid(self, kid):
+        """
+        Return the keys that can have been used to sign a token with the given key id.
+
+        Keys from the keyset URL are looked up by key id. The tool may have rotated
+        its keys since the keyset was cached, so the keyset is refreshed if the
+        key id is unknown, and its keys without a key id are used if it's still
+        unknown. The tool public key has no key id, so it's always included.
+        """
+        keys = []
+
+        if self.keyset_url:
+            keyset = tool_keyset_cache.get_keyset(self.keyset_url)
+            if kid not in keyset.keys_by_kid:
+                keyset = tool_keyset_cache.get_keyset(self.keyset_url, force_refresh=True)
+            if kid in keyset.keys_by_kid:
+                keys.append(keyset.keys_by_kid[kid])
+            else:
+                keys.extend(key for key in keyset.keys if key.key_id is None)
+
+        if self.public_key:
+            keys.append(self.public_key)
+
+        return keys
+
     def validate_and_decode(self, token):
         """
         Check if a message sent by the tool is valid.
@@ -101,7 +145,12 @@ class ToolKeyHandler:
         The authorization server decodes the JWT and MUST validate the values for the
         iss, sub, exp, aud and jti claims.
         """
-        key_set = self._get_keyset()
+        kid = self._get_token_kid(token)
+        if kid:
+            key_set = self._get_keys_for_kid(kid)
+        else:
+            # Legacy tokens without a key id have to be checked against every key.
+            key_set = self._get_keyset()
 
         for i, obj in enumerate(key_set):
             try:
@@ -128,32 +177,57 @@ class ToolKeyHandler:
 
 class PlatformKeyHandler:
     """
-    Platform RSA Key handler.
+    Platform Key handler.
 
     This class loads the platform key and is responsible for
     encoding JWT messages and exporting public keys.
+
+    Keys are RSA keys signing with RS256 by default, `algorithm` can be set
+    to any of `LTI_1P3_SIGNING_ALGORITHMS` (e.g. ES256 with a P-256 EC key).
     """
     @function_trace('lti_consumer.key_handlers.PlatformKeyHandler.__init__')
-    def __init__(self, key_pem, kid=None):
+    def __init__(self, key_pem, kid=None, algorithm=LTI_1P3_DEFAULT_SIGNING_ALGORITHM):
         """
         Import Key when instancing class if a key is present.
         """
+        self.algorithm = algorithm
         self.key = None
+        self._public_key = None
+        self._public_jwk = None
 
         if key_pem:
-            # Import JWK from RSA key
-            try:
-                algo = jwt.get_algorithm_by_name('RS256')
-                private_key = algo.prepare_key(key_pem)
-                private_jwk = json.loads(algo.to_jwk(private_key))
-                private_jwk['kid'] = kid
-                self.key = PyJWK.from_dict(private_jwk)
-            except jwt.exceptions.InvalidKeyError as err:
-                log.warning(
-                    'An error was encountered while loading the LTI platform\'s key. '
-                    'The RSA key could not be loaded.'
-                )
-                raise exceptions.InvalidRsaKey() from err
+            self.key, self._public_key, self._public_jwk = parsed_key_registry.get_or_parse(
+                f'platform_private_key:{algorithm}',
+                key_pem,
+                kid,
+                functools.partial(self._parse_private_key, algorithm=algorithm),
+            )
+
+    @staticmethod
+    def _parse_private_key(key_pem, kid, algorithm=LTI_1P3_DEFAULT_SIGNING_ALGORITHM):
+        """
+        Parse the platform private key.
+
+        Returns the private PyJWK along with the public key and public JWK derived
+        from it, which are used to validate tokens and export the keyset.
+        """
+        try:
+            algo = jwt.get_algorithm_by_name(algorithm)
+            private_key = algo.prepare_key(key_pem)
+            private_jwk = json.loads(algo.to_jwk(private_key))
+            private_jwk['kid'] = kid
+            public_key = private_key.public_key()
+            public_jwk = json.loads(algo.to_jwk(public_key))
+            public_jwk['kid'] = kid
+            public_jwk['alg'] = algorithm
+            return PyJWK.from_dict(private_jwk, algorithm=algorithm), public_key, public_jwk
+        except (NotImplementedError, ValueError, jwt.exceptions.PyJWTError) as err:
+            log.warning(
+                'An error was encountered while loading the LTI platform\'s key. '
+                'The %s key could not be loaded.',
+                algorithm,
+            )
+            raise exceptions.InvalidRsaKey() from err
 
     def encode_and_sign(self, message, expiration=None):
         """
@@ -167,7 +241,8 @@ class PlatformKeyHandler:
             )
             raise exceptions.RsaKeyNotSet()
 
-        _message = copy.deepcopy(message)
+        # Only top level claims are added, so a shallow copy leaves the message untouched.
+        _message = dict(message)
 
         # Set iat and exp if expiration is set
         if expiration:
@@ -177,8 +252,8 @@ class PlatformKeyHandler:
             })
 
         # The class instance that sets up the signing operation
-        # An RS 256 key is required for LTI 1.3
-        return jwt.encode(_message, self.key.key, algorithm="RS256", headers={"kid": self.key.key_id})
+        # LTI 1.3 requires RS256 support, other algorithms are only used with tools that accept them
+        return jwt.encode(_message, self.key.key, algorithm=self.algorithm, headers={"kid": self.key.key_id})
 
     def get_public_jwk(self):
         """
@@ -188,11 +263,8 @@ class PlatformKeyHandler:
 
         # Only append to keyset if a key exists
         if self.key:
-            algo_obj = jwt.get_algorithm_by_name('RS256')
-            public_key = algo_obj.prepare_key(self.key.key).public_key()
-            public_jwk = json.loads(algo_obj.to_jwk(public_key))
-            public_jwk['kid'] = self.key.key_id
-            jwk['keys'].append(public_jwk)
+            # Copy the parsed JWK, which is shared by every handler using this key.
+            jwk['keys'].append(dict(self._public_jwk))
         return jwk
 
     def validate_and_decode(self, token, iss=None, aud=None, exp=True):
@@ -207,10 +279,11 @@ class PlatformKeyHandler:
         try:
             message = jwt.decode(
                 token,
-                key=self.key.key.public_key(),
+                key=self._public_key,
                 audience=aud,
                 issuer=iss,
-                algorithms=['RS256', 'RS512'],
+                # RS512 tokens have always been accepted from RSA keys.
+                algorithms=['RS256', 'RS512'] if self.algorithm == 'RS256' else [self.algorithm],
                 options={
                     'verify_signature': True,
                     'verify_exp': bool(exp),
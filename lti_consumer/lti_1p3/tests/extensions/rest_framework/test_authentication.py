@@ -141,3 +141,4 @@ class TestLtiAuthentication(TestCase):
 
         # Check request
         self.assertEqual(mock_request.lti_consumer, self.lti_consumer)
+        self.assertEqual(mock_request.lti_token_contents['sub'], self.lti_consumer.client_id)
@@ -2,7 +2,7 @@
 Unit tests for LTI 1.3 consumer implementation
 """
 
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import ddt
 from Cryptodome.PublicKey import RSA
@@ -61,6 +61,9 @@ class TestLtiAuthentication(TestCase):
         # Create mock request
         self.mock_request = MagicMock()
         self.mock_request.lti_consumer = self.lti_consumer
+        # Token contents decoded by the authentication class, the token is decoded
+        # by the permission classes when they are not set.
+        self.mock_request.lti_token_contents = None
 
     def _make_token(self, scopes):
         """
@@ -118,6 +121,28 @@ class TestLtiAuthentication(TestCase):
             is_allowed,
         )
 
+    def test_uses_decoded_token_contents(self):
+        """
+        Test that the token contents decoded by the authentication class are used
+        instead of decoding the token again.
+        """
+        perm_class = LtiAgsPermissions()
+        mock_view = MagicMock()
+        mock_view.action = 'list'
+
+        token = self._make_token([])
+        self.mock_request.headers = {
+            "Authorization": f"Bearer {token}"
+        }
+        self.mock_request.lti_token_contents = {
+            "scopes": "https://purl.imsglobal.org/spec/lti-ags/scope/lineitem.readonly",
+        }
+
+        with patch.object(self.lti_consumer, 'decode_access_token') as decode_mock:
+            self.assertTrue(perm_class.has_permission(self.mock_request, mock_view))
+
+        decode_mock.assert_not_called()
+
     def test_lineitem_no_permissions(self):
         """
         Test if LineItem is readable when any of the allowed scopes is
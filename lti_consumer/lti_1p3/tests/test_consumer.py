@@ -10,6 +10,7 @@ import ddt
 import jwt
 from Cryptodome.PublicKey import RSA
 from django.conf import settings
+from django.test import override_settings
 from django.test.testcases import TestCase
 from edx_django_utils.cache import TieredCache, get_cache_key
 from jwt.api_jwk import PyJWKSet
@@ -32,6 +33,7 @@ from lti_consumer.lti_1p3.consumer import LtiAdvantageConsumer, LtiConsumer1p3,
 from lti_consumer.lti_1p3.deep_linking import LtiDeepLinking
 from lti_consumer.lti_1p3.exceptions import InvalidClaimValue, MissingRequiredClaim
 from lti_consumer.lti_1p3.nprs import LtiNrps
+from lti_consumer.lti_1p3.token_cache import reference_token_store
 
 # Variables required for testing and verification
 ISS = "http://test-platform.example/"
@@ -589,6 +591,54 @@ class TestLti1p3Consumer(TestCase):
             expected_data
         )
 
+    @patch('lti_consumer.lti_1p3.consumer.uuid.uuid5', wraps=uuid.uuid5)
+    def test_static_claims_compiled_once(self, mock_uuid5):
+        """
+        Check that the static launch claims are compiled once and shared with clones.
+        """
+        self._setup_lti_launch_data()
+        first_message = self.lti_consumer.clone().get_lti_launch_message()
+        second_message = self.lti_consumer.clone().get_lti_launch_message()
+
+        mock_uuid5.assert_called_once()
+        self.assertEqual(first_message, second_message)
+        self.assertIsNot(first_message, second_message)
+
+    def test_static_claims_recompiled_on_change(self):
+        """
+        Check that the static launch claims follow changes to the values they are built from.
+        """
+        self._setup_lti_launch_data()
+        self.lti_consumer.get_lti_launch_message()
+
+        self.lti_consumer.client_id = "2"
+        with override_settings(PLATFORM_NAME="Other platform"):
+            message = self.lti_consumer.get_lti_launch_message()
+
+        self.assertEqual(message["aud"], "2")
+        self.assertEqual(message["azp"], "2")
+        self.assertEqual(
+            message["https://purl.imsglobal.org/spec/lti/claim/tool_platform"]["name"],
+            "Other platform",
+        )
+
+    def test_launch_message_does_not_modify_static_claims(self):
+        """
+        Check that changes to a launch message don't leak into the following ones.
+        """
+        self._setup_lti_launch_data()
+        message = self.lti_consumer.get_lti_launch_message()
+        message["nonce"] = NONCE
+        message["https://purl.imsglobal.org/spec/lti/claim/message_type"] = "LtiDeepLinkingRequest"
+
+        message = self.lti_consumer.get_lti_launch_message()
+
+        self.assertNotIn("nonce", message)
+        self.assertEqual(
+            message["https://purl.imsglobal.org/spec/lti/claim/message_type"],
+            "LtiResourceLinkRequest",
+        )
+
     def test_access_token_missing_params(self):
         """
         Check if access token with missing request data raises.
@@ -654,6 +704,71 @@ class TestLti1p3Consumer(TestCase):
         # Check if token is valid
         self._decode_token(response.get('access_token'))
 
+    @override_settings(LTI_1P3_ACCESS_TOKEN_REUSE_ENABLED=True)
+    def test_access_token_reused(self):
+        """
+        Check that the same access token is returned for repeated grants when reuse is enabled,
+        while the tool's client assertion is still validated every time.
+        """
+        TieredCache.dangerous_clear_all_tiers()
+        token = self.lti_consumer.key_handler.encode_and_sign({"test": "test"}, expiration=1000)
+        request_data = _generate_token_request_data(token, "https://purl.imsglobal.org/spec/lti-ags/scope/score")
+
+        with patch.object(
+            self.lti_consumer.tool_jwt,
+            'validate_and_decode',
+            wraps=self.lti_consumer.tool_jwt.validate_and_decode,
+        ) as validate_mock:
+            first = self.lti_consumer.access_token(request_data)
+            second = self.lti_consumer.access_token(request_data)
+
+        self.assertEqual(first['access_token'], second['access_token'])
+        self.assertLessEqual(second['expires_in'], 3600)
+        self.assertEqual(second['scope'], 'https://purl.imsglobal.org/spec/lti-ags/scope/score')
+        self.assertEqual(validate_mock.call_count, 2)
+
+    @override_settings(LTI_1P3_REFERENCE_ACCESS_TOKENS_ENABLED=True)
+    def test_access_token_reference_token(self):
+        """
+        Check that an opaque reference token is returned and resolved without verifying a signature.
+        """
+        token = self.lti_consumer.key_handler.encode_and_sign({"test": "test"}, expiration=1000)
+        request_data = _generate_token_request_data(token, "https://purl.imsglobal.org/spec/lti-ags/scope/score")
+
+        access_token = self.lti_consumer.access_token(request_data)['access_token']
+
+        with patch.object(self.lti_consumer.key_handler, 'validate_and_decode') as validate_mock:
+            token_contents = self.lti_consumer.decode_access_token(access_token)
+            self.assertTrue(self.lti_consumer.check_token(
+                access_token,
+                ['https://purl.imsglobal.org/spec/lti-ags/scope/score'],
+            ))
+
+        validate_mock.assert_not_called()
+        self.assertNotIn('.', access_token)
+        self.assertEqual(token_contents['sub'], CLIENT_ID)
+        self.assertEqual(token_contents['iss'], ISS)
+
+    @ddt.data(
+        {"sub": "other-client", "iss": ISS},
+        {"sub": CLIENT_ID, "iss": "https://other-platform.example"},
+    )
+    def test_reference_token_issued_to_other_consumer(self, claims):
+        """
+        Check that reference tokens issued to another tool or platform are rejected.
+        """
+        access_token = reference_token_store.issue(dict(claims, scopes=""), expiration=3600)
+
+        with self.assertRaises(exceptions.UnauthorizedToken):
+            self.lti_consumer.decode_access_token(access_token)
+
+    def test_unknown_reference_token(self):
+        """
+        Check that unknown reference tokens are rejected.
+        """
+        with self.assertRaises(exceptions.UnauthorizedToken):
+            self.lti_consumer.decode_access_token('unknown')
+
     def test_check_token_no_scopes(self):
         """
         Test if `check_token` method returns True for a valid token without scopes.
@@ -684,6 +799,35 @@ class TestLti1p3Consumer(TestCase):
         })
         self.assertFalse(self.lti_consumer.check_token(token, ['123', ]))
 
+    def test_decode_access_token_cached(self):
+        """
+        Test that the signature of an access token is only verified the first time it's used.
+        """
+        TieredCache.dangerous_clear_all_tiers()
+        token = self.lti_consumer.key_handler.encode_and_sign({
+            "iss": ISS,
+            "scopes": "test",
+        }, expiration=3600)
+
+        with patch.object(
+            self.lti_consumer.key_handler,
+            'validate_and_decode',
+            wraps=self.lti_consumer.key_handler.validate_and_decode,
+        ) as validate_mock:
+            self.assertEqual(self.lti_consumer.decode_access_token(token)['scopes'], 'test')
+            self.assertTrue(self.lti_consumer.check_token(token, ['test']))
+
+        validate_mock.assert_called_once_with(token, iss=ISS)
+
+    def test_check_token_with_token_contents(self):
+        """
+        Test that `check_token` doesn't decode the token again when its contents are passed.
+        """
+        with patch.object(self.lti_consumer, 'decode_access_token') as decode_mock:
+            self.assertTrue(self.lti_consumer.check_token('token', ['test'], token_contents={'scopes': 'test'}))
+
+        decode_mock.assert_not_called()
+
     def test_extra_claim(self):
         """
         Check if extra claims are correctly added to the LTI message
@@ -849,6 +993,33 @@ class TestLtiAdvantageConsumer(TestCase):
             "return-url"
         )
 
+    def test_deep_linking_claim_compiled_once(self):
+        """
+        Check that the deep linking claim is compiled once and shared with clones.
+        """
+        self._setup_deep_linking()
+
+        with patch.object(LtiDeepLinking, 'get_lti_deep_linking_launch_claim') as mock_get_claim:
+            self.lti_consumer.clone().generate_launch_request(self.preflight_response)
+            self.lti_consumer.clone().generate_launch_request(self.preflight_response)
+
+        mock_get_claim.assert_not_called()
+
+    def test_deep_linking_claim_recompiled_when_enabled_again(self):
+        """
+        Check that enabling deep linking again replaces the compiled deep linking claim.
+        """
+        self._setup_deep_linking()
+        self.lti_consumer.enable_deep_linking(DEEP_LINK_LAUNCH_URL, "other-return-url")
+
+        token = self.lti_consumer.generate_launch_request(self.preflight_response)['id_token']
+
+        decoded_token = self.lti_consumer.key_handler.validate_and_decode(token)
+        self.assertEqual(
+            decoded_token['https://purl.imsglobal.org/spec/lti-dl/claim/deep_linking_settings']['deep_link_return_url'],
+            "other-return-url"
+        )
+
     def test_deep_linking_preflight_uses_deep_link_launch_url(self):
         """
         Ensure deep linking launches send the deep linking launch URL as target_link_uri during login initiation.
@@ -1130,7 +1301,7 @@ class TestLtiProctoringConsumer(TestCase):
         self.assertDictEqual(proctoring_acs_claims, expected_acs_claims)
 
     @ddt.data("LtiStartProctoring", "LtiEndAssessment")
-    @patch('lti_consumer.lti_1p3.consumer.get_data_from_cache')
+    @patch('lti_consumer.lti_1p3.consumer.get_lti_1p3_launch_data_from_message_hint')
     def test_generate_launch_request(self, message_type, mock_get_data_from_cache):
         """
         Ensures that the correct claims are included in LTI launch messages for the LtiStartProctoring and
@@ -1165,7 +1336,7 @@ class TestLtiProctoringConsumer(TestCase):
         for claim in expected_claims.items():
             self.assertIn(claim, decoded_token_claims)
 
-    @patch('lti_consumer.lti_1p3.consumer.get_data_from_cache')
+    @patch('lti_consumer.lti_1p3.consumer.get_lti_1p3_launch_data_from_message_hint')
     def test_generate_basic_launch_request(self, mock_get_data_from_cache):
         mock_launch_data = self.get_launch_data(message_type="LtiResourceLinkRequest")
         mock_get_data_from_cache.return_value = mock_launch_data
@@ -1178,7 +1349,7 @@ class TestLtiProctoringConsumer(TestCase):
         # just check token is valid
         self.lti_consumer.key_handler.validate_and_decode(token)
 
-    @patch('lti_consumer.lti_1p3.consumer.get_data_from_cache')
+    @patch('lti_consumer.lti_1p3.consumer.get_lti_1p3_launch_data_from_message_hint')
     def test_enable_assessment_control(self, mock_get_data_from_cache):
         """
         Ensure that the correct claims are included in LTI launch messages with an ACS url set.
@@ -1208,7 +1379,7 @@ class TestLtiProctoringConsumer(TestCase):
         for claim in expected_claims.items():
             self.assertIn(claim, decoded_token_claims)
 
-    @patch('lti_consumer.lti_1p3.consumer.get_data_from_cache')
+    @patch('lti_consumer.lti_1p3.consumer.get_lti_1p3_launch_data_from_message_hint')
     def test_generate_launch_request_invalid_message(self, mock_get_data_from_cache):
         """
         Ensures that a ValueError is raised if the launch_data.message_type is not LtiStartProctoring,
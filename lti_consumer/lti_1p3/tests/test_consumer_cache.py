@@ -0,0 +1,149 @@
+"""
+Unit tests for the LTI 1.3 consumer cache
+"""
+from unittest.mock import Mock, patch
+
+from Cryptodome.PublicKey import RSA
+from django.test import override_settings
+from django.test.testcases import TestCase
+from edx_django_utils.cache import TieredCache
+
+from lti_consumer.lti_1p3.consumer import LtiAdvantageConsumer, LtiProctoringConsumer
+from lti_consumer.lti_1p3.consumer_cache import ConsumerTemplateCache
+
+RSA_KEY = RSA.generate(2048).export_key('PEM')
+
+
+def make_consumer(consumer_class=LtiAdvantageConsumer):
+    """
+    Return a consumer set up like the ones built from LTI configurations.
+    """
+    consumer = consumer_class(
+        iss='https://platform.example',
+        lti_oidc_url='https://tool.example/oidc',
+        lti_launch_url='https://tool.example/launch',
+        client_id='1',
+        deployment_id='1',
+        rsa_key=RSA_KEY,
+        rsa_key_id='1',
+        redirect_uris=['https://tool.example/launch'],
+    )
+    if consumer_class is LtiAdvantageConsumer:
+        consumer.enable_nrps('https://platform.example/memberships')
+    return consumer
+
+
+class TestConsumerTemplateCache(TestCase):
+    """
+    Unit tests for ConsumerTemplateCache
+    """
+    def setUp(self):
+        super().setUp()
+        TieredCache.dangerous_clear_all_tiers()
+        self.cache = ConsumerTemplateCache()
+        self.build = Mock(side_effect=make_consumer)
+
+    def test_consumer_built_once(self):
+        """
+        Check that the consumer of a configuration is only built once, and that clones are returned.
+        """
+        first = self.cache.get_or_build('config', self.build)
+        second = self.cache.get_or_build('config', self.build)
+
+        self.build.assert_called_once_with()
+        self.assertIsNot(first, second)
+        self.assertIs(first.key_handler, second.key_handler)
+        self.assertEqual(self.cache.get_stats(), {'hits': 1, 'misses': 1, 'size': 1})
+
+    def test_invalidate(self):
+        """
+        Check that invalidated configurations are built again, and others aren't.
+        """
+        self.cache.get_or_build('config', self.build)
+        self.cache.get_or_build('other-config', self.build)
+
+        self.cache.invalidate('config')
+        self.cache.get_or_build('config', self.build)
+        self.cache.get_or_build('other-config', self.build)
+
+        self.assertEqual(self.build.call_count, 3)
+
+    def test_version_stamp_shared(self):
+        """
+        Check that the version stamp is shared through the cache, so invalidations reach every process.
+        """
+        other_process_cache = ConsumerTemplateCache()
+        version_stamp = self.cache.get_version_stamp('config')
+
+        self.assertEqual(other_process_cache.get_version_stamp('config'), version_stamp)
+        other_process_cache.invalidate('config')
+        self.assertNotEqual(self.cache.get_version_stamp('config'), version_stamp)
+
+    def test_expired_template(self):
+        """
+        Check that templates are built again once their TTL has passed.
+        """
+        with patch('lti_consumer.lti_1p3.consumer_cache.time.time', return_value=1000):
+            self.cache.get_or_build('config', self.build)
+        with patch('lti_consumer.lti_1p3.consumer_cache.time.time', return_value=1000 + self.cache.ttl):
+            self.cache.get_or_build('config', self.build)
+
+        self.assertEqual(self.build.call_count, 2)
+
+    @override_settings(LTI_1P3_CONSUMER_CACHE_MAX_ENTRIES=1)
+    def test_max_entries(self):
+        """
+        Check that the least recently used templates are evicted.
+        """
+        self.cache.get_or_build('config', self.build)
+        self.cache.get_or_build('other-config', self.build)
+        self.cache.get_or_build('config', self.build)
+
+        self.assertEqual(self.build.call_count, 3)
+        self.assertEqual(self.cache.get_stats()['size'], 1)
+
+    @override_settings(LTI_1P3_CONSUMER_CACHE_MAX_ENTRIES=0)
+    def test_cache_disabled(self):
+        """
+        Check that consumers are built every time when the cache is disabled.
+        """
+        self.cache.get_or_build('config', self.build)
+        self.cache.get_or_build('config', self.build)
+
+        self.assertEqual(self.build.call_count, 2)
+
+    def test_build_error_not_cached(self):
+        """
+        Check that failed builds aren't cached.
+        """
+        self.build.side_effect = NotImplementedError
+
+        for _ in range(2):
+            with self.assertRaises(NotImplementedError):
+                self.cache.get_or_build('config', self.build)
+
+        self.assertEqual(self.build.call_count, 2)
+
+    def test_clones_dont_share_request_claims(self):
+        """
+        Check that claims set on a clone don't leak into the template or other clones.
+        """
+        first = self.cache.get_or_build('config', self.build)
+        first.set_extra_claim({'extra': 'claim'})
+        first.set_user_data('1', 'student')
+
+        second = self.cache.get_or_build('config', self.build)
+
+        self.assertNotIn('extra', second.extra_claims)
+        self.assertIn('https://purl.imsglobal.org/spec/lti-nrps/claim/namesroleservice', second.extra_claims)
+        self.assertIsNone(second.lti_claim_user_data)
+
+    def test_proctoring_clones_dont_share_proctoring_data(self):
+        """
+        Check that proctoring data set on a clone doesn't leak into other clones.
+        """
+        self.build.side_effect = lambda: make_consumer(LtiProctoringConsumer)
+
+        self.cache.get_or_build('config', self.build).set_proctoring_data(attempt_number=2)
+
+        self.assertEqual(self.cache.get_or_build('config', self.build).proctoring_data, {})
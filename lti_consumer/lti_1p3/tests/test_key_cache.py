@@ -0,0 +1,194 @@
+"""
+Unit tests for LTI 1.3 key caches
+"""
+import json
+from unittest.mock import Mock, patch
+
+import jwt
+from Cryptodome.PublicKey import RSA
+from django.test import override_settings
+from django.test.testcases import TestCase
+from edx_django_utils.cache import TieredCache
+
+from lti_consumer.lti_1p3 import exceptions
+from lti_consumer.lti_1p3.key_cache import ParsedKeyRegistry, ToolKeysetCache
+
+
+def _generate_jwks(*kids):
+    """
+    Generate a JWKS document with one public RSA key per key id.
+    """
+    algo_obj = jwt.get_algorithm_by_name('RS256')
+    keys = []
+    for kid in kids:
+        public_key = algo_obj.prepare_key(RSA.generate(2048).publickey().export_key())
+        public_jwk = json.loads(algo_obj.to_jwk(public_key))
+        public_jwk['kid'] = kid
+        keys.append(public_jwk)
+    return {'keys': keys}
+
+
+class TestToolKeysetCache(TestCase):
+    """
+    Unit tests for ToolKeysetCache
+    """
+    def setUp(self):
+        super().setUp()
+        TieredCache.dangerous_clear_all_tiers()
+        self.cache = ToolKeysetCache()
+        self.jwks = _generate_jwks('1', '2')
+
+        fetch_patcher = patch('jwt.PyJWKClient.fetch_data', return_value=self.jwks)
+        self.fetch_data = fetch_patcher.start()
+        self.addCleanup(fetch_patcher.stop)
+
+    def test_keyset_fetched_once(self):
+        """
+        Check that the keyset URL is only fetched on the first access.
+        """
+        keys = self.cache.get_keys('https://tool.example/jwks')
+        self.cache.get_keys('https://tool.example/jwks')
+
+        self.assertEqual([key.key_id for key in keys], ['1', '2'])
+        self.fetch_data.assert_called_once()
+
+    def test_keyset_shared_between_processes(self):
+        """
+        Check that a keyset fetched by another worker is reused from the Django cache.
+        """
+        self.cache.get_keys('https://tool.example/jwks')
+        ToolKeysetCache().get_keys('https://tool.example/jwks')
+
+        self.fetch_data.assert_called_once()
+
+    @override_settings(LTI_1P3_TOOL_JWKS_CACHE_TTL=-1)
+    def test_keyset_expired(self):
+        """
+        Check that an expired keyset is fetched again.
+        """
+        self.cache.get_keys('https://tool.example/jwks')
+        self.cache.get_keys('https://tool.example/jwks')
+
+        self.assertEqual(self.fetch_data.call_count, 2)
+
+    @override_settings(LTI_1P3_TOOL_JWKS_MIN_REFRESH_INTERVAL=0)
+    def test_force_refresh(self):
+        """
+        Check that a forced refresh fetches the keyset again.
+        """
+        self.cache.get_keys('https://tool.example/jwks')
+        self.fetch_data.return_value = _generate_jwks('3')
+
+        keys = self.cache.get_keys('https://tool.example/jwks', force_refresh=True)
+
+        self.assertEqual([key.key_id for key in keys], ['3'])
+        self.assertEqual(self.fetch_data.call_count, 2)
+
+    def test_force_refresh_rate_limited(self):
+        """
+        Check that a keyset is not refreshed again right after being fetched.
+        """
+        self.cache.get_keys('https://tool.example/jwks')
+        self.cache.get_keys('https://tool.example/jwks', force_refresh=True)
+
+        self.fetch_data.assert_called_once()
+
+    @override_settings(LTI_1P3_TOOL_JWKS_CACHE_MAX_ENTRIES=1)
+    def test_eviction(self):
+        """
+        Check that the least recently used keysets are evicted from the process cache.
+        """
+        self.cache.get_keys('https://tool.example/jwks')
+        self.cache.get_keys('https://other-tool.example/jwks')
+        TieredCache.dangerous_clear_all_tiers()
+
+        self.cache.get_keys('https://tool.example/jwks')
+
+        self.assertEqual(self.fetch_data.call_count, 3)
+
+    def test_fetch_error(self):
+        """
+        Check that an error is raised when the keyset can't be fetched.
+        """
+        self.fetch_data.side_effect = jwt.exceptions.PyJWKClientConnectionError
+
+        with self.assertRaises(exceptions.NoSuitableKeys):
+            self.cache.get_keys('https://tool.example/jwks')
+
+    def test_invalid_keyset(self):
+        """
+        Check that an error is raised and nothing is cached when the keyset is invalid.
+        """
+        self.fetch_data.return_value = {'keys': []}
+
+        with self.assertRaises(exceptions.NoSuitableKeys):
+            self.cache.get_keys('https://tool.example/jwks')
+
+        self.fetch_data.return_value = self.jwks
+        self.cache.get_keys('https://tool.example/jwks')
+        self.assertEqual(self.fetch_data.call_count, 2)
+
+
+class TestParsedKeyRegistry(TestCase):
+    """
+    Unit tests for ParsedKeyRegistry
+    """
+    def setUp(self):
+        super().setUp()
+        self.registry = ParsedKeyRegistry()
+        self.parse = Mock(side_effect=lambda key_material, kid: (key_material, kid))
+
+    def test_get_or_parse(self):
+        """
+        Check that keys are only parsed once and that hits and misses are counted.
+        """
+        first = self.registry.get_or_parse('kind', 'key', '1', self.parse)
+        second = self.registry.get_or_parse('kind', b'key', '1', self.parse)
+
+        self.assertIs(first, second)
+        self.parse.assert_called_once_with(b'key', '1')
+        self.assertEqual(self.registry.get_stats(), {'hits': 1, 'misses': 1, 'size': 1})
+
+    def test_different_kid_or_contents(self):
+        """
+        Check that keys with different key ids or contents are parsed separately.
+        """
+        self.registry.get_or_parse('kind', 'key', '1', self.parse)
+        self.registry.get_or_parse('kind', 'key', '2', self.parse)
+        self.registry.get_or_parse('kind', 'other-key', '1', self.parse)
+        self.registry.get_or_parse('other-kind', 'key', '1', self.parse)
+
+        self.assertEqual(self.parse.call_count, 4)
+        self.assertEqual(self.registry.get_stats(), {'hits': 0, 'misses': 4, 'size': 4})
+
+    @override_settings(LTI_1P3_PARSED_KEY_REGISTRY_MAX_ENTRIES=1)
+    def test_eviction(self):
+        """
+        Check that the least recently used keys are evicted.
+        """
+        self.registry.get_or_parse('kind', 'key', '1', self.parse)
+        self.registry.get_or_parse('kind', 'other-key', '1', self.parse)
+        self.registry.get_or_parse('kind', 'key', '1', self.parse)
+
+        self.assertEqual(self.registry.get_stats(), {'hits': 0, 'misses': 3, 'size': 1})
+
+    def test_parse_errors_not_cached(self):
+        """
+        Check that keys failing to parse are not stored.
+        """
+        self.parse.side_effect = exceptions.InvalidRsaKey
+
+        for _ in range(2):
+            with self.assertRaises(exceptions.InvalidRsaKey):
+                self.registry.get_or_parse('kind', 'key', '1', self.parse)
+
+        self.assertEqual(self.registry.get_stats(), {'hits': 0, 'misses': 2, 'size': 0})
+
+    def test_clear(self):
+        """
+        Check that clearing the registry drops keys and counters.
+        """
+        self.registry.get_or_parse('kind', 'key', '1', self.parse)
+        self.registry.clear()
+
+        self.assertEqual(self.registry.get_stats(), {'hits': 0, 'misses': 0, 'size': 0})
@@ -2,6 +2,7 @@
 Unit tests for LTI 1.3 consumer implementation
 """
 
+import base64
 import json
 import math
 import time
@@ -10,12 +11,15 @@ from unittest.mock import patch
 
 import ddt
 import jwt
-from Cryptodome.PublicKey import RSA
+from Cryptodome.PublicKey import ECC, RSA
 from cryptography.hazmat.primitives import serialization
+from django.test import override_settings
 from django.test.testcases import TestCase
+from edx_django_utils.cache import TieredCache
 from jwt.api_jwk import PyJWK
 
 from lti_consumer.lti_1p3 import exceptions
+from lti_consumer.lti_1p3.key_cache import parsed_key_registry, tool_keyset_cache
 from lti_consumer.lti_1p3.key_handlers import PlatformKeyHandler, ToolKeyHandler
 
 from .utils import create_jwt
@@ -88,6 +92,33 @@ class TestPlatformKeyHandler(TestCase):
             }
         )
 
+    def test_key_parsed_once(self):
+        """
+        Check that handlers using the same key reuse the parsed key from the registry.
+        """
+        parsed_key_registry.clear()
+
+        key_handlers = [PlatformKeyHandler(key_pem=self.rsa_key, kid=self.rsa_key_id) for _ in range(3)]
+
+        self.assertEqual(parsed_key_registry.get_stats(), {'hits': 2, 'misses': 1, 'size': 1})
+        self.assertIs(key_handlers[0].key, key_handlers[2].key)
+        self.assertEqual(key_handlers[0].get_public_jwk(), self.key_handler.get_public_jwk())
+
+    def test_get_public_jwk(self):
+        """
+        Check that the public JWK matches the private key and can't alter the parsed key.
+        """
+        public_jwk = self.key_handler.get_public_jwk()
+        public_jwk['keys'][0]['kid'] = 'changed'
+
+        public_jwk = self.key_handler.get_public_jwk()
+        self.assertEqual(public_jwk['keys'][0]['kid'], self.rsa_key_id)
+        self.assertNotIn('d', public_jwk['keys'][0])
+        self.assertEqual(
+            PyJWK.from_dict(public_jwk['keys'][0]).key.public_numbers(),
+            self.key_handler.key.key.public_key().public_numbers(),
+        )
+
     def test_invalid_rsa_key(self):
         """
         Check that class raises when trying to import invalid RSA Key.
@@ -111,6 +142,45 @@ class TestPlatformKeyHandler(TestCase):
             {'keys': []}
         )
 
+    def test_es256_key(self):
+        """
+        Check that tokens are signed with ES256 and the public JWK is exported when using an EC key.
+        """
+        ec_key = ECC.generate(curve='P-256').export_key(format='PEM')
+        key_handler = PlatformKeyHandler(key_pem=ec_key, kid=self.rsa_key_id, algorithm='ES256')
+
+        signed_token = key_handler.encode_and_sign({"test": "test"})
+        public_jwk = key_handler.get_public_jwk()['keys'][0]
+
+        self.assertEqual(jwt.get_unverified_header(signed_token)['alg'], 'ES256')
+        self.assertEqual(key_handler.validate_and_decode(signed_token, exp=False), {"test": "test"})
+        self.assertEqual(
+            {key: public_jwk[key] for key in ('kty', 'crv', 'alg', 'kid')},
+            {'kty': 'EC', 'crv': 'P-256', 'alg': 'ES256', 'kid': self.rsa_key_id},
+        )
+        self.assertNotIn('d', public_jwk)
+        self.assertEqual(
+            jwt.decode(signed_token, PyJWK.from_dict(public_jwk).key, algorithms=['ES256']),
+            {"test": "test"},
+        )
+
+    def test_es256_rejects_rsa_signed_tokens(self):
+        """
+        Check that a handler signing with ES256 doesn't accept tokens signed with another algorithm.
+        """
+        ec_key = ECC.generate(curve='P-256').export_key(format='PEM')
+        key_handler = PlatformKeyHandler(key_pem=ec_key, kid=self.rsa_key_id, algorithm='ES256')
+
+        with self.assertRaises(jwt.InvalidTokenError):
+            key_handler.validate_and_decode(self.key_handler.encode_and_sign({}))
+
+    def test_key_not_matching_algorithm(self):
+        """
+        Check that class raises when the key can't be used with the algorithm.
+        """
+        with self.assertRaises(exceptions.InvalidRsaKey):
+            PlatformKeyHandler(key_pem=self.rsa_key, algorithm='ES256')
+
     def test_validate_and_decode(self):
         """
         Test validate and decode with all parameters.
@@ -202,10 +272,23 @@ class TestToolKeyHandler(TestCase):
         self.key = PyJWK.from_dict(private_jwk)
 
         self.public_key = rsa_key.publickey().export_key()
+        public_jwk = json.loads(algo_obj.to_jwk(algo_obj.prepare_key(self.public_key)))
+        public_jwk['kid'] = self.rsa_key_id
+        self.public_jwks = {'keys': [public_jwk]}
 
         # Key handler
         self.key_handler = None
 
+        tool_keyset_cache.clear()
+        TieredCache.dangerous_clear_all_tiers()
+
+    def _generate_public_jwk(self):
+        """
+        Generate a public JWK from a new RSA key.
+        """
+        algo_obj = jwt.get_algorithm_by_name('RS256')
+        return json.loads(algo_obj.to_jwk(algo_obj.prepare_key(RSA.generate(2048).publickey().export_key())))
+
     def _setup_key_handler(self):
         """
         Set up a instance of the key handler.
@@ -305,3 +388,140 @@ class TestToolKeyHandler(TestCase):
         # Decode and check results
         with self.assertRaises(exceptions.NoSuitableKeys):
             key_handler.validate_and_decode(signed)
+
+    @patch('jwt.PyJWKClient.fetch_data')
+    def test_validate_and_decode_with_keyset_url(self, fetch_data):
+        """
+        Check that the tool keyset is only fetched once across handler instances.
+        """
+        fetch_data.return_value = self.public_jwks
+        message = {
+            "test": "test_message",
+            "exp": int(math.floor(time.time()) + 1000),
+        }
+        signed = jwt.encode(message, self.key.key, algorithm='RS256', headers={'kid': self.rsa_key_id})
+
+        for _ in range(2):
+            key_handler = ToolKeyHandler(keyset_url='https://tool.example/jwks')
+            self.assertEqual(key_handler.validate_and_decode(signed), message)
+
+        fetch_data.assert_called_once()
+
+    @override_settings(LTI_1P3_TOOL_JWKS_MIN_REFRESH_INTERVAL=0)
+    @patch('jwt.PyJWKClient.fetch_data')
+    def test_validate_and_decode_unknown_kid_refreshes_keyset(self, fetch_data):
+        """
+        Check that the tool keyset is fetched again when the token is signed with an unknown key.
+        """
+        old_jwks = {'keys': [dict(self.public_jwks['keys'][0], kid='old')]}
+        fetch_data.side_effect = [old_jwks, self.public_jwks]
+        message = {
+            "test": "test_message",
+            "exp": int(math.floor(time.time()) + 1000),
+        }
+        key_handler = ToolKeyHandler(keyset_url='https://tool.example/jwks')
+        key_handler.validate_and_decode(create_jwt(self.key, message))
+
+        signed = jwt.encode(message, self.key.key, algorithm='RS256', headers={'kid': self.rsa_key_id})
+
+        self.assertEqual(key_handler.validate_and_decode(signed), message)
+        self.assertEqual(fetch_data.call_count, 2)
+
+    @patch('jwt.PyJWKClient.fetch_data')
+    def test_validate_and_decode_uses_kid(self, fetch_data):
+        """
+        Check that only the key matching the token key id is used to verify it.
+        """
+        other_jwk = self._generate_public_jwk()
+        fetch_data.return_value = {'keys': [dict(other_jwk, kid=str(kid)) for kid in range(2, 6)] +
+                                   self.public_jwks['keys']}
+        message = {
+            "test": "test_message",
+            "exp": int(math.floor(time.time()) + 1000),
+        }
+        signed = jwt.encode(message, self.key.key, algorithm='RS256', headers={'kid': self.rsa_key_id})
+        key_handler = ToolKeyHandler(keyset_url='https://tool.example/jwks')
+
+        with patch('jwt.decode', wraps=jwt.decode) as decode:
+            self.assertEqual(key_handler.validate_and_decode(signed), message)
+
+        decode.assert_called_once()
+
+    @patch('jwt.PyJWKClient.fetch_data')
+    def test_validate_and_decode_without_kid(self, fetch_data):
+        """
+        Check that tokens without a key id are checked against every key.
+        """
+        other_jwk = self._generate_public_jwk()
+        fetch_data.return_value = {'keys': [dict(other_jwk, kid='2')] + self.public_jwks['keys']}
+        message = {
+            "test": "test_message",
+            "exp": int(math.floor(time.time()) + 1000),
+        }
+        key_handler = ToolKeyHandler(keyset_url='https://tool.example/jwks')
+
+        with patch('jwt.decode', wraps=jwt.decode) as decode:
+            self.assertEqual(key_handler.validate_and_decode(create_jwt(self.key, message)), message)
+
+        self.assertEqual(decode.call_count, 2)
+
+    def test_validate_and_decode_public_key_with_kid(self):
+        """
+        Check that tokens with a key id are checked against the tool public key, which has no key id.
+        """
+        self._setup_key_handler()
+        message = {
+            "test": "test_message",
+            "exp": int(math.floor(time.time()) + 1000),
+        }
+        signed = jwt.encode(message, self.key.key, algorithm='RS256', headers={'kid': 'unknown'})
+
+        self.assertEqual(self.key_handler.validate_and_decode(signed), message)
+
+    @patch('jwt.PyJWKClient.fetch_data')
+    def test_validate_and_decode_unknown_kid(self, fetch_data):
+        """
+        Check that the validate and decode raises when no key matches the token key id.
+        """
+        fetch_data.return_value = self.public_jwks
+        message = {
+            "test": "test_message",
+            "exp": int(math.floor(time.time()) + 1000),
+        }
+        signed = jwt.encode(message, self.key.key, algorithm='RS256', headers={'kid': 'unknown'})
+        key_handler = ToolKeyHandler(keyset_url='https://tool.example/jwks')
+
+        with self.assertRaises(exceptions.NoSuitableKeys):
+            key_handler.validate_and_decode(signed)
+
+    @patch('jwt.PyJWKClient.fetch_data')
+    def test_validate_and_decode_unknown_kid_with_kidless_keys(self, fetch_data):
+        """
+        Check that the keyset keys without a key id are used when no key matches the token key id.
+        """
+        other_jwk = self._generate_public_jwk()
+        kidless_jwk = {name: value for name, value in self.public_jwks['keys'][0].items() if name != 'kid'}
+        fetch_data.return_value = {'keys': [dict(other_jwk, kid='2'), kidless_jwk]}
+        message = {
+            "test": "test_message",
+            "exp": int(math.floor(time.time()) + 1000),
+        }
+        signed = jwt.encode(message, self.key.key, algorithm='RS256', headers={'kid': 'unknown'})
+        key_handler = ToolKeyHandler(keyset_url='https://tool.example/jwks')
+
+        with patch('jwt.decode', wraps=jwt.decode) as decode:
+            self.assertEqual(key_handler.validate_and_decode(signed), message)
+
+        decode.assert_called_once()
+
+    @ddt.data(1, ['1'], {'kid': '1'})
+    def test_validate_and_decode_non_string_kid(self, kid):
+        """
+        Check that tokens whose key id isn't a string are rejected as malformed.
+        """
+        self._setup_key_handler()
+        header = base64.urlsafe_b64encode(json.dumps({'alg': 'RS256', 'typ': 'JWT', 'kid': kid}).encode())
+        signed = header.rstrip(b'=').decode() + '.e30.c2lnbmF0dXJl'
+
+        with self.assertRaises(exceptions.MalformedJwtToken):
+            self.key_handler.validate_and_decode(signed)
@@ -0,0 +1,250 @@
+"""
+Unit tests for LTI 1.3 access token caches
+"""
+import time
+from unittest.mock import Mock, patch
+
+from django.test import override_settings
+from django.test.testcases import TestCase
+from edx_django_utils.cache import TieredCache
+
+from lti_consumer.lti_1p3 import exceptions
+from lti_consumer.lti_1p3.token_cache import AccessTokenReuseCache, ReferenceTokenStore, VerifiedTokenCache
+
+
+class TestVerifiedTokenCache(TestCase):
+    """
+    Unit tests for VerifiedTokenCache
+    """
+    def setUp(self):
+        super().setUp()
+        TieredCache.dangerous_clear_all_tiers()
+        self.cache = VerifiedTokenCache()
+        self.claims = {'iss': 'https://platform.example', 'scopes': '', 'exp': int(time.time()) + 3600}
+        self.verify = Mock(side_effect=lambda token: dict(self.claims))
+
+    def test_token_verified_once(self):
+        """
+        Check that a token is only verified the first time it's used.
+        """
+        first = self.cache.get_or_verify('token', 'iss', 'kid', self.verify)
+        second = self.cache.get_or_verify('token', 'iss', 'kid', self.verify)
+
+        self.assertEqual(first, self.claims)
+        self.assertEqual(second, self.claims)
+        self.verify.assert_called_once_with('token')
+
+    def test_different_tokens_and_keys(self):
+        """
+        Check that different tokens, issuers and key ids are verified separately.
+        """
+        self.cache.get_or_verify('token', 'iss', 'kid', self.verify)
+        self.cache.get_or_verify('other-token', 'iss', 'kid', self.verify)
+        self.cache.get_or_verify('token', 'other-iss', 'kid', self.verify)
+        self.cache.get_or_verify('token', 'iss', 'rotated-kid', self.verify)
+
+        self.assertEqual(self.verify.call_count, 4)
+
+    def test_expired_token_not_cached(self):
+        """
+        Check that tokens that are already expired are verified every time.
+        """
+        self.claims['exp'] = int(time.time()) - 1
+
+        self.cache.get_or_verify('token', 'iss', 'kid', self.verify)
+        self.cache.get_or_verify('token', 'iss', 'kid', self.verify)
+
+        self.assertEqual(self.verify.call_count, 2)
+
+    def test_token_without_exp_not_cached(self):
+        """
+        Check that tokens without an expiration are verified every time.
+        """
+        del self.claims['exp']
+
+        self.cache.get_or_verify('token', 'iss', 'kid', self.verify)
+        self.cache.get_or_verify('token', 'iss', 'kid', self.verify)
+
+        self.assertEqual(self.verify.call_count, 2)
+
+    def test_token_expired_while_cached(self):
+        """
+        Check that cached claims aren't returned once the token has expired.
+        """
+        self.cache.get_or_verify('token', 'iss', 'kid', self.verify)
+
+        cache_key = self.cache._get_cache_key(  # pylint: disable=protected-access
+            self.cache.get_token_digest('token'), 'iss', 'kid',
+        )
+        cached = TieredCache.get_cached_response(cache_key).value
+        cached['exp'] = time.time() - 1
+        TieredCache.set_all_tiers(cache_key, cached)
+
+        self.cache.get_or_verify('token', 'iss', 'kid', self.verify)
+
+        self.assertEqual(self.verify.call_count, 2)
+
+    def test_invalid_token_not_cached(self):
+        """
+        Check that tokens failing verification aren't cached.
+        """
+        self.verify.side_effect = exceptions.BadJwtSignature
+
+        for _ in range(2):
+            with self.assertRaises(exceptions.BadJwtSignature):
+                self.cache.get_or_verify('token', 'iss', 'kid', self.verify)
+
+        self.assertEqual(self.verify.call_count, 2)
+
+    @override_settings(LTI_1P3_VERIFIED_TOKEN_CACHE_MAX_TTL=0)
+    def test_cache_disabled(self):
+        """
+        Check that tokens are verified every time when the cache is disabled.
+        """
+        self.cache.get_or_verify('token', 'iss', 'kid', self.verify)
+        self.cache.get_or_verify('token', 'iss', 'kid', self.verify)
+
+        self.assertEqual(self.verify.call_count, 2)
+
+    def test_cached_claims_not_shared(self):
+        """
+        Check that changing returned claims doesn't change the cached claims.
+        """
+        self.cache.get_or_verify('token', 'iss', 'kid', self.verify)['scopes'] = 'changed'
+
+        self.assertEqual(self.cache.get_or_verify('token', 'iss', 'kid', self.verify)['scopes'], '')
+
+
+@override_settings(LTI_1P3_ACCESS_TOKEN_REUSE_ENABLED=True)
+class TestAccessTokenReuseCache(TestCase):
+    """
+    Unit tests for AccessTokenReuseCache
+    """
+    def setUp(self):
+        super().setUp()
+        TieredCache.dangerous_clear_all_tiers()
+        self.cache = AccessTokenReuseCache()
+        self.mint = Mock(side_effect=['token-1', 'token-2', 'token-3'])
+
+    def test_token_reused(self):
+        """
+        Check that a token is reused for the same client and scopes, whatever their order.
+        """
+        first = self.cache.get_or_mint('iss', 'client', 'kid', ['a', 'b'], 3600, self.mint)
+        second = self.cache.get_or_mint('iss', 'client', 'kid', ['b', 'a'], 3600, self.mint)
+
+        self.assertEqual(first, ('token-1', 3600))
+        self.assertEqual(second[0], 'token-1')
+        self.assertLessEqual(second[1], 3600)
+        self.mint.assert_called_once_with()
+        self.assertEqual(self.cache.get_stats(), {'reused': 1, 'minted': 1, 'reuse_rate': 0.5})
+
+    def test_different_grants(self):
+        """
+        Check that tokens aren't shared between clients, scope sets or platform keys.
+        """
+        self.cache.get_or_mint('iss', 'client', 'kid', ['a'], 3600, self.mint)
+        self.cache.get_or_mint('iss', 'other-client', 'kid', ['a'], 3600, self.mint)
+        self.cache.get_or_mint('iss', 'client', 'kid', ['a', 'b'], 3600, self.mint)
+
+        self.assertEqual(self.mint.call_count, 3)
+        self.assertEqual(self.cache.get_stats()['reused'], 0)
+
+    def test_token_not_reused_after_fraction(self):
+        """
+        Check that a new token is minted once the reuse fraction of the lifetime has passed.
+        """
+        with patch('lti_consumer.lti_1p3.token_cache.time.time', return_value=1000):
+            self.cache.get_or_mint('iss', 'client', 'kid', ['a'], 3600, self.mint)
+        with patch('lti_consumer.lti_1p3.token_cache.time.time', return_value=1000 + 1799):
+            reused = self.cache.get_or_mint('iss', 'client', 'kid', ['a'], 3600, self.mint)
+        with patch('lti_consumer.lti_1p3.token_cache.time.time', return_value=1000 + 1800):
+            minted = self.cache.get_or_mint('iss', 'client', 'kid', ['a'], 3600, self.mint)
+
+        self.assertEqual(reused, ('token-1', 1801))
+        self.assertEqual(minted, ('token-2', 3600))
+
+    @override_settings(LTI_1P3_ACCESS_TOKEN_REUSE_ENABLED=False)
+    def test_reuse_disabled(self):
+        """
+        Check that a new token is minted for every grant when reuse is disabled.
+        """
+        self.cache.get_or_mint('iss', 'client', 'kid', ['a'], 3600, self.mint)
+        self.cache.get_or_mint('iss', 'client', 'kid', ['a'], 3600, self.mint)
+
+        self.assertEqual(self.mint.call_count, 2)
+
+    @patch('lti_consumer.lti_1p3.token_cache.set_custom_attribute')
+    def test_reuse_reported(self, set_custom_attribute_mock):
+        """
+        Check that reuses are reported to the monitoring tool.
+        """
+        self.cache.get_or_mint('iss', 'client', 'kid', ['a'], 3600, self.mint)
+        self.cache.get_or_mint('iss', 'client', 'kid', ['a'], 3600, self.mint)
+
+        self.assertEqual(
+            [call.args for call in set_custom_attribute_mock.call_args_list],
+            [('lti_access_token_reused', False), ('lti_access_token_reused', True)],
+        )
+
+    def test_clear_stats(self):
+        """
+        Check that the counters can be reset.
+        """
+        self.cache.get_or_mint('iss', 'client', 'kid', ['a'], 3600, self.mint)
+        self.cache.clear_stats()
+
+        self.assertEqual(self.cache.get_stats(), {'reused': 0, 'minted': 0, 'reuse_rate': 0.0})
+
+
+class TestReferenceTokenStore(TestCase):
+    """
+    Unit tests for ReferenceTokenStore
+    """
+    def setUp(self):
+        super().setUp()
+        TieredCache.dangerous_clear_all_tiers()
+        self.store = ReferenceTokenStore()
+
+    def test_issue_and_resolve(self):
+        """
+        Check that issued tokens resolve to their claims, with iat and exp set.
+        """
+        token = self.store.issue({'sub': 'client', 'scopes': 'a'}, expiration=3600)
+
+        claims = self.store.resolve(token)
+
+        self.assertTrue(self.store.is_reference_token(token))
+        self.assertEqual(claims['sub'], 'client')
+        self.assertEqual(claims['scopes'], 'a')
+        self.assertEqual(claims['exp'] - claims['iat'], 3600)
+
+    def test_tokens_are_unique(self):
+        """
+        Check that a different token is issued every time.
+        """
+        self.assertNotEqual(
+            self.store.issue({'sub': 'client'}, expiration=3600),
+            self.store.issue({'sub': 'client'}, expiration=3600),
+        )
+
+    def test_unknown_token(self):
+        """
+        Check that unknown tokens don't resolve.
+        """
+        self.assertIsNone(self.store.resolve('unknown'))
+
+    def test_expired_token(self):
+        """
+        Check that expired tokens don't resolve.
+        """
+        with patch('lti_consumer.lti_1p3.token_cache.time.time', return_value=1000):
+            token = self.store.issue({'sub': 'client'}, expiration=3600)
+        with patch('lti_consumer.lti_1p3.token_cache.time.time', return_value=1000 + 3600):
+            self.assertIsNone(self.store.resolve(token))
+
+    def test_is_reference_token(self):
+        """
+        Check that JWTs aren't mistaken for reference tokens.
+        """
+        self.assertFalse(self.store.is_reference_token('header.payload.signature'))
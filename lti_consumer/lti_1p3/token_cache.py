@@ -0,0 +1,265 @@
+"""
+LTI 1.3 - Access token caches
+
+Caches used by the consumer so the signature of an access token issued by the
+platform isn't verified again on every LTI Advantage request made with it,
+so tools requesting the same access token over and over can be handed a token
+that was already minted, and to store the claims of opaque reference tokens.
+"""
+import hashlib
+import secrets
+import threading
+import time
+
+from django.conf import settings
+from edx_django_utils.cache import TieredCache, get_cache_key
+from edx_django_utils.monitoring import set_custom_attribute
+
+# Maximum number of seconds the claims of a verified access token are cached.
+# Entries never outlive the token itself. Setting it to 0 disables the cache.
+# Can be overridden with the LTI_1P3_VERIFIED_TOKEN_CACHE_MAX_TTL setting.
+DEFAULT_VERIFIED_TOKEN_CACHE_MAX_TTL = 3600
+
+# Fraction of an access token's lifetime during which it's handed out again to
+# the same tool for the same scopes, when access token reuse is enabled.
+# Can be overridden with the LTI_1P3_ACCESS_TOKEN_REUSE_FRACTION setting.
+DEFAULT_ACCESS_TOKEN_REUSE_FRACTION = 0.5
+
+
+class VerifiedTokenCache:
+    """
+    Cache of the claims of verified platform access tokens, keyed by a digest of the token.
+
+    Tools usually send many requests with the same access token (e.g. one score
+    per learner), so the claims decoded the first time the token is verified are
+    stored in the request cache and in the Django cache (shared by all workers)
+    until the token expires. The platform key id is part of the cache key, so
+    tokens signed with a rotated key are verified again.
+    """
+    @property
+    def max_ttl(self):
+        return getattr(settings, 'LTI_1P3_VERIFIED_TOKEN_CACHE_MAX_TTL', DEFAULT_VERIFIED_TOKEN_CACHE_MAX_TTL)
+
+    @staticmethod
+    def get_token_digest(token):
+        """
+        Return the SHA-256 hex digest of a token.
+        """
+        if isinstance(token, str):
+            token = token.encode('utf-8')
+        return hashlib.sha256(token).hexdigest()
+
+    @staticmethod
+    def _get_cache_key(token_digest, iss, kid):
+        return get_cache_key(app="lti", key="verified_access_token", iss=iss, kid=kid, token_digest=token_digest)
+
+    def get_or_verify(self, token, iss, kid, verify):
+        """
+        Return the claims of `token`, calling `verify(token)` if they aren't cached.
+
+        `verify` must raise if the token is invalid, in which case nothing is cached.
+        Only tokens with an `exp` claim are cached, and cached claims are only
+        returned while the token hasn't expired.
+        """
+        if self.max_ttl <= 0:
+            return verify(token)
+
+        now = time.time()
+        token_digest = self.get_token_digest(token)
+        cache_key = self._get_cache_key(token_digest, iss, kid)
+
+        cached = TieredCache.get_cached_response(cache_key)
+        if cached.is_found and cached.value['token_digest'] == token_digest and cached.value['exp'] > now:
+            return dict(cached.value['claims'])
+
+        claims = verify(token)
+
+        exp = claims.get('exp')
+        if isinstance(exp, (int, float)):
+            ttl = int(min(exp - now, self.max_ttl))
+            if ttl > 0:
+                TieredCache.set_all_tiers(
+                    cache_key,
+                    {'token_digest': token_digest, 'exp': exp, 'claims': claims},
+                    django_cache_timeout=ttl,
+                )
+
+        return dict(claims)
+
+
+class AccessTokenReuseCache:
+    """
+    Cache of minted platform access tokens, keyed by tool and granted scopes.
+
+    Some tools request a new access token before every LTI Advantage call. When
+    the LTI_1P3_ACCESS_TOKEN_REUSE_ENABLED setting is set, a token minted for a
+    (client_id, scope set) is stored in the Django cache and returned for the same
+    grant until `reuse_fraction` of its lifetime has passed, instead of signing a
+    new one. Reuses and mints are counted per process (see `get_stats`) and reported
+    as the `lti_access_token_reused` custom monitoring attribute.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reused = 0
+        self.minted = 0
+
+    # .. toggle_name: LTI_1P3_ACCESS_TOKEN_REUSE_ENABLED
+    # .. toggle_implementation: DjangoSetting
+    # .. toggle_default: False
+    # .. toggle_description: Makes repeated client-credentials grants for the same client and scopes get the
+    #    access token already minted for them, until LTI_1P3_ACCESS_TOKEN_REUSE_FRACTION of its lifetime has passed.
+    # .. toggle_use_cases: open_edx
+    # .. toggle_creation_date: 2026-10-17
+    # .. toggle_tickets: None
+    # .. toggle_warning: Minted tokens are kept in the Django cache, which must be shared by the workers.
+    @property
+    def enabled(self):
+        return getattr(settings, 'LTI_1P3_ACCESS_TOKEN_REUSE_ENABLED', False)
+
+    @property
+    def reuse_fraction(self):
+        return getattr(settings, 'LTI_1P3_ACCESS_TOKEN_REUSE_FRACTION', DEFAULT_ACCESS_TOKEN_REUSE_FRACTION)
+
+    @staticmethod
+    def _get_cache_key(iss, client_id, kid, scopes):
+        return get_cache_key(
+            app="lti",
+            key="access_token",
+            iss=iss,
+            client_id=client_id,
+            kid=kid,
+            scopes=" ".join(sorted(set(scopes))),
+        )
+
+    def clear_stats(self):
+        """
+        Reset the reuse counters.
+        """
+        with self._lock:
+            self.reused = 0
+            self.minted = 0
+
+    def get_stats(self):
+        """
+        Return the number of reused and minted tokens, and the reuse rate.
+        """
+        with self._lock:
+            total = self.reused + self.minted
+            return {
+                'reused': self.reused,
+                'minted': self.minted,
+                'reuse_rate': self.reused / total if total else 0.0,
+            }
+
+    def get_or_mint(self, iss, client_id, kid, scopes, lifetime, mint):
+        """
+        Return an (access token, expires in) tuple for a grant of `scopes` to `client_id`.
+
+        `mint()` is called to sign a new token valid for `lifetime` seconds when
+        reuse is disabled or no token minted recently enough is cached.
+        """
+        if not self.enabled:
+            return mint(), lifetime
+
+        # Tokens are issued with a whole number of seconds as `iat`.
+        now = int(time.time())
+        cache_key = self._get_cache_key(iss, client_id, kid, scopes)
+        reuse_window = int(lifetime * self.reuse_fraction)
+
+        cached = TieredCache.get_cached_response(cache_key)
+        if cached.is_found and now - cached.value['iat'] < reuse_window:
+            self._record(reused=True)
+            return cached.value['access_token'], cached.value['iat'] + lifetime - now
+
+        access_token = mint()
+        if reuse_window > 0:
+            TieredCache.set_all_tiers(
+                cache_key,
+                {'access_token': access_token, 'iat': now},
+                django_cache_timeout=reuse_window,
+            )
+        self._record(reused=False)
+        return access_token, lifetime
+
+    def _record(self, reused):
+        """
+        Count a reused or minted token and report it to the monitoring tool.
+        """
+        with self._lock:
+            if reused:
+                self.reused += 1
+            else:
+                self.minted += 1
+        set_custom_attribute('lti_access_token_reused', reused)
+
+
+class ReferenceTokenStore:
+    """
+    Store of opaque reference access tokens.
+
+    When the LTI_1P3_REFERENCE_ACCESS_TOKENS_ENABLED setting is set, the platform
+    issues random tokens instead of signed JWTs, and their claims are kept in the
+    Django cache until they expire. Resolving a token is then a single cache lookup
+    instead of an RSA signature check. Tokens are stored under a digest, so the
+    cache contents can't be used as tokens.
+    """
+    # .. toggle_name: LTI_1P3_REFERENCE_ACCESS_TOKENS_ENABLED
+    # .. toggle_implementation: DjangoSetting
+    # .. toggle_default: False
+    # .. toggle_description: Makes the LTI 1.3 token endpoint issue opaque reference tokens, whose claims are
+    #    stored in the Django cache, instead of signed JWTs.
+    # .. toggle_use_cases: open_edx
+    # .. toggle_creation_date: 2026-10-17
+    # .. toggle_tickets: None
+    # .. toggle_warning: The Django cache must be shared by the workers. Reference tokens issued before the
+    #    cache is cleared are rejected.
+    @property
+    def enabled(self):
+        return getattr(settings, 'LTI_1P3_REFERENCE_ACCESS_TOKENS_ENABLED', False)
+
+    @staticmethod
+    def is_reference_token(token):
+        """
+        Return whether `token` is a reference token.
+
+        Reference tokens are URL-safe base64 strings, which never contain the
+        dots separating the parts of a JWT.
+        """
+        return '.' not in token
+
+    @staticmethod
+    def _get_cache_key(token):
+        return get_cache_key(
+            app="lti",
+            key="reference_access_token",
+            token_digest=VerifiedTokenCache.get_token_digest(token),
+        )
+
+    def issue(self, claims, expiration):
+        """
+        Return a new reference token for `claims`, valid for `expiration` seconds.
+
+        `iat` and `exp` claims are added like they are for signed tokens.
+        """
+        token = secrets.token_urlsafe(32)
+        now = int(time.time())
+        TieredCache.set_all_tiers(
+            self._get_cache_key(token),
+            dict(claims, iat=now, exp=now + expiration),
+            django_cache_timeout=expiration,
+        )
+        return token
+
+    def resolve(self, token):
+        """
+        Return the claims of a reference token, or None if it's unknown or expired.
+        """
+        cached = TieredCache.get_cached_response(self._get_cache_key(token))
+        if not cached.is_found or cached.value['exp'] <= time.time():
+            return None
+        return dict(cached.value)
+
+
+verified_token_cache = VerifiedTokenCache()
+access_token_reuse_cache = AccessTokenReuseCache()
+reference_token_store = ReferenceTokenStore()
@@ -1485,6 +1485,38 @@ class LtiConsumerXBlock(StudioEditableXBlockMixin, XBlock):
         template = loader.render_django_template('/templates/html/lti_launch.html', context)
         return Response(template, content_type='text/html')
 
+    @XBlock.handler
+    def lti_1p3_launch_handler(self, request, suffix=''):  # pylint: disable=unused-argument
+        """
+        XBlock handler for starting LTI 1.3 launches.
+
+        Used as the launch URL of the student view when `LTI_1P3_DEFERRED_LAUNCH_ENABLED`
+        is set, so the launch data is only built and cached when the learner actually
+        starts the launch instead of on every page render.
+
+        Arguments:
+            request (xblock.django.request.DjangoWebobRequest): Request object for current HTTP request
+            suffix (unicode): Request path after "lti_1p3_launch_handler/"
+
+        Returns:
+            webob.response: Redirect to the LTI launch or LTI DL content presentation URL
+        """
+        if self.get_resolved_lti_version() != "lti_1p3":
+            return Response(status=404)
+
+        try:
+            launch_data = self.get_lti_1p3_launch_data()
+        # Fails if extract_real_user_data() fails
+        except LtiError as err:
+            loader = ResourceLoader(__name__)
+            template = loader.render_django_template('/templates/html/lti_launch_error.html',
+                                                     context={"error_msg": err})
+            return Response(template, status=400, content_type='text/html')
+
+        # Runtime import since this will only run in the Open edX LMS/Studio environments.
+        from lti_consumer.api import get_lti_1p3_content_url  # pylint: disable=import-outside-toplevel
+        return Response(status=302, location=get_lti_1p3_content_url(launch_data))
+
     @XBlock.handler
     def lti_1p3_access_token(self, request, suffix=''):  # pylint: disable=unused-argument
         """
@@ -1830,6 +1862,19 @@ class LtiConsumerXBlock(StudioEditableXBlockMixin, XBlock):
         """
         if self.get_resolved_lti_version() == 'lti_1p1':
             lti_block_launch_handler = self.runtime.handler_url(self, 'lti_launch_handler').rstrip('/?')
+        # .. toggle_name: LTI_1P3_DEFERRED_LAUNCH_ENABLED
+        # .. toggle_implementation: DjangoSetting
+        # .. toggle_default: False
+        # .. toggle_description: Makes the student view link to the lti_1p3_launch_handler XBlock handler, which
+        #    builds and caches the LTI 1.3 launch data only when the learner starts the launch, instead of on every
+        #    render of the block.
+        # .. toggle_use_cases: open_edx
+        # .. toggle_creation_date: 2026-10-17
+        # .. toggle_tickets: None
+        # .. toggle_warning: None.
+        elif getattr(settings, 'LTI_1P3_DEFERRED_LAUNCH_ENABLED', False):
+            # The launch data is only built and cached once the learner starts the launch.
+            lti_block_launch_handler = self.runtime.handler_url(self, 'lti_1p3_launch_handler').rstrip('/?')
         else:
             launch_data = self.get_lti_1p3_launch_data()
 
@@ -0,0 +1,70 @@
+"""
+Management command to fill the pool of pre-generated LTI 1.3 platform keys.
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from lti_consumer.lti_1p3.constants import LTI_1P3_DEFAULT_SIGNING_ALGORITHM, LTI_1P3_SIGNING_ALGORITHMS
+from lti_consumer.models import Lti1p3PregeneratedKey
+
+# Number of keys kept in the pool when no size is given.
+# Can be overridden with the LTI_1P3_KEY_POOL_SIZE setting.
+DEFAULT_KEY_POOL_SIZE = 20
+
+
+class Command(BaseCommand):
+    """
+    Generate LTI 1.3 platform keys ahead of time, so new passports don't have to.
+
+    Examples:
+
+        ./manage.py lms fill_lti_1p3_key_pool --size 50
+
+    Fill the pool of ES256 keys used by passports signing with ES256:
+
+        ./manage.py lms fill_lti_1p3_key_pool --algorithm ES256
+
+    Keep the pool filled, checking it every 60 seconds:
+
+        ./manage.py lms fill_lti_1p3_key_pool --interval 60
+    """
+    help = 'Generate LTI 1.3 platform keys until the key pool is full.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size',
+            type=int,
+            default=None,
+            help='Number of keys to keep in the pool. Defaults to the LTI_1P3_KEY_POOL_SIZE setting.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=None,
+            help='Keep running and refill the pool every INTERVAL seconds.',
+        )
+        parser.add_argument(
+            '--algorithm',
+            choices=list(LTI_1P3_SIGNING_ALGORITHMS),
+            default=LTI_1P3_DEFAULT_SIGNING_ALGORITHM,
+            help='Signing algorithm of the keys to generate.',
+        )
+
+    def handle(self, *args, **options):
+        size = options['size']
+        if size is None:
+            size = getattr(settings, 'LTI_1P3_KEY_POOL_SIZE', DEFAULT_KEY_POOL_SIZE)
+        interval = options['interval']
+        algorithm = options['algorithm']
+
+        try:
+            while True:
+                generated = Lti1p3PregeneratedKey.fill(size, algorithm)
+                self.stdout.write(f'Generated {generated} LTI 1.3 {algorithm} keys, pool size is {size}.')
+                if not interval:
+                    break
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped filling the LTI 1.3 key pool.')
@@ -0,0 +1,146 @@
+"""
+Management command to republish LTI AGS grades that differ from the grades in the LMS.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+
+from lti_consumer.grades import find_mismatched_grades, get_grade_publish_backend, publish_line_item_grades
+from lti_consumer.models import LtiAgsScore
+
+
+class Command(BaseCommand):
+    """
+    Compare the fully graded LTI AGS scores of a course or line item with the grades
+    published to the LMS, and republish the grades that differ or are missing.
+
+    Scores are read in chunks ordered by id, and the id of the last score checked is
+    printed after each chunk, so an interrupted run can be resumed from it. Grades are
+    republished through the LTI_AGS_GRADE_PUBLISH_BACKEND backend when one is set.
+
+    Examples:
+
+        ./manage.py lms reconcile_lti_ags_grades --course-id course-v1:edX+DemoX+Demo_Course
+
+    Only list the mismatched grades of a line item:
+
+        ./manage.py lms reconcile_lti_ags_grades --line-item-id 42 --dry-run
+
+    Resume an interrupted run:
+
+        ./manage.py lms reconcile_lti_ags_grades --course-id course-v1:edX+DemoX+Demo_Course --resume-from 1234
+    """
+    help = 'Republish the LTI AGS grades of a course or line item that differ from the grades in the LMS.'
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument(
+            '--course-id',
+            type=str,
+            help='Reconcile the grades of the line items of this course.',
+        )
+        target.add_argument(
+            '--line-item-id',
+            type=int,
+            help='Reconcile the grades of this line item.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of scores read and compared at once.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Maximum number of grades of a line item republished at once.',
+        )
+        parser.add_argument(
+            '--resume-from',
+            type=int,
+            default=0,
+            help='Only check the scores with an id greater than this one, as printed by an interrupted run.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report the mismatched grades without republishing them.',
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--chunk-size and --batch-size must be positive.')
+
+        scores = LtiAgsScore.objects.filter(
+            grading_progress=LtiAgsScore.FULLY_GRADED,
+            score_given__gt=0,
+        ).select_related('line_item__lti_configuration').order_by('pk')
+        if options['line_item_id'] is not None:
+            scores = scores.filter(line_item_id=options['line_item_id'])
+        else:
+            scores = scores.filter(line_item__resource_link_id__startswith=self._get_block_prefix(options['course_id']))
+
+        backend = get_grade_publish_backend()
+        last_pk = options['resume_from']
+        checked = mismatched = 0
+        start = time.perf_counter()
+
+        try:
+            while True:
+                chunk = list(scores.filter(pk__gt=last_pk)[:options['chunk_size']])
+                if not chunk:
+                    break
+
+                mismatched_scores = find_mismatched_grades(chunk)
+                if not options['dry_run']:
+                    self._republish(mismatched_scores, options['batch_size'], backend)
+
+                last_pk = chunk[-1].pk
+                checked += len(chunk)
+                mismatched += len(mismatched_scores)
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f'Checked {checked} scores, {mismatched} mismatched '
+                    f'({checked / elapsed:.1f} scores/s). Last score id: {last_pk}.'
+                )
+        except KeyboardInterrupt:
+            self.stdout.write(f'Stopped reconciling LTI AGS grades. Resume with --resume-from {last_pk}.')
+            return
+
+        action = 'found' if options['dry_run'] else 'republished'
+        self.stdout.write(f'Done: checked {checked} scores, {action} {mismatched} mismatched grades.')
+
+    @staticmethod
+    def _get_block_prefix(course_id):
+        """
+        Return the prefix shared by the usage keys of the blocks of a course.
+        """
+        try:
+            course_key = CourseKey.from_string(course_id)
+        except InvalidKeyError as exc:
+            raise CommandError(f'Invalid course id: {course_id}') from exc
+        if course_key.deprecated:
+            # Usage keys of old-style courses (i4x://org/course/type/name) don't include the course run.
+            raise CommandError(f'Old-style course ids are not supported, use --line-item-id instead: {course_id}')
+        usage_key = str(course_key.make_usage_key('lti_consumer', 'block'))
+        return usage_key[:usage_key.index('type@')]
+
+    @staticmethod
+    def _republish(scores, batch_size, backend):
+        """
+        Republish the grades of scores, in batches of at most `batch_size` users of a line item.
+        """
+        user_ids_by_line_item = {}
+        for score in scores:
+            user_ids_by_line_item.setdefault(score.line_item_id, []).append(score.user_id)
+
+        for line_item_id, user_ids in user_ids_by_line_item.items():
+            for index in range(0, len(user_ids), batch_size):
+                batch = user_ids[index:index + batch_size]
+                if backend:
+                    backend.dispatch(line_item_id, batch)
+                else:
+                    publish_line_item_grades(line_item_id, batch)
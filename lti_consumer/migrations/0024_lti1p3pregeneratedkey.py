@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lti_consumer', '0023_lti1p3passport_context_key_lti1p3passport_name_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Lti1p3PregeneratedKey',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('private_key', models.TextField()),
+                ('private_key_id', models.CharField(max_length=255)),
+                ('public_jwk', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 07:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lti_consumer', '0024_lti1p3pregeneratedkey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lti1p3passport',
+            name='lti_1p3_signing_algorithm',
+            field=models.CharField(choices=[('RS256', 'RS256'), ('ES256', 'ES256')], default='RS256', help_text='Algorithm used to sign the messages and access tokens sent to the LTI Tool. RS256 is supported by every LTI 1.3 tool, only choose another algorithm if the tool supports it. Changing it generates new platform keys.', max_length=16, verbose_name='LTI 1.3 Signing Algorithm'),
+        ),
+        migrations.AddField(
+            model_name='lti1p3pregeneratedkey',
+            name='algorithm',
+            field=models.CharField(choices=[('RS256', 'RS256'), ('ES256', 'ES256')], default='RS256', max_length=16),
+        ),
+    ]
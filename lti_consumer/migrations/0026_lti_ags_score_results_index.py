@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lti_consumer', '0025_lti1p3_signing_algorithm'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ltiagsscore',
+            index=models.Index(fields=['line_item', 'timestamp', 'id'], name='lti_ags_score_results_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lti_consumer', '0026_lti_ags_score_results_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ltiagslineitem',
+            index=models.Index(fields=['lti_configuration', 'resource_link_id', 'id'], name='lti_ags_lineitem_link_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ltiagslineitem',
+            index=models.Index(fields=['lti_configuration', 'resource_id', 'id'], name='lti_ags_lineitem_resource_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ltiagslineitem',
+            index=models.Index(fields=['lti_configuration', 'tag', 'id'], name='lti_ags_lineitem_tag_idx'),
+        ),
+    ]
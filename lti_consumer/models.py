@@ -7,32 +7,39 @@ import uuid
 
 from ccx_keys.locator import CCXBlockUsageLocator
 from config_models.models import ConfigurationModel
-from Cryptodome.PublicKey import RSA
+from Cryptodome.PublicKey import ECC, RSA
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from django.db import models
 from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
+from edx_django_utils.cache import TieredCache, get_cache_key
 from edx_django_utils.monitoring import function_trace
 from jsonfield import JSONField
 from opaque_keys.edx.django.models import CourseKeyField, UsageKeyField
 from opaque_keys.edx.keys import CourseKey
 
-from lti_consumer.filters import get_external_config_from_filter
+from lti_consumer.data import Lti1p3ResolvedConfiguration
+from lti_consumer.filters import external_config_cache, get_external_config_from_filter
 
 # LTI 1.1
 from lti_consumer.lti_1p1.consumer import LtiConsumer1p1
 
 # LTI 1.3
+from lti_consumer.lti_1p3.constants import LTI_1P3_DEFAULT_SIGNING_ALGORITHM, LTI_1P3_SIGNING_ALGORITHMS
 from lti_consumer.lti_1p3.consumer import LtiAdvantageConsumer, LtiProctoringConsumer
+from lti_consumer.lti_1p3.consumer_cache import consumer_template_cache
 from lti_consumer.lti_1p3.key_handlers import PlatformKeyHandler
 from lti_consumer.plugin import compat
 from lti_consumer.utils import (
     EXTERNAL_ID_REGEX,
+    build_lti_1p3_public_keyset,
     choose_lti_1p3_redirect_uris,
     external_multiple_launch_urls_enabled,
     get_lti_ags_lineitems_url,
     get_lti_api_base,
+    get_lti_1p3_public_keyset_cache_key,
+    get_lti_1p3_public_keyset_max_age,
     get_lti_deeplinking_response_url,
     get_lti_nrps_context_membership_url,
     model_to_dict,
@@ -48,6 +55,96 @@ def generate_client_id():
     return str(uuid.uuid4())
 
 
+def generate_lti_1p3_private_key(algorithm=LTI_1P3_DEFAULT_SIGNING_ALGORITHM):
+    """
+    Generate a new LTI 1.3 platform private key for `algorithm` and return it as PEM.
+
+    RS256 uses 2048 bit RSA keys and ES256 uses P-256 EC keys.
+    """
+    if LTI_1P3_SIGNING_ALGORITHMS[algorithm] == 'EC':
+        return ECC.generate(curve='P-256').export_key(format='PEM')
+    return RSA.generate(2048).export_key('PEM').decode('utf-8')
+
+
+def generate_lti_1p3_keypair(algorithm=LTI_1P3_DEFAULT_SIGNING_ALGORITHM):
+    """
+    Generate a new LTI 1.3 platform keypair for `algorithm`.
+
+    Returns a (private key PEM, private key ID, public JWK JSON) tuple.
+    """
+    private_key_id = str(uuid.uuid4())
+    private_key = generate_lti_1p3_private_key(algorithm)
+    key_handler = PlatformKeyHandler(key_pem=private_key, kid=private_key_id, algorithm=algorithm)
+    return private_key, private_key_id, json.dumps(key_handler.get_public_jwk())
+
+
+class Lti1p3PregeneratedKey(models.Model):
+    """
+    Pool of pre-generated LTI 1.3 platform keypairs.
+
+    Generating an RSA key takes long enough to be noticeable on the request that
+    first needs the keys of a new passport, so keys are generated ahead of time
+    (see the `fill_lti_1p3_key_pool` management command) and each one is claimed
+    by a single passport.
+
+    .. no_pii:
+    """
+    private_key = models.TextField()
+    private_key_id = models.CharField(max_length=255)
+    public_jwk = models.TextField()
+    algorithm = models.CharField(
+        max_length=16,
+        choices=[(algorithm, algorithm) for algorithm in LTI_1P3_SIGNING_ALGORITHMS],
+        default=LTI_1P3_DEFAULT_SIGNING_ALGORITHM,
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    # Number of times a claim is retried when another process claims the same key.
+    CLAIM_ATTEMPTS = 3
+
+    @classmethod
+    def claim(cls, algorithm=LTI_1P3_DEFAULT_SIGNING_ALGORITHM):
+        """
+        Remove the oldest `algorithm` key from the pool and return it, or None if there is none.
+
+        A key is only returned to the process that managed to delete its row,
+        so the same key is never handed out to two passports.
+        """
+        for _ in range(cls.CLAIM_ATTEMPTS):
+            key = cls.objects.filter(algorithm=algorithm).order_by('pk').first()
+            if key is None:
+                return None
+            deleted, _ = cls.objects.filter(pk=key.pk).delete()
+            if deleted:
+                return key
+        return None
+
+    @classmethod
+    def fill(cls, size, algorithm=LTI_1P3_DEFAULT_SIGNING_ALGORITHM):
+        """
+        Generate `algorithm` keys until the pool holds `size` keys for it.
+
+        Returns the number of keys generated.
+        """
+        missing = size - cls.objects.filter(algorithm=algorithm).count()
+        if missing <= 0:
+            return 0
+
+        cls.objects.bulk_create([
+            cls(private_key=private_key, private_key_id=private_key_id, public_jwk=public_jwk, algorithm=algorithm)
+            for private_key, private_key_id, public_jwk in (
+                generate_lti_1p3_keypair(algorithm) for _ in range(missing)
+            )
+        ])
+        return missing
+
+    def __str__(self):
+        return f'Lti1p3PregeneratedKey: {self.private_key_id}'
+
+    class Meta:
+        app_label = 'lti_consumer'
+
+
 class Lti1p3Passport(models.Model):
     """
     Model to store LTI 1.3 keys.
@@ -93,42 +190,101 @@ class Lti1p3Passport(models.Model):
                   'Tool. One of either lti_1p3_tool_public_key or lti_1p3_tool_keyset_url must not be blank.'
     )
 
+    lti_1p3_signing_algorithm = models.CharField(
+        "LTI 1.3 Signing Algorithm",
+        max_length=16,
+        choices=[(algorithm, algorithm) for algorithm in LTI_1P3_SIGNING_ALGORITHMS],
+        default=LTI_1P3_DEFAULT_SIGNING_ALGORITHM,
+        help_text='Algorithm used to sign the messages and access tokens sent to the LTI Tool. RS256 is supported '
+                  'by every LTI 1.3 tool, only choose another algorithm if the tool supports it. Changing it '
+                  'generates new platform keys.'
+    )
+
+    # (raw JWK text, parsed JWK) of the last public JWK read from this instance.
+    _parsed_public_jwk = None
+
+    def _get_parsed_public_jwk(self):
+        """
+        Return the parsed public JWK, parsing it again only if `lti_1p3_internal_public_jwk` changed.
+        """
+        cached = self._parsed_public_jwk
+        if cached is None or cached[0] != self.lti_1p3_internal_public_jwk:
+            cached = (self.lti_1p3_internal_public_jwk, json.loads(self.lti_1p3_internal_public_jwk))
+            self._parsed_public_jwk = cached
+        return cached[1]
+
+    def _keys_match_signing_algorithm(self):
+        """
+        Return whether the platform keys are of the type required by the signing algorithm.
+        """
+        key_type = LTI_1P3_SIGNING_ALGORITHMS[self.lti_1p3_signing_algorithm]
+        return all(
+            jwk.get('kty') == key_type
+            for jwk in self._get_parsed_public_jwk().get('keys', [])
+        )
+
     def _generate_lti_1p3_keys_if_missing(self):
         """
-        Generate LTI 1.3 RSA256 keys if missing.
+        Generate LTI 1.3 keys for the signing algorithm if missing.
 
-        If either the public or private key are missing, regenerate them.
+        If either the public or private key are missing, or they don't match the
+        signing algorithm, regenerate them.
         The LMS provides a keyset endpoint, so key rotations don't cause any issues
         for LTI launches (as long as they have a different kid).
+
+        The passport is only saved when keys were generated, so reading the keys
+        of a passport that already has them doesn't issue any database queries.
         """
-        # Generate new private key if not present
+        if self.lti_1p3_internal_private_key and self.lti_1p3_internal_public_jwk:
+            if self._keys_match_signing_algorithm():
+                return
+            # The signing algorithm changed, so keys of another type are needed.
+            self.lti_1p3_internal_private_key = ''
+
+        # Take a key from the pool of pre-generated keys if available,
+        # otherwise generate a new private key.
         if not self.lti_1p3_internal_private_key:
-            # Private key
-            private_key = RSA.generate(2048)
-            self.lti_1p3_internal_private_key_id = str(uuid.uuid4())
-            self.lti_1p3_internal_private_key = private_key.export_key('PEM').decode('utf-8')
+            pregenerated_key = Lti1p3PregeneratedKey.claim(self.lti_1p3_signing_algorithm)
+            if pregenerated_key:
+                self.lti_1p3_internal_private_key = pregenerated_key.private_key
+                self.lti_1p3_internal_private_key_id = pregenerated_key.private_key_id
+                self.lti_1p3_internal_public_jwk = pregenerated_key.public_jwk
+            else:
+                # Private key
+                self.lti_1p3_internal_private_key_id = str(uuid.uuid4())
+                self.lti_1p3_internal_private_key = generate_lti_1p3_private_key(self.lti_1p3_signing_algorithm)
 
-            # Clear public key if any to allow regeneration
-            # in the code below
-            self.lti_1p3_internal_public_jwk = ''
+                # Clear public key if any to allow regeneration
+                # in the code below
+                self.lti_1p3_internal_public_jwk = ''
 
         if not self.lti_1p3_internal_public_jwk:
             # Public key
             key_handler = PlatformKeyHandler(
                 key_pem=self.lti_1p3_internal_private_key,
                 kid=self.lti_1p3_internal_private_key_id,
+                algorithm=self.lti_1p3_signing_algorithm,
             )
             self.lti_1p3_internal_public_jwk = json.dumps(
                 key_handler.get_public_jwk()
             )
 
-        # Doesn't do anything if model didn't change
-        self.save()
+        if self.pk:
+            self.save(update_fields=[
+                'lti_1p3_internal_private_key',
+                'lti_1p3_internal_private_key_id',
+                'lti_1p3_internal_public_jwk',
+                'lti_1p3_signing_algorithm',
+            ])
+        else:
+            self.save()
 
     @property
     def lti_1p3_private_key(self):
         """
         Return the platform's private key used in LTI 1.3 authentication flows.
+
+        Doesn't issue any queries unless the keys need to be generated.
         """
         self._generate_lti_1p3_keys_if_missing()
         return self.lti_1p3_internal_private_key
@@ -137,6 +293,8 @@ class Lti1p3Passport(models.Model):
     def lti_1p3_private_key_id(self):
         """
         Return the platform's private key ID used in LTI 1.3 authentication flows.
+
+        Doesn't issue any queries unless the keys need to be generated.
         """
         self._generate_lti_1p3_keys_if_missing()
         return self.lti_1p3_internal_private_key_id
@@ -145,9 +303,28 @@ class Lti1p3Passport(models.Model):
     def lti_1p3_public_jwk(self):
         """
         Return the platform's public keys used in LTI 1.3 authentication flows.
+
+        Doesn't issue any queries unless the keys need to be generated. The parsed
+        JWK is kept on the instance until `lti_1p3_internal_public_jwk` changes.
         """
         self._generate_lti_1p3_keys_if_missing()
-        return json.loads(self.lti_1p3_internal_public_jwk)
+        return self._get_parsed_public_jwk()
+
+    def get_lti_1p3_public_keyset(self):
+        """
+        Return the serialized public keyset of this passport and its ETag.
+
+        The result is kept in the cache until the passport or a configuration using it
+        is saved again, see `lti_consumer.signals.signals.invalidate_lti_1p3_public_keyset`.
+        """
+        cache_key = get_lti_1p3_public_keyset_cache_key(self.passport_id)
+        cached = TieredCache.get_cached_response(cache_key)
+        if cached.is_found:
+            return cached.value
+
+        keyset = build_lti_1p3_public_keyset(self.lti_1p3_public_jwk)
+        TieredCache.set_all_tiers(cache_key, keyset, django_cache_timeout=get_lti_1p3_public_keyset_max_age())
+        return keyset
 
     def __str__(self):
         return f'Lti1p3Passport: {self.name} - {self.passport_id}'
@@ -362,7 +539,8 @@ class LtiConfiguration(models.Model):
                                   "LTI 1.3 Proctoring Services."),
             })
         try:
-            consumer = self.get_lti_consumer()
+            # Build the consumer from the values being validated, not from a cached template.
+            consumer = self.get_lti_consumer(use_cache=False)
         except NotImplementedError:
             consumer = None
         if consumer is None:
@@ -395,6 +573,9 @@ class LtiConfiguration(models.Model):
                 ).exclude(id=self.pk)
                 # Copy fields to child CCX configurations.
                 child_configs.update(**model_to_dict(self, EXCLUDED_FIELDS))
+                # Updates don't send post_save, so drop the cached consumers of the children here.
+                for config_id in child_configs.values_list('config_id', flat=True):
+                    consumer_template_cache.invalidate(config_id)
             except IndexError:
                 log.exception(
                     f'Failed to query children CCX LTI configurations: '
@@ -466,6 +647,14 @@ class LtiConfiguration(models.Model):
         self.get_or_create_lti_1p3_passport()
         return self.lti_1p3_passport.lti_1p3_private_key_id
 
+    @property
+    def lti_1p3_signing_algorithm(self):
+        """
+        Return the algorithm the platform signs LTI 1.3 messages and access tokens with.
+        """
+        self.get_or_create_lti_1p3_passport()
+        return self.lti_1p3_passport.lti_1p3_signing_algorithm
+
     @property
     def lti_1p3_public_jwk(self):
         """
@@ -525,64 +714,151 @@ class LtiConfiguration(models.Model):
 
         return LtiConsumer1p1(launch_url, key, secret)
 
+    def _resolve_config(self):
+        """
+        Read the LTI 1.3 settings of this configuration from where they are stored.
+
+        Configurations stored on the block load it once, and also read the
+        defaults of the line item created for the declarative AGS mode from it.
+        """
+        if self.config_store == self.CONFIG_ON_DB:
+            return Lti1p3ResolvedConfiguration(
+                lti_1p3_oidc_url=self.lti_1p3_oidc_url,
+                lti_1p3_launch_url=self.lti_1p3_launch_url,
+                lti_1p3_redirect_uris=choose_lti_1p3_redirect_uris(
+                    self.lti_1p3_redirect_uris,
+                    self.lti_1p3_launch_url,
+                    self.lti_advantage_deep_linking_launch_url,
+                ),
+                lti_1p3_tool_public_key=self.lti_1p3_tool_public_key,
+                lti_1p3_tool_keyset_url=self.lti_1p3_tool_keyset_url,
+                lti_advantage_ags_mode=self.lti_advantage_ags_mode,
+                lti_advantage_deep_linking_enabled=self.lti_advantage_deep_linking_enabled,
+                lti_advantage_deep_linking_launch_url=self.lti_advantage_deep_linking_launch_url,
+                lti_advantage_enable_nrps=self.lti_advantage_enable_nrps,
+            )
+
+        if self.config_store == self.CONFIG_EXTERNAL:
+            external_config = self.external_config
+            launch_url = external_config.get('lti_1p3_launch_url')
+            lti_1p3_launch_url = launch_url
+            if self.location and external_multiple_launch_urls_enabled(self.location.course_key):
+                block = compat.load_enough_xblock(self.location)
+                lti_1p3_launch_url = block.lti_1p3_launch_url or launch_url
+
+            return Lti1p3ResolvedConfiguration(
+                lti_1p3_oidc_url=external_config.get('lti_1p3_oidc_url'),
+                lti_1p3_launch_url=lti_1p3_launch_url,
+                lti_1p3_redirect_uris=choose_lti_1p3_redirect_uris(
+                    external_config.get('lti_1p3_redirect_uris'),
+                    launch_url,
+                    external_config.get('lti_advantage_deep_linking_launch_url'),
+                ),
+                lti_1p3_tool_public_key=external_config.get('lti_1p3_tool_public_key'),
+                lti_1p3_tool_keyset_url=external_config.get('lti_1p3_tool_keyset_url'),
+                lti_advantage_ags_mode=external_config.get('lti_advantage_ags_mode'),
+                lti_advantage_deep_linking_enabled=external_config.get('lti_advantage_deep_linking_enabled'),
+                lti_advantage_deep_linking_launch_url=external_config.get('lti_advantage_deep_linking_launch_url'),
+                lti_advantage_enable_nrps=external_config.get('lti_advantage_enable_nrps'),
+            )
+
+        block = compat.load_enough_xblock(self.location)
+        return Lti1p3ResolvedConfiguration(
+            lti_1p3_oidc_url=block.lti_1p3_oidc_url,
+            lti_1p3_launch_url=block.lti_1p3_launch_url,
+            lti_1p3_redirect_uris=choose_lti_1p3_redirect_uris(
+                block.lti_1p3_redirect_uris,
+                block.lti_1p3_launch_url,
+                block.lti_advantage_deep_linking_launch_url,
+            ),
+            lti_1p3_tool_public_key=block.lti_1p3_tool_public_key,
+            lti_1p3_tool_keyset_url=block.lti_1p3_tool_keyset_url,
+            lti_advantage_ags_mode=block.lti_advantage_ags_mode,
+            lti_advantage_deep_linking_enabled=block.lti_advantage_deep_linking_enabled,
+            lti_advantage_deep_linking_launch_url=block.lti_advantage_deep_linking_launch_url,
+            lti_advantage_enable_nrps=block.lti_1p3_enable_nrps,
+            lineitem_defaults=self._get_lineitem_defaults(block),
+        )
+
+    def get_resolved_config(self):
+        """
+        Return the LTI 1.3 settings of this configuration as an `Lti1p3ResolvedConfiguration`.
+
+        Settings stored on the block or in an external configuration are cached
+        under the configuration's version stamp, which changes whenever the
+        configuration, its passport or its block change. They are cached as a
+        schema versioned dict (see `Lti1p3ResolvedConfiguration.to_dict`), and
+        entries that can't be decoded are resolved again. Settings stored on
+        this model are read from the instance, so unsaved changes are used.
+        """
+        if self.config_store == self.CONFIG_ON_DB:
+            return self._resolve_config()
+
+        cache_key = get_cache_key(
+            app="lti",
+            key="resolved_config",
+            config_id=str(self.config_id),
+            version=consumer_template_cache.get_version_stamp(self.config_id),
+        )
+        cached = TieredCache.get_cached_response(cache_key)
+        if cached.is_found:
+            try:
+                return Lti1p3ResolvedConfiguration.from_dict(cached.value)
+            except ValueError:
+                # Cached by a release with another layout.
+                pass
+
+        resolved_config = self._resolve_config()
+        TieredCache.set_all_tiers(
+            cache_key, resolved_config.to_dict(), django_cache_timeout=consumer_template_cache.ttl,
+        )
+        return resolved_config
+
     def get_lti_advantage_ags_mode(self):
         """
         Return LTI 1.3 Advantage Assignment and Grade Services mode.
         """
-        if self.config_store == self.CONFIG_ON_DB:
-            return self.lti_advantage_ags_mode
-        elif self.config_store == self.CONFIG_EXTERNAL:
-            return self.external_config.get('lti_advantage_ags_mode')
-        else:
-            block = compat.load_enough_xblock(self.location)
-            return block.lti_advantage_ags_mode
+        return self.get_resolved_config().lti_advantage_ags_mode
 
     def get_lti_advantage_deep_linking_enabled(self):
         """
         Return whether LTI 1.3 Advantage Deep Linking is enabled.
         """
-        if self.config_store == self.CONFIG_ON_DB:
-            return self.lti_advantage_deep_linking_enabled
-        elif self.config_store == self.CONFIG_EXTERNAL:
-            return self.external_config.get('lti_advantage_deep_linking_enabled')
-        else:
-            block = compat.load_enough_xblock(self.location)
-            return block.lti_advantage_deep_linking_enabled
+        return self.get_resolved_config().lti_advantage_deep_linking_enabled
 
     def get_lti_advantage_deep_linking_launch_url(self):
         """
         Return the LTI 1.3 Advantage Deep Linking launch URL.
         """
-        if self.config_store == self.CONFIG_ON_DB:
-            return self.lti_advantage_deep_linking_launch_url
-        elif self.config_store == self.CONFIG_EXTERNAL:
-            return self.external_config.get('lti_advantage_deep_linking_launch_url')
-        else:
-            block = compat.load_enough_xblock(self.location)
-            return block.lti_advantage_deep_linking_launch_url
+        return self.get_resolved_config().lti_advantage_deep_linking_launch_url
 
     def get_lti_advantage_nrps_enabled(self):
         """
         Return whether LTI 1.3 Advantage Names and Role Provisioning Services is enabled.
         """
-        if self.config_store == self.CONFIG_ON_DB:
-            return self.lti_advantage_enable_nrps
-        elif self.config_store == self.CONFIG_EXTERNAL:
-            return self.external_config.get('lti_advantage_enable_nrps')
-        else:
-            block = compat.load_enough_xblock(self.location)
-            return block.lti_1p3_enable_nrps
+        return self.get_resolved_config().lti_advantage_enable_nrps
 
-    def _setup_lti_1p3_ags(self, consumer):
+    @staticmethod
+    def _get_lineitem_defaults(block):
+        """
+        Return the values of the line item created for a block in the declarative AGS mode.
+        """
+        default_values = {
+            'score_maximum': block.weight,
+            'label': block.display_name,
+        }
+        if hasattr(block, 'start'):
+            default_values['start_date_time'] = block.start
+
+        if hasattr(block, 'due'):
+            default_values['end_date_time'] = block.due
+        return default_values
+
+    def _setup_lti_1p3_ags(self, consumer, resolved_config):
         """
         Set up LTI 1.3 Advantage Assigment and Grades Services.
         """
-
-        try:
-            lti_advantage_ags_mode = self.get_lti_advantage_ags_mode()
-        except NotImplementedError as exc:
-            log.exception("Error setting up LTI 1.3 Advantage Assignment and Grade Services: %s", exc)
-            return
+        lti_advantage_ags_mode = resolved_config.lti_advantage_ags_mode
 
         if lti_advantage_ags_mode == self.LTI_ADVANTAGE_AGS_DISABLED:
             log.info('LTI Advantage AGS is disabled for %s', self)
@@ -594,22 +870,17 @@ class LtiConfiguration(models.Model):
         # doesn't exist. This is because on this mode the tool is not able to create
         # and manage lineitems using the AGS endpoints.
         if not lineitem and lti_advantage_ags_mode == self.LTI_ADVANTAGE_AGS_DECLARATIVE:
-            try:
-                block = compat.load_enough_xblock(self.location)
-            except ValueError:  # There is no location to load the block
-                block = None
-
-            if block:
-                default_values = {
-                    'resource_id': self.location,
-                    'score_maximum': block.weight,
-                    'label': block.display_name,
-                }
-                if hasattr(block, 'start'):
-                    default_values['start_date_time'] = block.start
+            default_values = resolved_config.lineitem_defaults
+            if default_values is None:
+                try:
+                    block = compat.load_enough_xblock(self.location)
+                except ValueError:  # There is no location to load the block
+                    block = None
+                if block:
+                    default_values = self._get_lineitem_defaults(block)
 
-                if hasattr(block, 'due'):
-                    default_values['end_date_time'] = block.due
+            if default_values is not None:
+                default_values = dict(default_values, resource_id=self.location)
             else:
                 # TODO find a way to make these defaults more sensible
                 default_values = {
@@ -633,25 +904,25 @@ class LtiConfiguration(models.Model):
             )
         )
 
-    def _setup_lti_1p3_deep_linking(self, consumer):
+    def _setup_lti_1p3_deep_linking(self, consumer, resolved_config):
         """
         Set up LTI 1.3 Advantage Deep Linking.
         """
         try:
-            if self.get_lti_advantage_deep_linking_enabled():
+            if resolved_config.lti_advantage_deep_linking_enabled:
                 consumer.enable_deep_linking(
-                    self.get_lti_advantage_deep_linking_launch_url(),
+                    resolved_config.lti_advantage_deep_linking_launch_url,
                     get_lti_deeplinking_response_url(self.id),
                 )
         except NotImplementedError as exc:
             log.exception("Error setting up LTI 1.3 Advantage Deep Linking: %s", exc)
 
-    def _setup_lti_1p3_nrps(self, consumer):
+    def _setup_lti_1p3_nrps(self, consumer, resolved_config):
         """
         Set up LTI 1.3 Advantage Names and Role Provisioning Services.
         """
         try:
-            if self.get_lti_advantage_nrps_enabled():
+            if resolved_config.lti_advantage_enable_nrps:
                 consumer.enable_nrps(get_lti_nrps_context_membership_url(self.id))
         except NotImplementedError as exc:
             log.exception("Error setting up LTI 1.3 Advantage Names and Role Provisioning Services: %s", exc)
@@ -671,74 +942,52 @@ class LtiConfiguration(models.Model):
         if self.lti_1p3_proctoring_enabled and self.config_store == self.CONFIG_ON_DB:
             consumer_class = LtiProctoringConsumer
 
-        if self.config_store == self.CONFIG_ON_XBLOCK:
-            block = compat.load_enough_xblock(self.location)
-
-            consumer = consumer_class(
-                iss=get_lti_api_base(),
-                lti_oidc_url=block.lti_1p3_oidc_url,
-                lti_launch_url=block.lti_1p3_launch_url,
-                client_id=self.lti_1p3_client_id,
-                # Deployment ID hardcoded to 1 since
-                # we're not using multi-tenancy.
-                deployment_id="1",
-                # XBlock Private RSA Key
-                rsa_key=self.lti_1p3_private_key,
-                rsa_key_id=self.lti_1p3_private_key_id,
-                # Registered redirect uris
-                redirect_uris=self.get_lti_1p3_redirect_uris(),
-                # LTI 1.3 Tool key/keyset url
-                tool_key=block.lti_1p3_tool_public_key,
-                tool_keyset_url=block.lti_1p3_tool_keyset_url,
-            )
-        elif self.config_store == self.CONFIG_ON_DB:
-            consumer = consumer_class(
-                iss=get_lti_api_base(),
-                lti_oidc_url=self.lti_1p3_oidc_url,
-                lti_launch_url=self.lti_1p3_launch_url,
-                client_id=self.lti_1p3_client_id,
-                # Deployment ID hardcoded to 1 since
-                # we're not using multi-tenancy.
-                deployment_id="1",
-                # XBlock Private RSA Key
-                rsa_key=self.lti_1p3_private_key,
-                rsa_key_id=self.lti_1p3_private_key_id,
-                # Registered redirect uris
-                redirect_uris=self.get_lti_1p3_redirect_uris(),
-                # LTI 1.3 Tool key/keyset url
-                tool_key=self.lti_1p3_tool_public_key,
-                tool_keyset_url=self.lti_1p3_tool_keyset_url,
-            )
-        elif self.config_store == self.CONFIG_EXTERNAL:
-            lti_launch_url = self.external_config.get('lti_1p3_launch_url')
+        if self.config_store not in (self.CONFIG_ON_XBLOCK, self.CONFIG_ON_DB, self.CONFIG_EXTERNAL):
+            # This should not occur, but raise an error if self.config_store is not
+            # CONFIG_ON_XBLOCK, CONFIG_ON_DB or CONFIG_EXTERNAL.
+            raise NotImplementedError
 
-            if external_multiple_launch_urls_enabled(self.location.course_key):
-                block = compat.load_enough_xblock(self.location)
+        resolved_config = self.get_resolved_config()
 
-                lti_launch_url = block.lti_1p3_launch_url or lti_launch_url
-
-            consumer = consumer_class(
-                iss=get_lti_api_base(),
-                lti_oidc_url=self.external_config.get('lti_1p3_oidc_url'),
-                lti_launch_url=lti_launch_url,
-                client_id=self.external_config.get('lti_1p3_client_id'),
-                deployment_id=self.external_config.get('lti_1p3_deployment_id', "1"),
-                rsa_key=self.external_config.get('lti_1p3_private_key'),
-                rsa_key_id=self.external_config.get('lti_1p3_private_key_id'),
-                # Registered redirect uris
-                redirect_uris=self.get_lti_1p3_redirect_uris(),
-                tool_key=self.external_config.get('lti_1p3_tool_public_key'),
-                tool_keyset_url=self.external_config.get('lti_1p3_tool_keyset_url'),
+        if self.config_store == self.CONFIG_EXTERNAL:
+            # Keys of external configurations are stored with them.
+            client_id = self.external_config.get('lti_1p3_client_id')
+            deployment_id = self.external_config.get('lti_1p3_deployment_id', "1")
+            rsa_key = self.external_config.get('lti_1p3_private_key')
+            rsa_key_id = self.external_config.get('lti_1p3_private_key_id')
+            signing_algorithm = self.external_config.get(
+                'lti_1p3_signing_algorithm', LTI_1P3_DEFAULT_SIGNING_ALGORITHM,
             )
         else:
-            # This should not occur, but raise an error if self.config_store is not
-            # CONFIG_ON_XBLOCK, CONFIG_ON_DB or CONFIG_EXTERNAL.
-            raise NotImplementedError
+            client_id = self.lti_1p3_client_id
+            # Deployment ID hardcoded to 1 since
+            # we're not using multi-tenancy.
+            deployment_id = "1"
+            rsa_key = self.lti_1p3_private_key
+            rsa_key_id = self.lti_1p3_private_key_id
+            signing_algorithm = self.lti_1p3_signing_algorithm
+
+        consumer = consumer_class(
+            iss=get_lti_api_base(),
+            lti_oidc_url=resolved_config.lti_1p3_oidc_url,
+            lti_launch_url=resolved_config.lti_1p3_launch_url,
+            client_id=client_id,
+            deployment_id=deployment_id,
+            # Platform private key
+            rsa_key=rsa_key,
+            rsa_key_id=rsa_key_id,
+            signing_algorithm=signing_algorithm,
+            # Registered redirect uris
+            redirect_uris=resolved_config.lti_1p3_redirect_uris,
+            # LTI 1.3 Tool key/keyset url
+            tool_key=resolved_config.lti_1p3_tool_public_key,
+            tool_keyset_url=resolved_config.lti_1p3_tool_keyset_url,
+        )
 
         if isinstance(consumer, LtiAdvantageConsumer):
-            self._setup_lti_1p3_ags(consumer)
-            self._setup_lti_1p3_deep_linking(consumer)
-            self._setup_lti_1p3_nrps(consumer)
+            self._setup_lti_1p3_ags(consumer, resolved_config)
+            self._setup_lti_1p3_deep_linking(consumer, resolved_config)
+            self._setup_lti_1p3_nrps(consumer, resolved_config)
 
         return consumer
 
@@ -756,18 +1005,24 @@ class LtiConfiguration(models.Model):
         return self.version
 
     @function_trace('lti_consumer.models.LtiConfiguration.get_lti_consumer')
-    def get_lti_consumer(self):
+    def get_lti_consumer(self, use_cache=True):
         """
         Returns an instanced class of LTI 1.1 or 1.3 consumer.
 
         When using external config, the version from the external config
         takes priority over the locally stored version to avoid version
         mismatch crashes.
+
+        LTI 1.3 consumers are built once per version of the configuration and
+        kept in `consumer_template_cache`, each call returns a clone of it.
+        Pass `use_cache=False` to build a consumer from unsaved changes.
         """
         effective_version = self.get_effective_version()
 
         if effective_version == self.LTI_1P3:
-            return self._get_lti_1p3_consumer()
+            if not use_cache:
+                return self._get_lti_1p3_consumer()
+            return consumer_template_cache.get_or_build(self.config_id, self._get_lti_1p3_consumer)
 
         return self._get_lti_1p1_consumer()
 
@@ -775,25 +1030,7 @@ class LtiConfiguration(models.Model):
         """
         Return pre-registered redirect uris or sensible defaults
         """
-        if self.config_store == self.CONFIG_EXTERNAL:
-            redirect_uris = self.external_config.get('lti_1p3_redirect_uris')
-            launch_url = self.external_config.get('lti_1p3_launch_url')
-            deep_link_launch_url = self.external_config.get('lti_advantage_deep_linking_launch_url')
-        elif self.config_store == self.CONFIG_ON_DB:
-            redirect_uris = self.lti_1p3_redirect_uris
-            launch_url = self.lti_1p3_launch_url
-            deep_link_launch_url = self.lti_advantage_deep_linking_launch_url
-        else:
-            block = compat.load_enough_xblock(self.location)
-            redirect_uris = block.lti_1p3_redirect_uris
-            launch_url = block.lti_1p3_launch_url
-            deep_link_launch_url = block.lti_advantage_deep_linking_launch_url
-
-        return choose_lti_1p3_redirect_uris(
-            redirect_uris,
-            launch_url,
-            deep_link_launch_url
-        )
+        return self.get_resolved_config().lti_1p3_redirect_uris
 
     @property
     def pii_share_username(self):
@@ -818,6 +1055,23 @@ class LtiConfiguration(models.Model):
         app_label = 'lti_consumer'
 
 
+def invalidate_external_config_cache(config_id=None):
+    """
+    Drop the cached LTIConfigurationListed results of an external configuration.
+
+    Filter plugins should call it when they update or delete a configuration.
+    Without a config_id, the results of every configuration are dropped. The
+    cached LTI 1.3 consumers of the configurations using it are dropped too.
+    """
+    external_config_cache.invalidate(config_id)
+
+    configurations = LtiConfiguration.objects.filter(config_store=LtiConfiguration.CONFIG_EXTERNAL)
+    if config_id is not None:
+        configurations = configurations.filter(external_id=config_id)
+    for lti_config_id in configurations.values_list('config_id', flat=True):
+        consumer_template_cache.invalidate(lti_config_id)
+
+
 class LtiAgsLineItem(models.Model):
     """
     Model to store LineItem data for LTI Assignments and Grades service.
@@ -872,6 +1126,12 @@ class LtiAgsLineItem(models.Model):
 
     class Meta:
         app_label = 'lti_consumer'
+        indexes = [
+            # Filters of the LineItem container of a configuration, paged by id.
+            models.Index(fields=['lti_configuration', 'resource_link_id', 'id'], name='lti_ags_lineitem_link_idx'),
+            models.Index(fields=['lti_configuration', 'resource_id', 'id'], name='lti_ags_lineitem_resource_idx'),
+            models.Index(fields=['lti_configuration', 'tag', 'id'], name='lti_ags_lineitem_tag_idx'),
+        ]
 
 
 class LtiAgsScore(models.Model):
@@ -963,6 +1223,10 @@ class LtiAgsScore(models.Model):
     class Meta:
         app_label = 'lti_consumer'
         unique_together = (('line_item', 'user_id'),)
+        indexes = [
+            # Keyset used to page through the results of a line item, most recent first.
+            models.Index(fields=['line_item', 'timestamp', 'id'], name='lti_ags_score_results_idx'),
+        ]
 
 
 class LtiDlContentItem(models.Model):
@@ -217,6 +217,33 @@ def get_user_from_external_user_id(external_user_id):  # pragma: nocover
         raise LtiError('Invalid userID') from exception
 
 
+def get_users_from_external_user_ids(external_user_ids):  # pragma: nocover
+    """
+    Import ExternalId model and map LTI external user ids to their users, skipping unknown ids.
+    """
+    # pylint: disable=import-error,import-outside-toplevel
+    from openedx.core.djangoapps.external_user_ids.models import ExternalId
+    external_ids = ExternalId.objects.filter(
+        external_user_id__in=external_user_ids,
+        external_id_type__name='lti',
+    ).select_related('user')
+    return {str(external_id.external_user_id): external_id.user for external_id in external_ids}
+
+
+def get_module_scores(location, users):  # pragma: nocover
+    """
+    Import StudentModule model and return the scores published to a block, as a dict mapping
+    user ids to (grade, max_grade) tuples. Users without a score on the block are left out.
+    """
+    # pylint: disable=import-error,import-outside-toplevel
+    from lms.djangoapps.courseware.models import StudentModule
+    modules = StudentModule.objects.filter(
+        module_state_key=location,
+        student__in=users,
+    ).values_list('student_id', 'grade', 'max_grade')
+    return {student_id: (grade, max_grade) for student_id, grade, max_grade in modules}
+
+
 def publish_grade(block, user, score, possible,
                   only_if_higher=False, score_deleted=None, comment=None):  # pragma: nocover
     """
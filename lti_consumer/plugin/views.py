@@ -1,18 +1,24 @@
 """
 LTI consumer plugin passthrough views
 """
+import base64
 import logging
 import sys
 import urllib.parse
+import uuid
+from datetime import datetime
 
 import jwt
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.exceptions import PermissionDenied, ValidationError
-from django.db import transaction
-from django.http import Http404, JsonResponse
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.http import Http404, HttpResponse, HttpResponseNotModified, JsonResponse
 from django.shortcuts import render
+from django.utils.cache import patch_cache_control
 from django.utils.crypto import get_random_string
+from django.utils.http import parse_etags
 from django.views.decorators.clickjacking import xframe_options_exempt, xframe_options_sameorigin
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
@@ -22,12 +28,15 @@ from opaque_keys import InvalidKeyError
 from opaque_keys.edx.keys import UsageKey
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST, HTTP_403_FORBIDDEN, HTTP_404_NOT_FOUND
 
 from lti_consumer.api import get_lti_pii_sharing_state_for_course, validate_lti_1p3_launch_data
 from lti_consumer.exceptions import ExternalConfigurationNotFound, LtiError
 from lti_consumer.filters import get_external_config_from_filter
+from lti_consumer.grades import get_grade_publish_backend, publish_line_item_grades
+from lti_consumer.lti_1p3.constants import LTI_1P3_DEFAULT_SIGNING_ALGORITHM
 from lti_consumer.lti_1p3.consumer import LtiConsumer1p3, LtiProctoringConsumer
 from lti_consumer.lti_1p3.exceptions import (
     BadJwtSignature,
@@ -63,11 +72,21 @@ from lti_consumer.lti_1p3.extensions.rest_framework.serializers import (
     LtiNrpsContextMembershipPIISerializer,
 )
 from lti_consumer.lti_1p3.extensions.rest_framework.utils import IgnoreContentNegotiation
-from lti_consumer.models import Lti1p3Passport, LtiAgsLineItem, LtiConfiguration, LtiDlContentItem
+from lti_consumer.models import Lti1p3Passport, LtiAgsLineItem, LtiAgsScore, LtiConfiguration, LtiDlContentItem
 from lti_consumer.plugin import compat
-from lti_consumer.signals.signals import LTI_1P3_PROCTORING_ASSESSMENT_STARTED
-from lti_consumer.track import track_event
-from lti_consumer.utils import _, get_data_from_cache, get_lti_1p3_context_types_claim, get_lti_api_base
+from lti_consumer.signals.signals import LTI_1P3_LAUNCH_TIMED, LTI_1P3_PROCTORING_ASSESSMENT_STARTED
+from lti_consumer.track import PhaseTimer, track_event
+from lti_consumer.utils import (
+    _,
+    build_lti_1p3_public_keyset,
+    get_cached_lti_1p3_launch_data,
+    get_data_from_cache,
+    get_lti_1p3_context_types_claim,
+    get_lti_1p3_launch_data_from_message_hint,
+    get_lti_1p3_public_keyset_cache_key,
+    get_lti_1p3_public_keyset_max_age,
+    get_lti_api_base,
+)
 
 
 def _build_url_with_query(request, query_params):
@@ -111,6 +130,56 @@ def _format_link_header(url, rel):
     return f'<{url}>; rel="{rel}"'
 
 
+def _encode_cursor(position):
+    """
+    Encode the position of a record in a keyset paginated list as an opaque cursor.
+    """
+    return base64.urlsafe_b64encode(position.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    """
+    Decode a cursor built by ``_encode_cursor`` into the position it holds.
+
+    Raises ``ValueError`` if the cursor is invalid.
+    """
+    return base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+
+
+def _encode_results_cursor(score):
+    """
+    Encode the position of an AGS score in the results of its line item as an opaque cursor.
+
+    Results are sorted by (timestamp, id), so the cursor holds both.
+    """
+    return _encode_cursor(f'{score.timestamp.isoformat()}|{score.pk}')
+
+
+def _decode_results_cursor(cursor):
+    """
+    Decode a cursor built by ``_encode_results_cursor`` into a (timestamp, id) tuple.
+
+    Returns ``None`` if the cursor is invalid.
+    """
+    try:
+        timestamp, pk = _decode_cursor(cursor).split('|')
+        return datetime.fromisoformat(timestamp), int(pk)
+    except ValueError:
+        return None
+
+
+def _decode_line_items_cursor(cursor):
+    """
+    Decode the cursor of a page of AGS line items into the id of the last line item of the previous page.
+
+    Returns ``None`` if the cursor is invalid.
+    """
+    try:
+        return int(_decode_cursor(cursor))
+    except ValueError:
+        return None
+
+
 def _parse_positive_int(value, default=None):
     """
     Parse *value* (a string or ``None``) as a positive integer.
@@ -138,6 +207,10 @@ def _parse_positive_int(value, default=None):
 
 log = logging.getLogger(__name__)
 
+# Maximum number of scores accepted by a single request to the AGS batch scores endpoint.
+# Can be overridden with the LTI_AGS_SCORES_BATCH_MAX_SIZE setting.
+DEFAULT_LTI_AGS_SCORES_BATCH_MAX_SIZE = 1000
+
 
 def has_block_access(user, block, course_key):
     """
@@ -168,6 +241,27 @@ def has_block_access(user, block, course_key):
     return course_access and block_access
 
 
+def _public_keyset_response(request, body, etag):
+    """
+    Return a public keyset response with HTTP caching headers.
+
+    Responds with a 304 (Not Modified) when the tool already has the current
+    keyset, according to the `If-None-Match` request header.
+    """
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match and (if_none_match.strip() == '*' or etag in parse_etags(if_none_match)):
+        response = HttpResponseNotModified()
+    else:
+        # The body is already serialized, so JsonResponse can't be used here.
+        # pylint: disable-next=http-response-with-content-type-json
+        response = HttpResponse(body, content_type='application/json')
+        response['Content-Disposition'] = 'attachment; filename=keyset.json'
+
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=get_lti_1p3_public_keyset_max_age())
+    return response
+
+
 @require_http_methods(["GET"])
 def public_keyset_endpoint(
     request,
@@ -183,6 +277,10 @@ def public_keyset_endpoint(
     OIDC response parameter `login_hint` to locate the block
     and run the proper handler.
 
+    Passport keysets are served from the cache without any database query,
+    and responses carry an ETag and Cache-Control header so tools polling
+    this endpoint can revalidate their copy with `If-None-Match`.
+
     Arguments:
         passport_id (UUID): passport_id of the Lti1p3Passport
         usage_id (UsageKey): location of the Block
@@ -190,24 +288,40 @@ def public_keyset_endpoint(
         external_slug (str): Slug of the external LTI configuration.
 
     Returns:
-        JsonResponse or Http404
+        HttpResponse, HttpResponseNotModified or Http404
     """
     external_id = f"{external_app}:{external_slug}"
 
     try:
+        if passport_id:
+            # Other spellings of the UUID (e.g. uppercase or without hyphens) share the cached keyset.
+            passport_id = uuid.UUID(str(passport_id))
+            # Only keysets of passports used by LTI 1.3 configurations are cached.
+            cached_keyset = get_data_from_cache(get_lti_1p3_public_keyset_cache_key(passport_id))
+            if cached_keyset:
+                return _public_keyset_response(request, *cached_keyset)
+
         version = None
-        public_jwk = {}
+        lti_passport = None
         if usage_id:
-            lti_config = LtiConfiguration.objects.get(location=UsageKey.from_string(usage_id))
+            lti_config = LtiConfiguration.objects.select_related('lti_1p3_passport').get(
+                location=UsageKey.from_string(usage_id),
+            )
             version = lti_config.version
-            public_jwk = lti_config.lti_1p3_public_jwk
+            if version == LtiConfiguration.LTI_1P3:
+                lti_config.get_or_create_lti_1p3_passport()
+                lti_passport = lti_config.lti_1p3_passport
         elif passport_id:
-            lti_passport = Lti1p3Passport.objects.get(passport_id=passport_id)
-            public_jwk = lti_passport.lti_1p3_public_jwk
             # TODO: move version inside passport from config
             # We just need any lti_config that is using this passport to check version
-            lti_config = LtiConfiguration.objects.filter(lti_1p3_passport=lti_passport).first()
-            version = lti_config.version
+            lti_passport = Lti1p3Passport.objects.annotate(
+                used_by_lti_1p3=Exists(LtiConfiguration.objects.filter(
+                    lti_1p3_passport=OuterRef('pk'),
+                    version=LtiConfiguration.LTI_1P3,
+                )),
+            ).get(passport_id=passport_id)
+            if lti_passport.used_by_lti_1p3:
+                version = LtiConfiguration.LTI_1P3
         elif external_app and external_slug:
             lti_config = get_external_config_from_filter({}, external_id)
 
@@ -215,7 +329,6 @@ def public_keyset_endpoint(
                 raise ExternalConfigurationNotFound("External LTI configuration not found")
 
             version = lti_config.get("version")
-            public_jwk = lti_config.get("lti_1p3_public_jwk", {})
 
         if version is None or version != LtiConfiguration.LTI_1P3:
             raise LtiError(
@@ -225,15 +338,19 @@ def public_keyset_endpoint(
         # Retrieve block's Public JWK
         # The underlying method will generate a new Private-Public Pair if one does
         # not exist, and retrieve the values.
-        response = JsonResponse(public_jwk)
-        response['Content-Disposition'] = 'attachment; filename=keyset.json'
-        return response
+        if lti_passport:
+            body, etag = lti_passport.get_lti_1p3_public_keyset()
+        else:
+            body, etag = build_lti_1p3_public_keyset(lti_config.get("lti_1p3_public_jwk", {}))
+
+        return _public_keyset_response(request, body, etag)
     except (
         InvalidKeyError,
         LtiConfiguration.DoesNotExist,
         Lti1p3Passport.DoesNotExist,
         ExternalConfigurationNotFound,
         LtiError,
+        ValueError,
     ) as exc:
         log.info(
             "Error while retrieving keyset for ID %s: %s",
@@ -256,8 +373,24 @@ def launch_gate_endpoint(request, suffix=None):  # pylint: disable=unused-argume
     Returns a response containing an auto-submitting form that directs the browser to make a POST to the Tool.
 
     Query Parameters:
-    * lti_message_hint (REQUIRED): a value used as a cache key to retrieved a cached instance of Lti1p3LaunchData
+    * lti_message_hint (REQUIRED): a value used as a cache key to retrieved a cached instance of Lti1p3LaunchData, or
+      carrying the encrypted Lti1p3LaunchData itself when stateless message hints are enabled
     * login_hint (REQUIRED): an identifier for the user that initiated the launch; it is stable and unique to the issuer
+
+    The duration of each phase of the launch is sent with the LTI_1P3_LAUNCH_TIMED signal.
+    """
+    timer = PhaseTimer(LTI_1P3_LAUNCH_TIMED)
+    response = None
+    try:
+        response = _launch_gate(request, timer)
+        return response
+    finally:
+        timer.send(status_code=getattr(response, 'status_code', None))
+
+
+def _launch_gate(request, timer):
+    """
+    Build the response of launch_gate_endpoint, marking the end of each phase of the launch on `timer`.
     """
     # pylint: disable=too-many-statements
     request_params = request.GET if request.method == 'GET' else request.POST
@@ -284,7 +417,8 @@ def launch_gate_endpoint(request, suffix=None):  # pylint: disable=unused-argume
             status=HTTP_400_BAD_REQUEST
         )
 
-    launch_data = get_data_from_cache(lti_message_hint)
+    launch_data = get_lti_1p3_launch_data_from_message_hint(lti_message_hint)
+    timer.mark('launch_data')
     if not launch_data:
         error_msg = (
             f'Unable to find record of an OIDC launch for the provided lti_message_hint: {lti_message_hint}'
@@ -298,6 +432,7 @@ def launch_gate_endpoint(request, suffix=None):  # pylint: disable=unused-argume
         )
 
     is_valid, validation_messages = validate_lti_1p3_launch_data(launch_data)
+    timer.mark('validation')
     if not is_valid:
         validation_message = " ".join(validation_messages)
         error_msg = f"The Lti1p3LaunchData is not valid. {validation_message}"
@@ -310,6 +445,7 @@ def launch_gate_endpoint(request, suffix=None):  # pylint: disable=unused-argume
         )
 
     config_id = launch_data.config_id
+    timer.annotate(config_id=str(config_id), message_type=launch_data.message_type)
     try:
         lti_config = LtiConfiguration.objects.get(
             config_id=config_id
@@ -317,6 +453,7 @@ def launch_gate_endpoint(request, suffix=None):  # pylint: disable=unused-argume
     except (LtiConfiguration.DoesNotExist, ValidationError) as exc:
         log.error("Invalid config_id '%s' for LTI 1.3 Launch callback", config_id)
         raise Http404 from exc
+    timer.mark('config')
 
     if lti_config.version != LtiConfiguration.LTI_1P3:
         error_msg = f"The LTI Version of the following configuration is not LTI 1.3: {lti_config}"
@@ -332,6 +469,7 @@ def launch_gate_endpoint(request, suffix=None):  # pylint: disable=unused-argume
 
     try:
         lti_consumer = lti_config.get_lti_consumer()
+        timer.mark('consumer')
 
         # Set sub and roles claims.
         user_id = launch_data.external_user_id if launch_data.external_user_id else launch_data.user_id
@@ -389,6 +527,7 @@ def launch_gate_endpoint(request, suffix=None):  # pylint: disable=unused-argume
         # Set LTI custom properties claim.
         if launch_data.custom_parameters:
             lti_consumer.set_custom_parameters(launch_data.custom_parameters)
+        timer.mark('claims')
 
         # Modify LTI launch parameters depending on launch type.
         # Deep Linking Launch - Configuration flow launched by
@@ -417,6 +556,7 @@ def launch_gate_endpoint(request, suffix=None):  # pylint: disable=unused-argume
                 url=dl_params.get('url'),
                 custom=dl_params.get('custom')
             )
+        timer.mark('deep_linking')
 
         if launch_data.message_type == 'LtiStartProctoring':
             # In the synchronizer token method of CSRF protection, the anti-CSRF token must be stored on the server.
@@ -443,6 +583,7 @@ def launch_gate_endpoint(request, suffix=None):  # pylint: disable=unused-argume
             lti_consumer.set_proctoring_data(
                 attempt_number=launch_data.proctoring_launch_data.attempt_number,
             )
+        timer.mark('proctoring')
 
         # Update context with LTI launch parameters
         context.update({
@@ -451,6 +592,7 @@ def launch_gate_endpoint(request, suffix=None):  # pylint: disable=unused-argume
                 preflight_response=preflight_response,
             )
         })
+        timer.mark('signing')
         event = {
             'lti_version': lti_config.version,
             'user_roles': user_role,
@@ -458,7 +600,9 @@ def launch_gate_endpoint(request, suffix=None):  # pylint: disable=unused-argume
         }
         track_event('xblock.launch_request', event)
 
-        return render(request, 'html/lti_1p3_launch.html', context)
+        response = render(request, 'html/lti_1p3_launch.html', context)
+        timer.mark('render')
+        return response
     except Lti1p3Exception as exc:
         resource_link_id = launch_data.resource_link_id
         error_msg = f"Error preparing LTI 1.3 launch for resource with resource_link_id {resource_link_id}: {exc}"
@@ -533,6 +677,7 @@ def access_token_endpoint(
                 deployment_id=None,
                 rsa_key=lti_passport.lti_1p3_private_key,
                 rsa_key_id=lti_passport.lti_1p3_private_key_id,
+                signing_algorithm=lti_passport.lti_1p3_signing_algorithm,
                 redirect_uris=None,
                 tool_key=lti_passport.lti_1p3_tool_public_key,
                 tool_keyset_url=lti_passport.lti_1p3_tool_keyset_url,
@@ -554,6 +699,7 @@ def access_token_endpoint(
                 deployment_id=None,
                 rsa_key=lti_config.get("lti_1p3_private_key"),
                 rsa_key_id=lti_config.get("lti_1p3_private_key_id"),
+                signing_algorithm=lti_config.get("lti_1p3_signing_algorithm", LTI_1P3_DEFAULT_SIGNING_ALGORITHM),
                 redirect_uris=None,
                 tool_key=lti_config.get("lti_1p3_tool_public_key"),
                 tool_keyset_url=lti_config.get("lti_1p3_tool_keyset_url"),
@@ -722,7 +868,7 @@ def deep_linking_content_endpoint(request, lti_config_id):
             status=HTTP_400_BAD_REQUEST
         )
 
-    launch_data = get_data_from_cache(launch_data_key)
+    launch_data = get_cached_lti_1p3_launch_data(launch_data_key)
     if not launch_data:
         error_msg = f'There was a cache miss during an LTI 1.3 launch when using the cache_key {launch_data_key}.'
         log.warning(error_msg)
@@ -806,6 +952,50 @@ class LtiAgsLineItemViewset(viewsets.ModelViewSet):
             lti_configuration=lti_configuration
         )
 
+    def list(self, request, *args, **kwargs):
+        """
+        Return the LineItem container of the LTI configuration.
+
+        Query Parameters:
+          * resource_link_id, resource_id, tag (string): Only return the LineItems with this value.
+          * limit (integer): The maximum number of LineItems to return. LineItems are
+                sorted by creation.
+          * cursor (string): Opaque position to return LineItems from, taken from the
+                ``Link`` header of the previous page.
+
+        When ``limit`` is present and more LineItems remain, a ``Link`` header with
+        ``rel="next"`` is included whose URL carries the same ``limit`` and filters,
+        and the cursor of the next page.
+        """
+        line_items = self.filter_queryset(self.get_queryset()).order_by('id')
+
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            last_id = _decode_line_items_cursor(cursor)
+            if last_id is None:
+                return Response({'detail': 'Invalid cursor.'}, status=HTTP_400_BAD_REQUEST)
+            line_items = line_items.filter(id__gt=last_id)
+
+        limit = _parse_positive_int(request.query_params.get('limit'))
+        has_next = False
+        if limit is not None:
+            # Fetch one more LineItem to know whether there's a next page.
+            line_items = list(line_items[:limit + 1])
+            has_next = len(line_items) > limit
+            line_items = line_items[:limit]
+
+        serializer = self.get_serializer(line_items, many=True)
+        response = Response(serializer.data)
+
+        if has_next:
+            next_url = _build_url_with_query(request, {
+                'limit': limit,
+                'cursor': _encode_cursor(str(line_items[-1].pk)),
+            })
+            response['Link'] = _format_link_header(next_url, 'next')
+
+        return response
+
     def perform_create(self, serializer):
         lti_configuration = self.request.lti_configuration
         serializer.save(lti_configuration=lti_configuration)
@@ -827,27 +1017,55 @@ class LtiAgsLineItemViewset(viewsets.ModelViewSet):
         Query Parameters:
           * limit (integer): The maximum number of records to return. Records are
                 sorted with most recent timestamp first
+          * cursor (string): Opaque position to return records from, taken from the
+                ``Link`` header of the previous page.
+
+        When ``limit`` is present and more records remain, a ``Link`` header with
+        ``rel="next"`` is included whose URL carries the same ``limit`` and the
+        cursor of the next page. Pages are read with a keyset on (timestamp, id),
+        so deep pages cost the same as the first one.
 
         Returns:
           * An array of Result records, formatted by LtiAgsResultSerializer
                 and returned with the media-type for LineItemResultsRenderer
         """
         line_item = self.get_object()
-        scores = line_item.scores.filter(score_given__isnull=False).order_by('-timestamp')
+        scores = line_item.scores.filter(score_given__isnull=False).order_by('-timestamp', '-id')
 
         if user_id:
             scores = scores.filter(user_id=user_id)
 
-        if request.query_params.get('limit'):
-            scores = scores[:int(request.query_params.get('limit'))]
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            position = _decode_results_cursor(cursor)
+            if position is None:
+                return Response({'detail': 'Invalid cursor.'}, status=HTTP_400_BAD_REQUEST)
+            timestamp, pk = position
+            scores = scores.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=pk))
+
+        limit = _parse_positive_int(request.query_params.get('limit'))
+        has_next = False
+        if limit is not None:
+            # Fetch one more record to know whether there's a next page.
+            scores = list(scores[:limit + 1])
+            has_next = len(scores) > limit
+            scores = scores[:limit]
 
         serializer = LtiAgsResultSerializer(
             list(scores),
             context={'request': self.request},
             many=True,
         )
+        response = Response(serializer.data)
+
+        if has_next:
+            next_url = _build_url_with_query(request, {
+                'limit': limit,
+                'cursor': _encode_results_cursor(scores[-1]),
+            })
+            response['Link'] = _format_link_header(next_url, 'next')
 
-        return Response(serializer.data)
+        return response
 
     @action(
         detail=True,
@@ -889,6 +1107,149 @@ class LtiAgsLineItemViewset(viewsets.ModelViewSet):
             headers=headers
         )
 
+    @action(
+        detail=True,
+        methods=['POST'],
+        url_path='scores/batch',
+        parser_classes=[LineItemScoreParser],
+        renderer_classes=[JSONRenderer],
+        content_negotiation_class=IgnoreContentNegotiation,
+    )
+    def scores_batch(self, request, *args, **kwargs):
+        """
+        Create or update the Score records of many users for an LtiAgsLineItem
+
+        This isn't part of the LTI AGS specification: it lets tools syncing the grades
+        of many users submit them in a single request instead of one per score. Scores
+        are validated like in the `scores` action and the valid ones are saved at once,
+        in a single transaction. The grades of the fully graded ones are then published
+        at once, once the transaction is over, or queued for the grade publish backend.
+
+        Data:
+          * A JSON array of objects capable of being serialized by LtiAgsScoreSerializer,
+                with at most one per userId
+
+        Returns:
+          * A `results` array with, for each submitted score in order, its `userId`, a
+                `status` (201 if created, 200 if updated, 400 if invalid, 500 if saved but
+                its grade failed to be published) and the saved `score`, formatted by
+                LtiAgsScoreSerializer, and/or the `errors`
+        """
+        line_item = self.get_object()
+
+        max_size = getattr(settings, 'LTI_AGS_SCORES_BATCH_MAX_SIZE', DEFAULT_LTI_AGS_SCORES_BATCH_MAX_SIZE)
+        if not isinstance(request.data, list) or not request.data:
+            return Response({'detail': 'Expected a non-empty array of scores.'}, status=HTTP_400_BAD_REQUEST)
+        if len(request.data) > max_size:
+            return Response(
+                {'detail': f'At most {max_size} scores can be submitted at once.'},
+                status=HTTP_400_BAD_REQUEST,
+            )
+
+        backend = get_grade_publish_backend()
+        try:
+            with transaction.atomic():
+                results, saved_scores = self._save_scores_batch(line_item, request.data)
+
+                # Bulk queries don't send post_save, so the grades are published here instead.
+                graded_scores = [
+                    score for score, _ in saved_scores
+                    if score.grading_progress == LtiAgsScore.FULLY_GRADED and score.score_given
+                ]
+                if backend is not None:
+                    for score in graded_scores:
+                        backend.enqueue(score)
+        except IntegrityError:
+            # Another request created a score for one of the users after they were read.
+            return Response(
+                {'detail': 'Scores of these users were submitted concurrently, retry the request.'},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        if backend is None and graded_scores:
+            # Published once the scores are saved, so the rows locked while saving them aren't
+            # held while the LMS grades are written. When the request itself runs in a
+            # transaction, they may still be rolled back after their grade is published.
+            user_ids = [score.user_id for score in graded_scores]
+            failed_user_ids = set(publish_line_item_grades(line_item.id, user_ids))
+            for result in results:
+                if 'score' in result and str(result['userId']) in failed_user_ids:
+                    result['status'] = status.HTTP_500_INTERNAL_SERVER_ERROR
+                    result['errors'] = {
+                        'grade': ['The score was saved but its grade could not be published to the LMS.'],
+                    }
+
+        return Response({'results': results}, status=HTTP_200_OK)
+
+    def _save_scores_batch(self, line_item, items):
+        """
+        Validate the submitted scores of a line item and save the valid ones with bulk queries.
+
+        Returns the result of each submitted score and a list of (score, created) tuples.
+        """
+        # Lock the existing scores so concurrent submissions can't update them in between.
+        user_ids = {str(item.get('userId')) for item in items if isinstance(item, dict)}
+        existing_scores = {
+            score.user_id: score
+            for score in line_item.scores.select_for_update().filter(user_id__in=user_ids)
+        }
+
+        results = []
+        created_scores = []
+        updated_scores = []
+        saved_user_ids = set()
+        for item in items:
+            if not isinstance(item, dict):
+                results.append({
+                    'userId': None,
+                    'status': 400,
+                    'errors': {'non_field_errors': ['Expected a score object.']},
+                })
+                continue
+
+            user_id = item.get('userId')
+            existing_score = existing_scores.get(str(user_id))
+            serializer = LtiAgsScoreSerializer(instance=existing_score, data=item, context={'request': self.request})
+            if not serializer.is_valid():
+                results.append({'userId': user_id, 'status': 400, 'errors': serializer.errors})
+                continue
+
+            validated_data = serializer.validated_data
+            if validated_data['user_id'] in saved_user_ids:
+                results.append({
+                    'userId': user_id,
+                    'status': 400,
+                    'errors': {'userId': ['Only one score per user can be submitted at once.']},
+                })
+                continue
+
+            score = existing_score or LtiAgsScore(line_item=line_item)
+            for field_name, value in validated_data.items():
+                setattr(score, field_name, value)
+            try:
+                # Same as full_clean, without the uniqueness checks and line item lookup, which
+                # would run queries for every score.
+                score.clean_fields(exclude=['line_item'])
+                score.clean()
+            except ValidationError as exc:
+                results.append({'userId': user_id, 'status': 400, 'errors': exc.message_dict})
+                continue
+
+            saved_user_ids.add(score.user_id)
+            results.append({'userId': user_id, 'status': 200 if existing_score else 201, 'score': score})
+            (updated_scores if existing_score else created_scores).append(score)
+
+        LtiAgsScore.objects.bulk_create(created_scores)
+        LtiAgsScore.objects.bulk_update(
+            updated_scores,
+            ['timestamp', 'score_given', 'score_maximum', 'comment', 'activity_progress', 'grading_progress'],
+        )
+
+        for result in results:
+            if 'score' in result:
+                result['score'] = LtiAgsScoreSerializer(result['score'], context={'request': self.request}).data
+        return results, [(score, True) for score in created_scores] + [(score, False) for score in updated_scores]
+
 
 class LtiNrpsContextMembershipViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -1061,7 +1422,7 @@ def start_proctoring_assessment_endpoint(request):
     }
 
     launch_data_key = get_cache_key(**common_cache_key_arguments, key="launch_data")
-    launch_data = get_data_from_cache(launch_data_key)
+    launch_data = get_cached_lti_1p3_launch_data(launch_data_key)
     if not launch_data:
         log.warning(
             f'There was a cache miss trying to fetch the launch data during an LTI 1.3 proctoring StartAssessment '
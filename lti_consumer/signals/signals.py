@@ -4,14 +4,25 @@ LTI Consumer related Signal handlers
 import logging
 import uuid
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import Signal, receiver
+from opaque_keys.edx.keys import UsageKey
+from opaque_keys.edx.locator import LibraryLocatorV2, LibraryUsageLocatorV2
 from openedx_events.content_authoring.data import DuplicatedXBlockData, LibraryBlockData, XBlockData
-from openedx_events.content_authoring.signals import LIBRARY_BLOCK_DELETED, XBLOCK_DELETED, XBLOCK_DUPLICATED
+from openedx_events.content_authoring.signals import (
+    LIBRARY_BLOCK_DELETED,
+    LIBRARY_BLOCK_UPDATED,
+    XBLOCK_DELETED,
+    XBLOCK_DUPLICATED,
+    XBLOCK_PUBLISHED,
+    XBLOCK_UPDATED,
+)
 
-from lti_consumer.models import Lti1p3Passport, LtiAgsScore, LtiConfiguration
+from lti_consumer.grades import get_grade_publish_backend, publish_score_grade
+from lti_consumer.lti_1p3.consumer_cache import consumer_template_cache
+from lti_consumer.models import Lti1p3Passport, LtiAgsLineItem, LtiAgsScore, LtiConfiguration
 from lti_consumer.plugin import compat
-from lti_consumer.utils import model_to_dict
+from lti_consumer.utils import invalidate_lti_1p3_public_keyset_cache, model_to_dict
 
 log = logging.getLogger(__name__)
 SignalHandler = compat.get_signal_handler()
@@ -25,65 +36,15 @@ def publish_grade_on_score_update(sender, instance, **kwargs):  # pylint: disabl
     This method DOES NOT WORK on Studio, since it relies on APIs only available and configured
     in the LMS. Trying to trigger this signal from Studio (from the Django-admin interface, for example)
     throw an exception.
-    """
-    line_item = instance.line_item
-    lti_config = line_item.lti_configuration
-
-    # Only save score if the `line_item.resource_link_id` is the same as
-    # `lti_configuration.location` to prevent LTI tools to alter grades they don't
-    # have permissions to.
-    # TODO: This security mechanism will need to be reworked once we enable LTI 1.3
-    # reusability to allow one configuration to save scores on multiple placements,
-    # but still locking down access to the items that are using the LTI configuration.
-    if line_item.resource_link_id != lti_config.location:
-        log.warning(
-            "LTI tool tried publishing score %r to block %s (outside allowed scope of: %s).",
-            instance,
-            line_item.resource_link_id,
-            lti_config.location,
-        )
-        return
 
-    # Before starting to publish grades to the LMS, check that:
-    # 1. The grade being submitted in the final one - `FullyGraded`
-    # 2. This LineItem is linked to a LMS grade - the `LtiResouceLinkId` field is set
-    # 3. There's a valid grade in this score - `scoreGiven` is set
-    if instance.grading_progress == LtiAgsScore.FULLY_GRADED \
-            and line_item.resource_link_id \
-            and instance.score_given:
-        try:
-            # Load block using LMS APIs and check if the block is graded and still accept grades.
-            block = compat.load_block_as_user(line_item.resource_link_id)
-            if block.has_score and (not block.is_past_due() or block.accept_grades_past_due):
-                # Map external ID to platform user
-                user = compat.get_user_from_external_user_id(instance.user_id)
-
-                # The LTI AGS spec allow tools to send grades higher than score maximum, so
-                # we have to cap the score sent to the gradebook to the maximum allowed value.
-                # Also, this is an normalized score ranging from 0 to 1.
-                score = min(instance.score_given, instance.score_maximum) / instance.score_maximum
-
-                # Set module score using XBlock custom method to do so.
-                # This saves the score on both the XBlock's K/V store as well as in
-                # the LMS database.
-                log.info(
-                    "Publishing LTI grade from block %s to LMS. User: %s (score: %s)",
-                    block.scope_ids.usage_id,
-                    user,
-                    score,
-                )
-                block.set_user_module_score(user, score, block.max_score(), instance.comment)
-
-        # This is a catch all exception to catch and log any issues related to loading the block
-        # from the modulestore and other LMS API calls
-        except Exception as exc:
-            log.exception(
-                "Error while publishing score %r to block %s to LMS: %s",
-                instance,
-                line_item.resource_link_id,
-                exc,
-            )
-            raise exc
+    When a grade publish backend is set (see `lti_consumer.grades`), the score is only queued
+    for it, and its grade is published later.
+    """
+    backend = get_grade_publish_backend()
+    if backend is None:
+        publish_score_grade(instance)
+    elif instance.grading_progress == LtiAgsScore.FULLY_GRADED and instance.score_given:
+        backend.enqueue(instance)
 
 
 @receiver(post_save, sender=LtiConfiguration, dispatch_uid='create_lti_1p3_passport')
@@ -91,6 +52,133 @@ def create_lti_1p3_passport(sender, instance: LtiConfiguration, **kwargs):  # py
     instance.get_or_create_lti_1p3_passport()
 
 
+@receiver(post_save, sender=Lti1p3Passport, dispatch_uid='invalidate_lti_1p3_public_keyset_on_save')
+@receiver(post_delete, sender=Lti1p3Passport, dispatch_uid='invalidate_lti_1p3_public_keyset_on_delete')
+def invalidate_lti_1p3_public_keyset(sender, instance: Lti1p3Passport, **kwargs):  # pylint: disable=unused-argument
+    """
+    Drop the cached public keyset of a passport whenever it is saved or deleted, so key changes are served right away.
+    """
+    invalidate_lti_1p3_public_keyset_cache(instance.passport_id)
+
+
+def _invalidate_lti_1p3_public_keysets(passports):
+    """
+    Drop the cached public keysets of the given passports queryset.
+    """
+    for passport_id in passports.values_list('passport_id', flat=True):
+        invalidate_lti_1p3_public_keyset_cache(passport_id)
+
+
+@receiver(pre_save, sender=LtiConfiguration, dispatch_uid='invalidate_previous_lti_1p3_public_keyset')
+def invalidate_previous_lti_1p3_public_keyset(sender, instance: LtiConfiguration, **kwargs):  # pylint: disable=unused-argument
+    """
+    Drop the cached public keyset of the passport stored for a configuration before it is saved.
+
+    Keysets are only served for passports used by LTI 1.3 configurations, so the cached
+    keyset must go when its last LTI 1.3 configuration switches to LTI 1.1 or moves to
+    another passport.
+    """
+    if instance.pk:
+        _invalidate_lti_1p3_public_keysets(Lti1p3Passport.objects.filter(lticonfiguration=instance.pk))
+
+
+@receiver(post_save, sender=LtiConfiguration, dispatch_uid='invalidate_lti_1p3_public_keyset_on_config_save')
+@receiver(post_delete, sender=LtiConfiguration, dispatch_uid='invalidate_lti_1p3_public_keyset_on_config_delete')
+def invalidate_lti_1p3_public_keyset_on_config_change(sender, instance: LtiConfiguration, **kwargs):  # pylint: disable=unused-argument
+    """
+    Drop the cached public keyset of a configuration's passport whenever the configuration is saved or deleted.
+    """
+    if instance.lti_1p3_passport_id:
+        _invalidate_lti_1p3_public_keysets(Lti1p3Passport.objects.filter(pk=instance.lti_1p3_passport_id))
+
+
+def _invalidate_lti_consumers(configurations):
+    """
+    Drop the cached LTI 1.3 consumers of the given configurations queryset.
+    """
+    for config_id in configurations.values_list('config_id', flat=True):
+        consumer_template_cache.invalidate(config_id)
+
+
+@receiver(post_save, sender=LtiConfiguration, dispatch_uid='invalidate_lti_consumer_on_config_save')
+@receiver(post_delete, sender=LtiConfiguration, dispatch_uid='invalidate_lti_consumer_on_config_delete')
+def invalidate_lti_consumer_on_config_change(sender, instance: LtiConfiguration, **kwargs):  # pylint: disable=unused-argument
+    """
+    Drop the cached LTI 1.3 consumer of a configuration whenever it is saved or deleted.
+
+    Registered after `create_lti_1p3_passport`, so passports linked to the configuration
+    on save are picked up too.
+    """
+    consumer_template_cache.invalidate(instance.config_id)
+
+
+@receiver(post_save, sender=Lti1p3Passport, dispatch_uid='invalidate_lti_consumer_on_passport_save')
+def invalidate_lti_consumer_on_passport_change(sender, instance: Lti1p3Passport, **kwargs):  # pylint: disable=unused-argument
+    """
+    Drop the cached LTI 1.3 consumers of every configuration using a passport whenever it is saved.
+    """
+    _invalidate_lti_consumers(instance.lticonfiguration_set.all())
+
+
+@receiver(post_save, sender=LtiAgsLineItem, dispatch_uid='invalidate_lti_consumer_on_line_item_save')
+@receiver(post_delete, sender=LtiAgsLineItem, dispatch_uid='invalidate_lti_consumer_on_line_item_delete')
+def invalidate_lti_consumer_on_line_item_change(sender, instance: LtiAgsLineItem, **kwargs):  # pylint: disable=unused-argument
+    """
+    Drop the cached LTI 1.3 consumer of a configuration whenever one of its line items changes,
+    since the consumer's AGS claim links to its first line item.
+    """
+    if instance.lti_configuration_id:
+        _invalidate_lti_consumers(LtiConfiguration.objects.filter(pk=instance.lti_configuration_id))
+
+
+@receiver(XBLOCK_UPDATED, dispatch_uid='invalidate_lti_consumer_on_xblock_updated')
+@receiver(LIBRARY_BLOCK_UPDATED, dispatch_uid='invalidate_lti_consumer_on_library_block_updated')
+def invalidate_lti_consumer_on_block_change(**kwargs):
+    """
+    Drop the cached LTI 1.3 consumer of a block's configuration whenever the block changes,
+    since configurations stored on the block read their settings from it.
+    """
+    block_data = kwargs.get("xblock_info") or kwargs.get("library_block")
+    if not block_data or not isinstance(block_data, (XBlockData, LibraryBlockData)):
+        log.error("Received null or incorrect data for event")
+        return
+
+    _invalidate_lti_consumers(LtiConfiguration.objects.filter(location=str(block_data.usage_key)))
+
+
+@receiver(XBLOCK_PUBLISHED, dispatch_uid='invalidate_lti_consumer_on_xblock_published')
+def invalidate_lti_consumer_on_block_publish(**kwargs):
+    """
+    Drop the cached LTI 1.3 consumers of every block in a course whenever part of it is published.
+
+    The event is sent for the published container (e.g. a unit), not for each
+    block in it, so the configurations of the whole course are dropped.
+    """
+    xblock_info = kwargs.get("xblock_info", None)
+    if not xblock_info or not isinstance(xblock_info, XBlockData):
+        log.error("Received null or incorrect data for event")
+        return
+
+    context_key = UsageKey.from_string(str(xblock_info.usage_key)).context_key
+    _invalidate_lti_consumers(LtiConfiguration.objects.filter(location__startswith=_get_location_prefix(context_key)))
+
+
+def _get_location_prefix(context_key):
+    """
+    Return the prefix shared by the locations of the blocks of a course or library.
+
+    e.g. "block-v1:org+course+run+type@" for a course or "lb:org:library:" for a library. Locations
+    of old-style courses (i4x://org/course/type/name) don't include the course run, so their prefix
+    is shared by every run of the course.
+    """
+    if isinstance(context_key, LibraryLocatorV2):
+        usage_key = LibraryUsageLocatorV2(context_key, 'lti_consumer', 'block')
+    else:
+        usage_key = context_key.make_usage_key('lti_consumer', 'block')
+    location = str(usage_key)
+    return location[:location.rindex('lti_consumer')]
+
+
 @receiver(SignalHandler.pre_item_delete if SignalHandler else [])
 def delete_child_lti_configurations(**kwargs):
     """
@@ -198,3 +286,14 @@ def duplicate_xblock_lti_configuration(**kwargs):
 
 
 LTI_1P3_PROCTORING_ASSESSMENT_STARTED = Signal()
+
+# Sent at the end of every LTI 1.3 launch (launch_gate_endpoint) with the duration
+# in seconds of each of its phases, to monitor where launch latency goes:
+# * timings: dict of phase name to duration, in the order the phases ran. Phases are
+#   launch_data, validation, config, consumer, claims, deep_linking, proctoring,
+#   signing and render; launches that stop early don't have the later ones.
+# * status_code: the status code of the response, None if the view raised.
+# * config_id and message_type: from the launch data, when it is valid.
+# The phases are only timed when the signal has receivers. Errors raised by receivers
+# are logged and don't affect the launch.
+LTI_1P3_LAUNCH_TIMED = Signal()
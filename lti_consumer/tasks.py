@@ -0,0 +1,17 @@
+"""
+Celery tasks of the LTI Consumer XBlock
+
+Celery isn't a dependency of this package: this module is only imported by the
+workers of platforms running Celery, and by the backends queuing these tasks.
+"""
+from celery import shared_task  # pylint: disable=import-error
+
+from lti_consumer.grades import CeleryGradePublishBackend
+
+
+@shared_task
+def publish_lti_ags_grades(line_item_id, user_ids):
+    """
+    Publish the grades of the latest LTI AGS scores of users on a line item.
+    """
+    CeleryGradePublishBackend.run(line_item_id, user_ids)
@@ -6,6 +6,7 @@ import urllib
 from unittest.mock import Mock, patch
 
 from django.test.testcases import TestCase
+from edx_django_utils.cache import TieredCache
 from opaque_keys.edx.keys import CourseKey
 from opaque_keys.edx.locator import LocalId
 from webob import Request
@@ -127,6 +128,9 @@ class TestBaseWithPatch(TestCase):
         self.patcher_load.start()
         self.patcher_save.start()
 
+        # Drop cached configurations and consumers left behind by other tests.
+        TieredCache.dangerous_clear_all_tiers()
+
         super().setUp()
 
     def tearDown(self):
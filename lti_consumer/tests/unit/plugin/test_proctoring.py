@@ -53,6 +53,7 @@ class TestLti1p3ProctoringStartProctoringAssessmentEndpoint(TestBaseWithPatch):
         self.public_key = self.private_key.publickey().export_key().decode()
 
         self.lti_config.lti_1p3_passport.lti_1p3_tool_public_key = self.public_key
+        self.lti_config.lti_1p3_passport.save()
         self.lti_config.save()
 
     def _setup_user(self):
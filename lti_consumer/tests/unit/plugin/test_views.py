@@ -8,6 +8,8 @@ from unittest.mock import Mock, patch
 import ddt
 import jwt
 from Cryptodome.PublicKey import RSA
+from django.http import Http404
+from django.test import RequestFactory
 from django.urls import reverse
 from edx_django_utils.cache import TieredCache, get_cache_key
 from jwt.api_jwk import PyJWK
@@ -25,9 +27,11 @@ from lti_consumer.lti_1p3.exceptions import (
 )
 from lti_consumer.lti_1p3.tests.utils import create_jwt
 from lti_consumer.lti_xblock import LtiConsumerXBlock
-from lti_consumer.models import LtiConfiguration, LtiDlContentItem
+from lti_consumer.models import Lti1p3Passport, LtiConfiguration, LtiDlContentItem
+from lti_consumer.plugin.views import public_keyset_endpoint
+from lti_consumer.signals.signals import LTI_1P3_LAUNCH_TIMED
 from lti_consumer.tests.test_utils import TestBaseWithPatch, make_xblock
-from lti_consumer.utils import cache_lti_1p3_launch_data
+from lti_consumer.utils import cache_lti_1p3_launch_data, encode_lti_1p3_message_hint
 
 
 @ddt.ddt
@@ -48,6 +52,7 @@ class TestLti1p3KeysetEndpoint(TestBaseWithPatch):
             config_store=LtiConfiguration.CONFIG_ON_XBLOCK,
             location=UsageKey.from_string(self.location)
         )
+        TieredCache.dangerous_clear_all_tiers()
 
     def test_public_keyset_endpoint(self):
         """
@@ -116,6 +121,124 @@ class TestLti1p3KeysetEndpoint(TestBaseWithPatch):
             json.loads(response.content.decode('utf-8'))
         )
 
+    def test_public_keyset_cache_headers(self):
+        """
+        Check that the keyset is returned with a strong ETag and a Cache-Control header.
+        """
+        response = self.client.get(self.url)
+
+        self.assertRegex(response['ETag'], r'^"[0-9a-f]{64}"$')
+        self.assertIn('max-age=3600', response['Cache-Control'])
+        self.assertIn('public', response['Cache-Control'])
+
+    @ddt.data('{etag}', 'W/"other", {etag}', '*')
+    def test_public_keyset_not_modified(self, if_none_match):
+        """
+        Check that a 304 is returned when the tool already has the current keyset.
+        """
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=if_none_match.format(etag=etag))
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertFalse(response.content)
+
+    def test_public_keyset_modified(self):
+        """
+        Check that the keyset is returned when the tool has an outdated keyset.
+        """
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"outdated"')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content)
+
+    def test_public_keyset_passport_cached(self):
+        """
+        Check that passport keysets are served from the cache without querying the database.
+        """
+        url = f'/lti_consumer/v1/public_keysets/{self.lti_config.passport_id}'
+        response = self.client.get(url)
+
+        with self.assertNumQueries(0):
+            cached_response = self.client.get(url)
+
+        self.assertEqual(cached_response.content, response.content)
+        self.assertEqual(cached_response['ETag'], response['ETag'])
+
+    @ddt.data(str.upper, lambda passport_id: passport_id.replace('-', ''))
+    def test_public_keyset_passport_id_normalized(self, spell):
+        """
+        Check that other spellings of the passport id are served from the same cached keyset.
+        """
+        passport_id = str(self.lti_config.passport_id)
+        response = self.client.get(f'/lti_consumer/v1/public_keysets/{passport_id}')
+
+        with self.assertNumQueries(0):
+            cached_response = public_keyset_endpoint(RequestFactory().get('/'), passport_id=spell(passport_id))
+
+        self.assertEqual(cached_response.content, response.content)
+
+    def test_public_keyset_invalid_passport_id(self):
+        """
+        Check that a passport id that isn't a UUID yields a HTTP code 404.
+        """
+        with self.assertRaises(Http404):
+            public_keyset_endpoint(RequestFactory().get('/'), passport_id='invalid')
+
+    def test_public_keyset_passport_invalidated(self):
+        """
+        Check that the cached keyset is dropped when the passport keys change.
+        """
+        url = f'/lti_consumer/v1/public_keysets/{self.lti_config.passport_id}'
+        etag = self.client.get(url)['ETag']
+
+        passport = self.lti_config.lti_1p3_passport
+        passport.lti_1p3_internal_private_key = ''
+        passport.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        passport.refresh_from_db()
+        self.assertEqual(passport.lti_1p3_public_jwk, json.loads(response.content.decode('utf-8')))
+
+    def test_public_keyset_passport_wrong_lti_version(self):
+        """
+        Check that a 404 is returned for passports only used by LTI 1.1 configurations.
+        """
+        self.lti_config.version = LtiConfiguration.LTI_1P1
+        self.lti_config.save()
+
+        response = self.client.get(f'/lti_consumer/v1/public_keysets/{self.lti_config.passport_id}')
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_public_keyset_passport_cached_wrong_lti_version(self):
+        """
+        Check that the cached keyset of a passport is dropped when its last LTI 1.3 configuration switches to LTI 1.1.
+        """
+        url = f'/lti_consumer/v1/public_keysets/{self.lti_config.passport_id}'
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        self.lti_config.version = LtiConfiguration.LTI_1P1
+        self.lti_config.save()
+
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_public_keyset_passport_cached_passport_changed(self):
+        """
+        Check that the cached keyset of a passport is dropped when its configuration moves to another passport.
+        """
+        url = f'/lti_consumer/v1/public_keysets/{self.lti_config.passport_id}'
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        self.lti_config.lti_1p3_passport = Lti1p3Passport.objects.create()
+        self.lti_config.save()
+
+        self.assertEqual(self.client.get(url).status_code, 404)
+
     @patch('lti_consumer.plugin.views.get_external_config_from_filter')
     def test_public_keyset_endpoint_using_external_id_in_url(self, get_external_config_from_filter):
         """
@@ -218,6 +341,7 @@ class TestLti1p3LaunchGateEndpoint(TestBaseWithPatch):
         Check that a 404 is returned when LtiConfiguration for a location doesn't exist
         """
         self.launch_data.config_id = "1"
+        self.launch_data_key = cache_lti_1p3_launch_data(self.launch_data)
         response = self.client.get(
             self.url,
             {
@@ -251,7 +375,7 @@ class TestLti1p3LaunchGateEndpoint(TestBaseWithPatch):
             str(response.content)
         )
 
-    @patch('lti_consumer.plugin.views.get_data_from_cache')
+    @patch('lti_consumer.plugin.views.get_lti_1p3_launch_data_from_message_hint')
     def test_missing_launch_data(self, mock_get_data_from_cache):
         """
         Check that the expected error message returned when required lti_message_hint query parameter
@@ -269,7 +393,7 @@ class TestLti1p3LaunchGateEndpoint(TestBaseWithPatch):
         )
 
     @patch('lti_consumer.plugin.views.validate_lti_1p3_launch_data')
-    @patch('lti_consumer.plugin.views.get_data_from_cache')
+    @patch('lti_consumer.plugin.views.get_lti_1p3_launch_data_from_message_hint')
     def test_invalid_launch_data(self, mock_get_data_from_cache, mock_validate_launch_data):
         """
         Check that a 400 error is returned when the launch_data stored in the cache is not valid.
@@ -292,7 +416,7 @@ class TestLti1p3LaunchGateEndpoint(TestBaseWithPatch):
         )
 
     @patch('lti_consumer.plugin.views.validate_lti_1p3_launch_data')
-    @patch('lti_consumer.plugin.views.get_data_from_cache')
+    @patch('lti_consumer.plugin.views.get_lti_1p3_launch_data_from_message_hint')
     def test_invalid_context_type(self, mock_get_data_from_cache, mock_validate_launch_data):
         # Mock getting the launch_data from the cache.
         mock_get_data_from_cache.return_value = Lti1p3LaunchData(
@@ -350,6 +474,127 @@ class TestLti1p3LaunchGateEndpoint(TestBaseWithPatch):
         self.assertIn("state", content)
         self.assertIn("hello-world", content)
 
+    def test_lti_launch_response_stateless_message_hint(self):
+        """
+        Check that launches with a stateless lti_message_hint don't read the launch data from the cache.
+        """
+        TieredCache.dangerous_clear_all_tiers()
+        params = {
+            "nonce": "nonce-value",
+            "state": "hello-world",
+            "redirect_uri": "https://tool.example",
+            "client_id": self.config.lti_1p3_client_id,
+            "login_hint": self.launch_data.user_id,
+            "lti_message_hint": encode_lti_1p3_message_hint(self.launch_data),
+        }
+        with patch('lti_consumer.utils.get_data_from_cache') as mock_get_data_from_cache:
+            response = self.client.get(self.url, params)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("hello-world", response.content.decode('utf-8'))
+        mock_get_data_from_cache.assert_not_called()
+
+    def test_lti_launch_timings(self):
+        """
+        Check that the duration of each phase of the launch is sent with the LTI_1P3_LAUNCH_TIMED signal.
+        """
+        receiver = Mock()
+        LTI_1P3_LAUNCH_TIMED.connect(receiver)
+        self.addCleanup(LTI_1P3_LAUNCH_TIMED.disconnect, receiver)
+        params = {
+            "nonce": "nonce-value",
+            "state": "hello-world",
+            "redirect_uri": "https://tool.example",
+            "client_id": self.config.lti_1p3_client_id,
+            "login_hint": self.launch_data.user_id,
+            "lti_message_hint": self.launch_data_key
+        }
+
+        response = self.client.get(self.url, params)
+
+        self.assertEqual(response.status_code, 200)
+        receiver.assert_called_once()
+        kwargs = receiver.call_args.kwargs
+        self.assertEqual(kwargs['status_code'], 200)
+        self.assertEqual(kwargs['config_id'], str(self.config.config_id))
+        self.assertEqual(kwargs['message_type'], 'LtiResourceLinkRequest')
+        self.assertEqual(
+            list(kwargs['timings']),
+            [
+                'launch_data', 'validation', 'config', 'consumer', 'claims', 'deep_linking', 'proctoring',
+                'signing', 'render',
+            ],
+        )
+        self.assertTrue(all(duration >= 0 for duration in kwargs['timings'].values()))
+
+    @patch('lti_consumer.track.time.perf_counter')
+    def test_lti_launch_not_timed_without_receivers(self, mock_perf_counter):
+        """
+        Check that launches aren't timed when nothing listens to the LTI_1P3_LAUNCH_TIMED signal.
+        """
+        params = {
+            "nonce": "nonce-value",
+            "state": "hello-world",
+            "redirect_uri": "https://tool.example",
+            "client_id": self.config.lti_1p3_client_id,
+            "login_hint": self.launch_data.user_id,
+            "lti_message_hint": self.launch_data_key
+        }
+
+        response = self.client.get(self.url, params)
+
+        self.assertEqual(response.status_code, 200)
+        mock_perf_counter.assert_not_called()
+
+    def test_lti_launch_timings_failed_launch(self):
+        """
+        Check that launches ending early or raising only send the phases that ran.
+        """
+        receiver = Mock()
+        LTI_1P3_LAUNCH_TIMED.connect(receiver)
+        self.addCleanup(LTI_1P3_LAUNCH_TIMED.disconnect, receiver)
+        self.launch_data.config_id = "1"
+        self.launch_data_key = cache_lti_1p3_launch_data(self.launch_data)
+
+        response = self.client.get(
+            self.url,
+            {"login_hint": self.launch_data.user_id, "lti_message_hint": self.launch_data_key},
+        )
+        self.client.get(self.url, {"login_hint": self.launch_data.user_id, "lti_message_hint": "unknown"})
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(receiver.call_count, 2)
+        not_found_kwargs, unknown_hint_kwargs = (call.kwargs for call in receiver.call_args_list)
+        self.assertIsNone(not_found_kwargs['status_code'])
+        self.assertEqual(list(not_found_kwargs['timings']), ['launch_data', 'validation'])
+        self.assertEqual(unknown_hint_kwargs['status_code'], 400)
+        self.assertEqual(list(unknown_hint_kwargs['timings']), ['launch_data'])
+        self.assertNotIn('config_id', unknown_hint_kwargs)
+
+    @patch('django.dispatch.dispatcher.logger')
+    def test_lti_launch_timings_receiver_error(self, mock_logger):
+        """
+        Check that errors raised by LTI_1P3_LAUNCH_TIMED receivers are logged and don't break the launch.
+        """
+        def receiver(**kwargs):
+            raise Exception("receiver error")  # pylint: disable=broad-exception-raised
+
+        LTI_1P3_LAUNCH_TIMED.connect(receiver)
+        self.addCleanup(LTI_1P3_LAUNCH_TIMED.disconnect, receiver)
+        params = {
+            "nonce": "nonce-value",
+            "state": "hello-world",
+            "redirect_uri": "https://tool.example",
+            "client_id": self.config.lti_1p3_client_id,
+            "login_hint": self.launch_data.user_id,
+            "lti_message_hint": self.launch_data_key
+        }
+
+        response = self.client.get(self.url, params)
+
+        self.assertEqual(response.status_code, 200)
+        mock_logger.error.assert_called_once()
+
     def test_launch_callback_endpoint_fails(self):
         """
         Test that the LTI 1.3 callback endpoint correctly display an error message.
@@ -391,6 +636,7 @@ class TestLti1p3LaunchGateEndpoint(TestBaseWithPatch):
         self.xblock.runtime.service.return_value = mock_user_service
 
         self.launch_data.user_role = user_role
+        self.launch_data_key = cache_lti_1p3_launch_data(self.launch_data)
 
         self.xblock.course.display_name_with_default = 'course_display_name'
         self.xblock.course.display_org_with_default = 'course_display_org'
@@ -444,6 +690,7 @@ class TestLti1p3LaunchGateEndpoint(TestBaseWithPatch):
         if dl_enabled:
             self.xblock.lti_advantage_deep_linking_launch_url = deep_link_url
         self.launch_data.message_type = message_type
+        self.launch_data_key = cache_lti_1p3_launch_data(self.launch_data)
 
         params = {
             "client_id": self.config.lti_1p3_client_id,
@@ -471,6 +718,7 @@ class TestLti1p3LaunchGateEndpoint(TestBaseWithPatch):
         # Enable deep linking
         self.xblock.lti_advantage_deep_linking_enabled = True
         self.launch_data.message_type = "LtiDeepLinkingRequest"
+        self.launch_data_key = cache_lti_1p3_launch_data(self.launch_data)
 
         params = {
             "client_id": self.config.lti_1p3_client_id,
@@ -571,6 +819,7 @@ class TestLti1p3LaunchGateEndpoint(TestBaseWithPatch):
         )
 
         self.launch_data.proctoring_launch_data = proctoring_launch_data
+        self.launch_data_key = cache_lti_1p3_launch_data(self.launch_data)
 
         session_data_key = get_cache_key(
             app="lti",
@@ -608,6 +857,7 @@ class TestLti1p3LaunchGateEndpoint(TestBaseWithPatch):
         )
 
         self.launch_data.proctoring_launch_data = proctoring_launch_data
+        self.launch_data_key = cache_lti_1p3_launch_data(self.launch_data)
 
         params = {
             "client_id": self.config.lti_1p3_client_id,
@@ -628,6 +878,7 @@ class TestLti1p3LaunchGateEndpoint(TestBaseWithPatch):
         Check custom parameters are set if they exist on XBlock configuration.
         """
         self.launch_data.custom_parameters = ['test=test']
+        self.launch_data_key = cache_lti_1p3_launch_data(self.launch_data)
         params = {
             'client_id': self.config.lti_1p3_client_id,
             'redirect_uri': 'http://tool.example/launch',
@@ -769,6 +1020,7 @@ class TestLti1p3AccessTokenEndpoint(TestBaseWithPatch):
             deployment_id=None,
             rsa_key=external_config['lti_1p3_private_key'],
             rsa_key_id=external_config['lti_1p3_private_key_id'],
+            signing_algorithm='RS256',
             redirect_uris=None,
             tool_key=external_config['lti_1p3_tool_public_key'],
             tool_keyset_url=external_config['lti_1p3_tool_keyset_url'],
@@ -7,6 +7,9 @@ from unittest.mock import Mock, patch
 
 import ddt
 from Cryptodome.PublicKey import RSA
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework.test import APITransactionTestCase
@@ -57,7 +60,7 @@ class LtiAgsLineItemViewSetTestCase(APITransactionTestCase, TestBaseWithPatch):
         self._load_block_patch.return_value = self.xblock
 
         self._mock_user = Mock()
-        compat_mock = patch("lti_consumer.signals.signals.compat")
+        compat_mock = patch("lti_consumer.grades.compat")
         self.addCleanup(compat_mock.stop)
         self._compat_mock = compat_mock.start()
         self._compat_mock.get_user_from_external_user_id.return_value = self._mock_user
@@ -189,6 +192,95 @@ class LtiAgsViewSetLineItemTests(LtiAgsLineItemViewSetTestCase):
             ]
         )
 
+    def _create_line_items(self, count, **kwargs):
+        """
+        Create LineItems for the LTI configuration.
+        """
+        return [
+            LtiAgsLineItem.objects.create(
+                lti_configuration=self.lti_config,
+                resource_id=kwargs.get('resource_id', f"test{index}"),
+                resource_link_id=self.xblock.scope_ids.usage_id,
+                label=f"test label {index}",
+                score_maximum=100,
+                tag=kwargs.get('tag', ''),
+            )
+            for index in range(count)
+        ]
+
+    def test_lti_ags_list_paginated(self):
+        """
+        Test paging through the filtered LTI AGS list with the cursors of the Link headers.
+        """
+        self._set_lti_token('https://purl.imsglobal.org/spec/lti-ags/scope/lineitem.readonly')
+        self._create_line_items(2, tag="other")
+        line_items = self._create_line_items(5, tag="graded")
+
+        ids = []
+        url, params = self.lineitem_endpoint, {"limit": 2, "tag": "graded"}
+        while url:
+            response = self.client.get(url, data=params)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(line_item['id'] for line_item in response.data)
+            url, params = None, None
+            if response.has_header('Link'):
+                url = response['Link'].split(';')[0].strip('<>')
+                self.assertIn('tag=graded', url)
+
+        self.assertEqual(ids, [
+            f'http://testserver/lti_consumer/v1/lti/{self.lti_config.id}/lti-ags/{line_item.id}'
+            for line_item in line_items
+        ])
+
+    def test_lti_ags_list_last_page(self):
+        """
+        Test that no Link header is sent when the LineItems fit in the page.
+        """
+        self._set_lti_token('https://purl.imsglobal.org/spec/lti-ags/scope/lineitem.readonly')
+        self._create_line_items(2)
+
+        response = self.client.get(self.lineitem_endpoint, data={"limit": 2})
+
+        self.assertEqual(len(response.data), 2)
+        self.assertFalse(response.has_header('Link'))
+
+    def test_lti_ags_list_invalid_cursor(self):
+        """
+        Test that an invalid cursor is rejected.
+        """
+        self._set_lti_token('https://purl.imsglobal.org/spec/lti-ags/scope/lineitem.readonly')
+
+        response = self.client.get(self.lineitem_endpoint, data={"limit": 1, "cursor": "not-a-cursor"})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_lti_ags_list_query_count(self):
+        """
+        Test that the number of queries doesn't depend on the number of LineItems.
+        """
+        self._set_lti_token('https://purl.imsglobal.org/spec/lti-ags/scope/lineitem.readonly')
+
+        def count_queries(params):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(self.lineitem_endpoint, data=params).status_code, 200)
+            return len(queries)
+
+        def warm_up():
+            # Warm up the caches used to authenticate the requests, which saving LineItems clears.
+            count_queries({})
+            count_queries({})
+
+        self._create_line_items(1)
+        warm_up()
+        small_container_queries = count_queries({})
+
+        self._create_line_items(200)
+        warm_up()
+
+        self.assertEqual(count_queries({}), small_container_queries)
+        self.assertEqual(count_queries({"limit": 50}), small_container_queries)
+        self.assertEqual(count_queries({"limit": 50, "resource_id": "test3"}), small_container_queries)
+
     def test_lti_ags_retrieve(self):
         """
         Test the LTI AGS retrieve endpoint.
@@ -883,6 +975,231 @@ class LtiAgsViewSetScoresTests(LtiAgsLineItemViewSetTestCase):
         self.assertEqual(score.user_id, self.primary_user_id)
 
 
+@ddt.ddt
+class LtiAgsViewSetScoresBatchTests(LtiAgsLineItemViewSetTestCase):
+    """
+    Test `LtiAgsLineItemViewset` batch Score Publishing requests/responses.
+    """
+
+    def setUp(self):
+        super().setUp()
+
+        self.line_item = LtiAgsLineItem.objects.create(
+            lti_configuration=self.lti_config,
+            resource_id="test",
+            resource_link_id=self.xblock.scope_ids.usage_id,
+            label="test label",
+            score_maximum=100
+        )
+
+        self.early_timestamp = "2020-01-01T18:54:36.736000+00:00"
+        self.late_timestamp = "2022-01-01T18:54:36.736000+00:00"
+
+        self.scores_batch_endpoint = reverse(
+            'lti_consumer:lti-ags-view-scores-batch',
+            kwargs={
+                "lti_config_id": self.lti_config.id,
+                "pk": self.line_item.id
+            }
+        )
+        self._set_lti_token('https://purl.imsglobal.org/spec/lti-ags/scope/score')
+
+    def _get_score_data(self, user_id, **kwargs):
+        return {
+            "timestamp": self.early_timestamp,
+            "scoreGiven": 83,
+            "scoreMaximum": 100,
+            "comment": "This is exceptional work.",
+            "activityProgress": LtiAgsScore.COMPLETED,
+            "gradingProgress": LtiAgsScore.PENDING,
+            "userId": user_id,
+            **kwargs,
+        }
+
+    def _post_scores(self, data):
+        return self.client.post(
+            self.scores_batch_endpoint,
+            data=json.dumps(data),
+            content_type="application/vnd.ims.lis.v1.score+json",
+        )
+
+    def test_scores_batch_permissions(self):
+        """
+        Test that the score scope is required to submit scores.
+        """
+        self._set_lti_token('https://purl.imsglobal.org/spec/lti-ags/scope/lineitem')
+
+        response = self._post_scores([self._get_score_data("user")])
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(LtiAgsScore.objects.exists())
+
+    def test_scores_batch(self):
+        """
+        Test that valid scores are created or updated and invalid ones are reported.
+        """
+        LtiAgsScore.objects.create(
+            line_item=self.line_item,
+            timestamp=self.early_timestamp,
+            score_given=25,
+            score_maximum=100,
+            activity_progress=LtiAgsScore.COMPLETED,
+            grading_progress=LtiAgsScore.PENDING,
+            user_id="existing",
+        )
+
+        response = self._post_scores([
+            self._get_score_data("existing", timestamp=self.late_timestamp, scoreGiven=50),
+            self._get_score_data("new"),
+            self._get_score_data("missing_progress", activityProgress=None),
+            self._get_score_data("new", scoreGiven=10),
+            self._get_score_data("negative", scoreGiven=-1),
+            "invalid",
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(
+            [(result['userId'], result['status']) for result in results],
+            [("existing", 200), ("new", 201), ("missing_progress", 400), ("new", 400), ("negative", 400), (None, 400)],
+        )
+        self.assertEqual(results[0]['score']['scoreGiven'], 50)
+        self.assertEqual(results[1]['score']['timestamp'], self.early_timestamp.replace('+00:00', 'Z'))
+        self.assertIn('activityProgress', results[2]['errors'])
+        self.assertIn('userId', results[3]['errors'])
+        self.assertIn('score_given', results[4]['errors'])
+        self.assertEqual(
+            dict(LtiAgsScore.objects.values_list('user_id', 'score_given')),
+            {"existing": 50, "new": 83},
+        )
+
+    def test_scores_batch_earlier_timestamp(self):
+        """
+        Test that existing scores can't be updated to an earlier or the same timestamp.
+        """
+        LtiAgsScore.objects.create(
+            line_item=self.line_item,
+            timestamp=self.late_timestamp,
+            score_given=25,
+            score_maximum=100,
+            activity_progress=LtiAgsScore.COMPLETED,
+            grading_progress=LtiAgsScore.PENDING,
+            user_id="existing",
+        )
+
+        response = self._post_scores([self._get_score_data("existing")])
+
+        self.assertEqual(response.json()['results'][0]['status'], 400)
+        self.assertIn('timestamp', response.json()['results'][0]['errors'])
+        self.assertEqual(LtiAgsScore.objects.get().score_given, 25)
+
+    def test_scores_batch_grade_publish(self):
+        """
+        Test that the grades of fully graded scores are published at once, loading the block once.
+        """
+        self._compat_mock.get_user_from_external_user_id.return_value = 'user_mock'
+        self.xblock.set_user_module_score = Mock()
+        self.xblock.has_score = True
+
+        response = self._post_scores([
+            self._get_score_data("first", gradingProgress=LtiAgsScore.FULLY_GRADED),
+            self._get_score_data("second", gradingProgress=LtiAgsScore.FULLY_GRADED, scoreGiven=50),
+            self._get_score_data("pending"),
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self._compat_mock.load_block_as_user.assert_called_once()
+        self.assertEqual(
+            [call.args for call in self.xblock.set_user_module_score.call_args_list],
+            [('user_mock', 0.83, 1, 'This is exceptional work.'), ('user_mock', 0.5, 1, 'This is exceptional work.')],
+        )
+
+    @patch('lti_consumer.grades.log')
+    def test_scores_batch_grade_publish_error(self, log_mock):
+        """
+        Test that scores whose grade fails to be published are reported, without stopping the others.
+        """
+        def get_user(user_id):
+            if user_id == "broken":
+                raise Exception("LMS error")  # pylint: disable=broad-exception-raised
+            return 'user_mock'
+
+        self._compat_mock.get_user_from_external_user_id.side_effect = get_user
+        self.xblock.set_user_module_score = Mock()
+        self.xblock.has_score = True
+
+        # The request runs in the test's transaction, like with ATOMIC_REQUESTS.
+        response = self._post_scores([
+            self._get_score_data("broken", gradingProgress=LtiAgsScore.FULLY_GRADED),
+            self._get_score_data("working", gradingProgress=LtiAgsScore.FULLY_GRADED),
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(
+            [(result['userId'], result['status']) for result in results],
+            [("broken", 500), ("working", 201)],
+        )
+        self.assertIn('grade', results[0]['errors'])
+        self.assertEqual(results[0]['score']['scoreGiven'], 83)
+        log_mock.exception.assert_called_once()
+        self.xblock.set_user_module_score.assert_called_once()
+        self.assertEqual(LtiAgsScore.objects.count(), 2)
+
+    @override_settings(LTI_AGS_GRADE_PUBLISH_BACKEND='lti_consumer.grades.InProcessGradePublishBackend')
+    def test_scores_batch_deferred_grade_publish(self):
+        """
+        Test that deferred grade publish backends publish the grades of a batch at once.
+        """
+        self.xblock.set_user_module_score = Mock()
+        self.xblock.has_score = True
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self._post_scores([
+                self._get_score_data(f"user{index}", gradingProgress=LtiAgsScore.FULLY_GRADED) for index in range(3)
+            ])
+
+        self.assertEqual(response.status_code, 200)
+        self._compat_mock.load_block_as_user.assert_called_once()
+        self.assertEqual(self.xblock.set_user_module_score.call_count, 3)
+
+    def test_scores_batch_query_count(self):
+        """
+        Test that the number of queries doesn't depend on the number of scores.
+        """
+        def count_queries(prefix, size):
+            data = [self._get_score_data(f"{prefix}{index}") for index in range(size)]
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self._post_scores(data).status_code, 200)
+            return len(queries)
+
+        # Warm up the caches used to authenticate the requests.
+        count_queries("warm_up", 1)
+        count_queries("warm_up_again", 1)
+
+        self.assertEqual(count_queries("small", 2), count_queries("large", 20))
+        self.assertEqual(LtiAgsScore.objects.count(), 24)
+
+    @ddt.data({}, "invalid", [])
+    def test_scores_batch_invalid_data(self, data):
+        """
+        Test that the scores must be submitted as a non-empty array.
+        """
+        response = self._post_scores(data)
+
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(LTI_AGS_SCORES_BATCH_MAX_SIZE=2)
+    def test_scores_batch_too_large(self):
+        """
+        Test that batches larger than LTI_AGS_SCORES_BATCH_MAX_SIZE are rejected.
+        """
+        response = self._post_scores([self._get_score_data(f"user{index}") for index in range(3)])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(LtiAgsScore.objects.exists())
+
+
 class LtiAgsViewSetResultsTests(LtiAgsLineItemViewSetTestCase):
     """
     Test `LtiAgsLineItemViewset` Results retrieval requests/responses.
@@ -1067,6 +1384,61 @@ class LtiAgsViewSetResultsTests(LtiAgsLineItemViewSetTestCase):
         self.assertEqual(len(response.data), 1)
         self.assertEqual(response.data[0]['userId'], self.primary_user_id)
 
+    def test_retrieve_results_paginated(self):
+        """
+        Test paging through the LTI AGS LineItem Results with the cursors of the Link headers.
+        """
+        self._set_lti_token('https://purl.imsglobal.org/spec/lti-ags/scope/result.readonly')
+        # A score sharing its timestamp with another one is ordered by id.
+        tied_user_id = "tied"
+        LtiAgsScore.objects.create(
+            line_item=self.line_item,
+            timestamp=self.middle_timestamp,
+            score_given=50,
+            score_maximum=100,
+            activity_progress=LtiAgsScore.COMPLETED,
+            grading_progress=LtiAgsScore.FULLY_GRADED,
+            user_id=tied_user_id,
+        )
+
+        user_ids = []
+        url, params = self.results_endpoint, {"limit": 1}
+        while url:
+            response = self.client.get(url, data=params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data), 1)
+            user_ids.append(response.data[0]['userId'])
+            url, params = None, None
+            if response.has_header('Link'):
+                url = response['Link'].split(';')[0].strip('<>')
+                self.assertIn('limit=1', url)
+
+        self.assertEqual(user_ids, [self.primary_user_id, tied_user_id, self.secondary_user_id])
+
+    def test_retrieve_results_last_page(self):
+        """
+        Test that no Link header is sent when the results fit in the page.
+        """
+        self._set_lti_token('https://purl.imsglobal.org/spec/lti-ags/scope/result.readonly')
+
+        response = self.client.get(self.results_endpoint, data={"limit": 2})
+        response_without_limit = self.client.get(self.results_endpoint)
+
+        self.assertEqual(len(response.data), 2)
+        self.assertFalse(response.has_header('Link'))
+        self.assertEqual(len(response_without_limit.data), 2)
+        self.assertFalse(response_without_limit.has_header('Link'))
+
+    def test_retrieve_results_invalid_cursor(self):
+        """
+        Test that an invalid cursor is rejected.
+        """
+        self._set_lti_token('https://purl.imsglobal.org/spec/lti-ags/scope/result.readonly')
+
+        response = self.client.get(self.results_endpoint, data={"limit": 1, "cursor": "not-a-cursor"})
+
+        self.assertEqual(response.status_code, 400)
+
     def test_results_serializer_id_includes_user_id_separator(self):
         """
         Test that the results serializer builds a valid URL for a user-specific result.
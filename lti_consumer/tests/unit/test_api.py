@@ -16,6 +16,7 @@ from lti_consumer.api import (
     get_deep_linking_data,
     get_end_assessment_return,
     get_lti_1p3_content_url,
+    get_lti_1p3_content_urls,
     get_lti_1p3_launch_info,
     get_lti_1p3_launch_start_url,
     _get_or_create_local_lti_config,
@@ -25,7 +26,7 @@ from lti_consumer.data import Lti1p3LaunchData, Lti1p3ProctoringLaunchData
 from lti_consumer.lti_xblock import LtiConsumerXBlock
 from lti_consumer.models import Lti1p3Passport, LtiConfiguration, LtiDlContentItem
 from lti_consumer.tests.test_utils import TestBaseWithPatch, make_xblock
-from lti_consumer.utils import get_data_from_cache
+from lti_consumer.utils import get_cached_lti_1p3_launch_data
 
 # it's convenient to have this in lowercase to compare to URLs
 _test_config_id = "6c440bf4-face-beef-face-e8bcfb1e53bd"
@@ -106,6 +107,51 @@ class TestConfigIdForBlock(Lti1P3TestCase):
         config = _get_config_by_config_id(config_id)
         self.assertEqual(result_store, config.config_store)
 
+    def test_unchanged_block_cached(self):
+        """
+        Check that unchanged blocks resolve their config_id without database queries.
+        """
+        config_id = config_id_for_block(self.xblock)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(config_id_for_block(self.xblock), config_id)
+
+    def test_block_field_change_reconciled(self):
+        """
+        Check that changing a block field reconciles its configuration again.
+        """
+        config_id = config_id_for_block(self.xblock)
+
+        self.xblock.config_type = 'database'
+
+        self.assertEqual(config_id_for_block(self.xblock), config_id)
+        self.assertEqual(_get_config_by_config_id(config_id).config_store, LtiConfiguration.CONFIG_ON_DB)
+
+    def test_config_change_reconciled(self):
+        """
+        Check that configurations changed elsewhere are reconciled with the block again.
+        """
+        config_id = config_id_for_block(self.xblock)
+        config = _get_config_by_config_id(config_id)
+        config.version = LtiConfiguration.LTI_1P3
+        config.save()
+
+        self.assertEqual(config_id_for_block(self.xblock), config_id)
+        config.refresh_from_db()
+        self.assertEqual(config.version, LtiConfiguration.LTI_1P1)
+
+    def test_deleted_config_recreated(self):
+        """
+        Check that blocks whose configuration was deleted get a new one.
+        """
+        config_id = config_id_for_block(self.xblock)
+        _get_config_by_config_id(config_id).delete()
+
+        new_config_id = config_id_for_block(self.xblock)
+
+        self.assertNotEqual(new_config_id, config_id)
+        self.assertIsNotNone(_get_config_by_config_id(new_config_id))
+
 
 @ddt.ddt
 class TestGetOrCreateLocalLtiConfiguration(Lti1P3TestCase):
@@ -798,7 +844,7 @@ class TestGetLti1p3LaunchUrl(Lti1P3TestCase):
         launch_url = get_lti_1p3_launch_start_url(launch_data)
 
         parameters = parse_qs(urlparse(launch_url).query)
-        launch_data = get_data_from_cache(parameters.get("lti_message_hint")[0])
+        launch_data = get_cached_lti_1p3_launch_data(parameters.get("lti_message_hint")[0])
 
         self.assertEqual(launch_data.message_type, "LtiResourceLinkRequest")
         self.assertEqual(launch_data.deep_linking_content_item_id, None)
@@ -814,7 +860,7 @@ class TestGetLti1p3LaunchUrl(Lti1P3TestCase):
         launch_url = get_lti_1p3_launch_start_url(launch_data, deep_link_launch=True)
 
         parameters = parse_qs(urlparse(launch_url).query)
-        launch_data = get_data_from_cache(parameters.get("lti_message_hint")[0])
+        launch_data = get_cached_lti_1p3_launch_data(parameters.get("lti_message_hint")[0])
 
         self.assertEqual(launch_data.message_type, "LtiDeepLinkingRequest")
         self.assertEqual(launch_data.deep_linking_content_item_id, None)
@@ -833,7 +879,7 @@ class TestGetLti1p3LaunchUrl(Lti1P3TestCase):
         launch_url = get_lti_1p3_launch_start_url(launch_data, dl_content_id="1")
 
         parameters = parse_qs(urlparse(launch_url).query)
-        launch_data = get_data_from_cache(parameters.get("lti_message_hint")[0])
+        launch_data = get_cached_lti_1p3_launch_data(parameters.get("lti_message_hint")[0])
 
         self.assertEqual(launch_data.message_type, "LtiResourceLinkRequest")
         self.assertEqual(launch_data.deep_linking_content_item_id, "1")
@@ -894,7 +940,7 @@ class TestGetLti1p3ContentUrl(Lti1P3TestCase):
         launch_url = get_lti_1p3_content_url(launch_data)
 
         parameters = parse_qs(urlparse(launch_url).query)
-        launch_data = get_data_from_cache(parameters.get("lti_message_hint")[0])
+        launch_data = get_cached_lti_1p3_launch_data(parameters.get("lti_message_hint")[0])
 
         self.assertEqual(lti_content.id, launch_data.deep_linking_content_item_id)
         self.assertEqual(launch_data.message_type, "LtiResourceLinkRequest")
@@ -930,6 +976,104 @@ class TestGetLti1p3ContentUrl(Lti1P3TestCase):
         )
 
 
+class TestGetLti1p3ContentUrls(Lti1P3TestCase):
+    """
+    Unit tests for get_lti_1p3_content_urls API method.
+    """
+    def setUp(self):
+        super().setUp()
+        self.lti_configs = []
+        for _ in range(3):
+            xblock = make_xblock('lti_consumer', LtiConsumerXBlock, {
+                'lti_version': LtiConfiguration.LTI_1P3,
+                'lti_1p3_launch_url': 'http://tool.example/launch',
+                'lti_1p3_oidc_url': 'http://tool.example/oidc',
+                'lti_1p3_tool_public_key': self.xblock.lti_1p3_tool_public_key,
+            })
+            self.lti_configs.append(LtiConfiguration.objects.create(
+                location=xblock.scope_ids.usage_id,
+                version=LtiConfiguration.LTI_1P3,
+                config_store=LtiConfiguration.CONFIG_ON_DB,
+                lti_1p3_oidc_url='http://tool.example/oidc',
+                lti_1p3_launch_url='http://tool.example/launch',
+            ))
+
+        self.single_link = LtiDlContentItem.objects.create(
+            lti_configuration=self.lti_configs[1],
+            content_type=LtiDlContentItem.LTI_RESOURCE_LINK,
+            attributes={},
+        )
+        for _ in range(2):
+            LtiDlContentItem.objects.create(
+                lti_configuration=self.lti_configs[2],
+                content_type=LtiDlContentItem.IMAGE,
+                attributes={},
+            )
+
+        # Build the consumers twice, since saving the passport keys generated by the first build drops them.
+        for _ in range(2):
+            for lti_config in self.lti_configs:
+                lti_config.get_lti_consumer()
+
+    def _get_launch_data(self, lti_config, user_id="1"):
+        return Lti1p3LaunchData(
+            user_id=user_id,
+            user_role="student",
+            config_id=lti_config.config_id,
+            resource_link_id=str(lti_config.location),
+        )
+
+    def test_urls(self):
+        """
+        Check that the URLs match the ones returned for each launch by get_lti_1p3_content_url, in order.
+        """
+        launch_data_list = [self._get_launch_data(lti_config) for lti_config in reversed(self.lti_configs)]
+
+        urls = get_lti_1p3_content_urls(launch_data_list)
+
+        self.assertEqual(urls, [
+            get_lti_1p3_content_url(self._get_launch_data(lti_config)) for lti_config in reversed(self.lti_configs)
+        ])
+        self.assertIn(f"/lti/{self.lti_configs[2].id}/lti-dl/content?", urls[0])
+        lti_message_hint = parse_qs(urlparse(urls[1]).query)["lti_message_hint"][0]
+        self.assertEqual(
+            get_cached_lti_1p3_launch_data(lti_message_hint).deep_linking_content_item_id,
+            self.single_link.id,
+        )
+        self.assertTrue(urls[2].startswith('http://tool.example/oidc?'))
+
+    def test_constant_queries(self):
+        """
+        Check that the number of queries doesn't grow with the number of launches.
+        """
+        launch_data_list = [
+            self._get_launch_data(lti_config, user_id)
+            for lti_config in self.lti_configs for user_id in ("1", "2")
+        ]
+
+        with self.assertNumQueries(2):
+            urls = get_lti_1p3_content_urls(launch_data_list)
+
+        self.assertEqual(len(urls), 6)
+
+    def test_empty(self):
+        """
+        Check that no queries are made without launches.
+        """
+        with self.assertNumQueries(0):
+            self.assertEqual(get_lti_1p3_content_urls([]), [])
+
+    def test_missing_config(self):
+        """
+        Check that missing configurations raise.
+        """
+        launch_data = self._get_launch_data(self.lti_configs[0])
+        launch_data.config_id = _test_config_id
+
+        with self.assertRaises(LtiConfiguration.DoesNotExist):
+            get_lti_1p3_content_urls([launch_data])
+
+
 class TestGetLtiDlContentItemData(Lti1P3TestCase):
     """
     Unit tests for get_deep_linking_data API method.
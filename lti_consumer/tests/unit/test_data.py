@@ -0,0 +1,160 @@
+"""
+Unit tests for lti_consumer.data module
+"""
+import json
+import pickle
+import uuid
+from datetime import datetime, timezone
+
+import ddt
+from django.test.testcases import TestCase
+
+from lti_consumer.data import (
+    LAUNCH_DATA_COMPACT_VERSION,
+    RESOLVED_CONFIG_DICT_VERSION,
+    Lti1p3LaunchData,
+    Lti1p3ProctoringLaunchData,
+    Lti1p3ResolvedConfiguration,
+)
+
+
+@ddt.ddt
+class TestLti1p3LaunchDataCompactEncoding(TestCase):
+    """
+    Tests for the compact encoding of Lti1p3LaunchData.
+    """
+    def _get_launch_data(self, **kwargs):
+        return Lti1p3LaunchData(**{
+            'user_id': "1",
+            'user_role': "student",
+            'config_id': str(uuid.uuid4()),
+            'resource_link_id': "block-v1:course+test+2020+type@problem+block@test",
+            **kwargs,
+        })
+
+    @ddt.data(
+        {},
+        {
+            'context_id': 'course-v1:course+test+2020',
+            'context_type': ['course_offering'],
+            'context_title': 'Course - Org',
+            'context_label': 'course-v1:course+test+2020',
+            'launch_presentation_document_target': 'iframe',
+            'custom_parameters': {'key': 'value'},
+            'preferred_username': 'user',
+            'name': 'Fáke Ñame',
+            'email': 'user@example.com',
+            'external_user_id': 'external',
+        },
+        {'message_type': 'LtiDeepLinkingRequest', 'user_role': 'instructor'},
+        {'deep_linking_content_item_id': 2},
+        {
+            'message_type': 'LtiStartProctoring',
+            'proctoring_launch_data': Lti1p3ProctoringLaunchData(
+                attempt_number=2,
+                start_assessment_url='http://platform.example/start',
+                assessment_control_url='http://platform.example/control',
+                assessment_control_actions=['pause', 'terminate'],
+            ),
+        },
+        {'message_type': 'LtiEndAssessment', 'proctoring_launch_data': Lti1p3ProctoringLaunchData(attempt_number=1)},
+        {'user_role': None},
+        {
+            'user_role': None,
+            'message_type': 'LtiStartProctoring',
+            'proctoring_launch_data': Lti1p3ProctoringLaunchData(attempt_number=1),
+        },
+    )
+    def test_round_trip(self, kwargs):
+        """
+        Test that launch data is decoded back, including after a JSON round trip.
+        """
+        launch_data = self._get_launch_data(**kwargs)
+
+        compact = launch_data.to_compact()
+
+        self.assertEqual(compact[0], LAUNCH_DATA_COMPACT_VERSION)
+        self.assertEqual(Lti1p3LaunchData.from_compact(compact), launch_data)
+        self.assertEqual(Lti1p3LaunchData.from_compact(json.loads(json.dumps(compact))), launch_data)
+
+    def test_defaults_omitted(self):
+        """
+        Test that trailing default values are omitted, and that the encoding is smaller than a pickle.
+        """
+        launch_data = self._get_launch_data()
+
+        self.assertEqual(
+            launch_data.to_compact(),
+            [LAUNCH_DATA_COMPACT_VERSION, "1", "student", launch_data.config_id, launch_data.resource_link_id],
+        )
+        self.assertLess(len(pickle.dumps(launch_data.to_compact())), len(pickle.dumps(launch_data)))
+
+    def test_config_id_encoded_as_string(self):
+        """
+        Test that UUID config ids are encoded as strings.
+        """
+        config_id = uuid.uuid4()
+        launch_data = self._get_launch_data()
+        launch_data.config_id = config_id
+
+        self.assertEqual(Lti1p3LaunchData.from_compact(launch_data.to_compact()).config_id, str(config_id))
+
+    @ddt.data(None, [], [0, "1"], [LAUNCH_DATA_COMPACT_VERSION + 1, "1"], [LAUNCH_DATA_COMPACT_VERSION, *range(20)])
+    def test_invalid_encoding(self, data):
+        """
+        Test that unknown versions and malformed encodings raise ValueError.
+        """
+        with self.assertRaises(ValueError):
+            Lti1p3LaunchData.from_compact(data)
+
+
+@ddt.ddt
+class TestLti1p3ResolvedConfigurationDictEncoding(TestCase):
+    """
+    Tests for the dict encoding of Lti1p3ResolvedConfiguration.
+    """
+    resolved_config = Lti1p3ResolvedConfiguration(
+        lti_1p3_oidc_url='http://tool.example/oidc',
+        lti_1p3_launch_url='http://tool.example/launch',
+        lti_1p3_redirect_uris=['http://tool.example/launch'],
+        lti_1p3_tool_public_key='',
+        lti_1p3_tool_keyset_url='http://tool.example/keyset',
+        lti_advantage_ags_mode='programmatic',
+        lti_advantage_deep_linking_enabled=True,
+        lti_advantage_deep_linking_launch_url='',
+        lti_advantage_enable_nrps=False,
+        lineitem_defaults={
+            'label': 'Problem',
+            'score_maximum': 1,
+            'end_date_time': datetime(2020, 1, 1, tzinfo=timezone.utc),
+        },
+    )
+
+    def test_round_trip(self):
+        """
+        Check that decoding an encoded configuration returns an equal one, including after a pickle round trip.
+        """
+        data = self.resolved_config.to_dict()
+
+        self.assertEqual(data['version'], RESOLVED_CONFIG_DICT_VERSION)
+        self.assertEqual(Lti1p3ResolvedConfiguration.from_dict(pickle.loads(pickle.dumps(data))), self.resolved_config)
+
+    def test_unknown_keys_ignored(self):
+        """
+        Check that keys written by a release with more fields are ignored.
+        """
+        data = {**self.resolved_config.to_dict(), 'new_field': 'value'}
+
+        self.assertEqual(Lti1p3ResolvedConfiguration.from_dict(data), self.resolved_config)
+
+    @ddt.data(
+        {'version': RESOLVED_CONFIG_DICT_VERSION + 1},
+        {'version': RESOLVED_CONFIG_DICT_VERSION, 'lti_1p3_oidc_url': 'http://tool.example/oidc'},
+        [RESOLVED_CONFIG_DICT_VERSION],
+    )
+    def test_invalid_encoding(self, data):
+        """
+        Check that encodings of other versions or missing required fields are rejected.
+        """
+        with self.assertRaises(ValueError):
+            Lti1p3ResolvedConfiguration.from_dict(data)
@@ -1,12 +1,15 @@
 """
 Tests for the LTI consumer filters.
 """
+import threading
 from unittest.mock import patch
 
 from django.test import TestCase, override_settings
+from edx_django_utils.cache import TieredCache
 from openedx_filters import PipelineStep
 
 from lti_consumer.filters import LTIConfigurationListed, get_external_config_from_filter
+from lti_consumer.models import LtiConfiguration, invalidate_external_config_cache
 
 
 class MyTestPipelineStep(PipelineStep):
@@ -54,6 +57,10 @@ class TestGetExternalConfigFromFilter(TestCase):
     filter.
     """
 
+    def setUp(self):
+        super().setUp()
+        TieredCache.dangerous_clear_all_tiers()
+
     @patch("lti_consumer.filters.LTIConfigurationListed")
     def test_get_external_config_from_filter_returns_only_the_configs(self, mock_filter):
         context = {"course_id": "test-course"}
@@ -82,3 +89,150 @@ class TestGetExternalConfigFromFilter(TestCase):
 
         mock_filter.run_filter.return_value = (context, config_id, configs)
         self.assertDictEqual(get_external_config_from_filter(context, "test-config-id"), demo_client)
+
+
+@patch("lti_consumer.filters.LTIConfigurationListed")
+class TestExternalConfigCache(TestCase):
+    """
+    Tests for the cache of LTIConfigurationListed filter results.
+    """
+    context = {"course_key": "course-v1:edX+DemoX+Demo_Course"}
+    config = {"version": "lti_1p3", "lti_1p3_launch_url": "http://tool.example/launch"}
+
+    def setUp(self):
+        super().setUp()
+        TieredCache.dangerous_clear_all_tiers()
+
+    def test_results_cached(self, mock_filter):
+        """
+        Check that the filter runs once per context and config_id, and that callers get copies.
+        """
+        mock_filter.run_filter.return_value = ({}, "x:x", {"x:x": dict(self.config)})
+
+        first = get_external_config_from_filter(self.context, "x:x")
+        first["version"] = "lti_1p1"
+        second = get_external_config_from_filter(dict(self.context), "x:x")
+        get_external_config_from_filter({}, "x:x")
+
+        self.assertEqual(second, self.config)
+        self.assertEqual(mock_filter.run_filter.call_count, 2)
+
+    def test_missing_config_cached(self, mock_filter):
+        """
+        Check that unknown configurations are cached, for the negative TTL.
+        """
+        mock_filter.run_filter.return_value = ({}, "x:x", {})
+
+        self.assertEqual(get_external_config_from_filter(self.context, "x:x"), {})
+        self.assertEqual(get_external_config_from_filter(self.context, "x:x"), {})
+        self.assertEqual(mock_filter.run_filter.call_count, 1)
+
+        with override_settings(LTI_EXTERNAL_CONFIG_CACHE_NEGATIVE_TTL=0):
+            get_external_config_from_filter(self.context, "y:y")
+            get_external_config_from_filter(self.context, "y:y")
+        self.assertEqual(mock_filter.run_filter.call_count, 3)
+
+    def test_results_not_in_django_cache(self, mock_filter):
+        """
+        Check that results, which hold key material, are only cached in the process.
+        """
+        mock_filter.run_filter.return_value = ({}, "x:x", {"x:x": {**self.config, "lti_1p3_private_key": "secret"}})
+
+        with patch("lti_consumer.filters.TieredCache.set_all_tiers", wraps=TieredCache.set_all_tiers) as set_mock:
+            get_external_config_from_filter(self.context, "x:x")
+            self.assertEqual(get_external_config_from_filter(self.context, "x:x")["lti_1p3_private_key"], "secret")
+
+        self.assertNotIn("secret", str(set_mock.call_args_list))
+        self.assertEqual(mock_filter.run_filter.call_count, 1)
+
+    @override_settings(LTI_EXTERNAL_CONFIG_CACHE_MAX_ENTRIES=1)
+    def test_max_entries(self, mock_filter):
+        """
+        Check that the least recently used results are evicted.
+        """
+        mock_filter.run_filter.return_value = ({}, "", {"x:x": self.config, "y:y": self.config})
+
+        get_external_config_from_filter(self.context, "x:x")
+        get_external_config_from_filter(self.context, "y:y")
+        get_external_config_from_filter(self.context, "x:x")
+
+        self.assertEqual(mock_filter.run_filter.call_count, 3)
+
+    def test_filter_errors_not_cached(self, mock_filter):
+        """
+        Check that filter errors aren't cached.
+        """
+        mock_filter.run_filter.side_effect = ValueError
+
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                get_external_config_from_filter(self.context, "x:x")
+
+        self.assertEqual(mock_filter.run_filter.call_count, 2)
+
+    @override_settings(LTI_EXTERNAL_CONFIG_CACHE_TTL=0)
+    def test_cache_disabled(self, mock_filter):
+        """
+        Check that the filter runs every time when the cache is disabled.
+        """
+        mock_filter.run_filter.return_value = ({}, "x:x", {"x:x": self.config})
+
+        get_external_config_from_filter(self.context, "x:x")
+        get_external_config_from_filter(self.context, "x:x")
+
+        self.assertEqual(mock_filter.run_filter.call_count, 2)
+
+    def test_invalidate(self, mock_filter):
+        """
+        Check that invalidating a configuration drops its results and the listings, and nothing else.
+        """
+        mock_filter.run_filter.return_value = ({}, "", {"x:x": self.config, "y:y": self.config})
+        lti_config = LtiConfiguration.objects.create(
+            version=LtiConfiguration.LTI_1P3,
+            config_store=LtiConfiguration.CONFIG_EXTERNAL,
+            external_id="x:x",
+        )
+
+        for config_id in ("x:x", "y:y", ""):
+            get_external_config_from_filter(self.context, config_id)
+
+        with patch("lti_consumer.models.consumer_template_cache.invalidate") as invalidate_mock:
+            invalidate_external_config_cache("x:x")
+        invalidate_mock.assert_called_once_with(lti_config.config_id)
+
+        for config_id in ("x:x", "y:y", ""):
+            get_external_config_from_filter(self.context, config_id)
+        self.assertEqual(mock_filter.run_filter.call_count, 5)
+
+        invalidate_external_config_cache()
+        get_external_config_from_filter(self.context, "y:y")
+        self.assertEqual(mock_filter.run_filter.call_count, 6)
+
+    def test_single_flight(self, mock_filter):
+        """
+        Check that concurrent misses for the same key run the filter once.
+        """
+        started = threading.Event()
+        release = threading.Event()
+
+        def run_filter(**kwargs):
+            started.set()
+            release.wait(5)
+            return {}, "x:x", {"x:x": self.config}
+
+        mock_filter.run_filter.side_effect = run_filter
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(get_external_config_from_filter(self.context, "x:x")))
+            for _ in range(3)
+        ]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(results, [self.config] * 3)
+        self.assertEqual(mock_filter.run_filter.call_count, 1)
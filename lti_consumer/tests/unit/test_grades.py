@@ -0,0 +1,228 @@
+"""
+Tests for the deferred publication of LTI AGS grades.
+"""
+from datetime import datetime, timedelta
+from unittest.mock import Mock, call, patch
+
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, override_settings
+from opaque_keys.edx.keys import UsageKey
+
+from lti_consumer.grades import (
+    CeleryGradePublishBackend,
+    InProcessGradePublishBackend,
+    get_grade_publish_backend,
+    publish_line_item_grades,
+)
+from lti_consumer.models import LtiAgsLineItem, LtiAgsScore, LtiConfiguration
+
+
+class GradePublishTestCase(TestCase):
+    """
+    Base class of the grade publication tests.
+    """
+    def setUp(self):
+        super().setUp()
+        self._block_mock = Mock()
+        self._block_mock.is_past_due.return_value = False
+        self._block_mock.max_score.return_value = 1
+        self._block_mock.display_name = "consumer"
+        self._block_mock.context_id = "some-context-id"
+        self._block_mock.lti_1p3_passport_id = "e9feb139-4e4c-4fb1-96ee-e614f1e04356"
+        models_compat_patcher = patch("lti_consumer.models.compat")
+        self.addCleanup(models_compat_patcher.stop)
+        models_compat_patcher.start().load_enough_xblock.return_value = self._block_mock
+        compat_patcher = patch("lti_consumer.grades.compat")
+        self.addCleanup(compat_patcher.stop)
+        self._compat_mock = compat_patcher.start()
+        self._compat_mock.load_block_as_user.return_value = self._block_mock
+        self._compat_mock.get_user_from_external_user_id.side_effect = lambda user_id: f"user-{user_id}"
+
+        self.location = UsageKey.from_string("block-v1:course+test+2020+type@problem+block@test")
+        self.lti_config = LtiConfiguration.objects.create(location=self.location, version=LtiConfiguration.LTI_1P3)
+        self.line_item = LtiAgsLineItem.objects.create(
+            lti_configuration=self.lti_config,
+            resource_id="test",
+            resource_link_id=self.location,
+            label="test label",
+            score_maximum=100,
+        )
+        self.timestamp = datetime.now()
+
+    def _save_score(self, user_id, score_given, grading_progress=LtiAgsScore.FULLY_GRADED):
+        """
+        Create or update the score of a user.
+        """
+        self.timestamp += timedelta(seconds=1)
+        score, _ = LtiAgsScore.objects.update_or_create(
+            line_item=self.line_item,
+            user_id=user_id,
+            defaults={
+                'timestamp': self.timestamp,
+                'score_given': score_given,
+                'score_maximum': 100,
+                'activity_progress': LtiAgsScore.COMPLETED,
+                'grading_progress': grading_progress,
+            },
+        )
+        return score
+
+    def _get_published_grades(self):
+        return [
+            (user, score) for user, score, _, _ in (
+                call_args.args for call_args in self._block_mock.set_user_module_score.call_args_list
+            )
+        ]
+
+
+@override_settings(LTI_AGS_GRADE_PUBLISH_BACKEND='lti_consumer.grades.InProcessGradePublishBackend')
+class TestInProcessGradePublishBackend(GradePublishTestCase):
+    """
+    Tests for InProcessGradePublishBackend.
+    """
+    def test_grades_published_on_commit(self):
+        """
+        Test that grades are published once the transaction commits, from the latest scores.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            self._save_score("first", 10)
+            self._save_score("second", 20)
+            self._save_score("first", 30)
+
+            self._block_mock.set_user_module_score.assert_not_called()
+
+        self._compat_mock.load_block_as_user.assert_called_once_with(self.location)
+        self.assertCountEqual(self._get_published_grades(), [("user-first", 0.3), ("user-second", 0.2)])
+
+    def test_superseded_score_not_published(self):
+        """
+        Test that a grade isn't published if the score was superseded by one that isn't fully graded.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            self._save_score("first", 10)
+            self._save_score("first", None, grading_progress=LtiAgsScore.PENDING)
+
+        self._compat_mock.load_block_as_user.assert_not_called()
+        self._block_mock.set_user_module_score.assert_not_called()
+
+    def test_pending_score_not_queued(self):
+        """
+        Test that scores that aren't fully graded aren't queued.
+        """
+        with self.captureOnCommitCallbacks() as callbacks:
+            self._save_score("first", 10, grading_progress=LtiAgsScore.PENDING)
+
+        self.assertEqual(callbacks, [])
+
+    def test_one_flush_per_transaction(self):
+        """
+        Test that the scores of a transaction register a single flush.
+        """
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self._save_score("first", 10)
+            self._save_score("second", 20)
+
+        with self.captureOnCommitCallbacks(execute=True) as next_callbacks:
+            self._save_score("third", 30)
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(len(next_callbacks), 1)
+        self.assertEqual(len(self._get_published_grades()), 3)
+
+    @patch.object(InProcessGradePublishBackend, 'dispatch')
+    def test_rolled_back_scores_dropped(self, dispatch_mock):
+        """
+        Test that the scores of a rolled back transaction aren't dispatched with the next ones.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self._save_score("rolled_back", 10)
+                    raise ValueError
+            except ValueError:
+                pass
+            self._save_score("first", 20)
+
+        dispatch_mock.assert_called_once_with(self.line_item.id, ["first"])
+
+    def test_publish_error(self):
+        """
+        Test that an error publishing a grade doesn't stop the other grades from being published.
+        """
+        self._compat_mock.get_user_from_external_user_id.side_effect = [Exception("Unknown user"), "user-second"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._save_score("first", 10)
+            self._save_score("second", 20)
+
+        self.assertEqual(self._get_published_grades(), [("user-second", 0.2)])
+
+
+@override_settings(LTI_AGS_GRADE_PUBLISH_BACKEND='lti_consumer.grades.CeleryGradePublishBackend')
+class TestCeleryGradePublishBackend(GradePublishTestCase):
+    """
+    Tests for CeleryGradePublishBackend.
+    """
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.backend = CeleryGradePublishBackend()
+        schedule_patcher = patch.object(self.backend, 'schedule')
+        self.addCleanup(schedule_patcher.stop)
+        self.mock_schedule = schedule_patcher.start()
+
+    def test_pending_grades_coalesced(self):
+        """
+        Test that grades queued again before their task runs don't queue more tasks.
+        """
+        self.backend.dispatch(self.line_item.id, ["first", "second"])
+        self.backend.dispatch(self.line_item.id, ["first", "third"])
+
+        self.assertEqual(
+            self.mock_schedule.call_args_list,
+            [call(self.line_item.id, ["first", "second"]), call(self.line_item.id, ["third"])],
+        )
+
+    def test_run(self):
+        """
+        Test that the task publishes the latest scores, and that later scores queue a new task.
+        """
+        self._save_score("first", 10)
+        self.backend.dispatch(self.line_item.id, ["first"])
+        self._save_score("first", 40)
+
+        CeleryGradePublishBackend.run(self.line_item.id, ["first"])
+        self.backend.dispatch(self.line_item.id, ["first"])
+
+        self.assertEqual(self._get_published_grades(), [("user-first", 0.4)])
+        self.assertEqual(self.mock_schedule.call_count, 2)
+
+
+class TestGradePublishHelpers(GradePublishTestCase):
+    """
+    Tests for the grade publication helpers.
+    """
+    def test_no_backend(self):
+        """
+        Test that grades are published in the post_save signal when no backend is set.
+        """
+        self.assertIsNone(get_grade_publish_backend())
+
+        self._save_score("first", 10)
+
+        self.assertEqual(self._get_published_grades(), [("user-first", 0.1)])
+
+    @override_settings(LTI_AGS_GRADE_PUBLISH_BACKEND='lti_consumer.grades.InProcessGradePublishBackend')
+    def test_publish_line_item_grades_scope(self):
+        """
+        Test that grades of line items outside of the configuration's block aren't published.
+        """
+        self.line_item.resource_link_id = UsageKey.from_string("block-v1:course+test+2020+type@problem+block@other")
+        self.line_item.save()
+        self._save_score("first", 10)
+
+        publish_line_item_grades(self.line_item.id, ["first"])
+        publish_line_item_grades(self.line_item.id + 1, ["first"])
+
+        self._compat_mock.load_block_as_user.assert_not_called()
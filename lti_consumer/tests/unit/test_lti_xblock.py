@@ -17,12 +17,14 @@ from django.conf import settings as dj_settings
 from django.test import override_settings
 from django.test.testcases import TestCase
 from django.utils import timezone
-from jwt.api_jwk import PyJWK, PyJWKSet
+from edx_django_utils.cache import TieredCache
+from jwt.api_jwk import PyJWK
 from xblock.validation import Validation
 
 from lti_consumer.api import config_id_for_block
 from lti_consumer.data import Lti1p3LaunchData
 from lti_consumer.exceptions import LtiError
+from lti_consumer.lti_1p3.key_cache import tool_keyset_cache
 from lti_consumer.lti_1p3.tests.utils import create_jwt
 from lti_consumer.lti_xblock import LtiConsumerXBlock, parse_handler_suffix, valid_config_type_values
 from lti_consumer.models import Lti1p3Passport, LtiConfiguration
@@ -1301,6 +1303,51 @@ class TestLtiLaunchHandler(TestLtiConsumerXBlock):
         self.mock_lti_consumer.set_user_data.assert_called_with(FAKE_USER_ID, 'Student,Learner', **set_user_data_kwargs)
 
 
+class TestLti1p3LaunchHandler(TestLtiConsumerXBlock):
+    """
+    Unit tests for LtiConsumerXBlock.lti_1p3_launch_handler()
+    """
+    def setUp(self):
+        super().setUp()
+        self.xblock.lti_version = 'lti_1p3'
+
+    @patch('lti_consumer.api.get_lti_1p3_content_url')
+    @patch('lti_consumer.lti_xblock.LtiConsumerXBlock.get_lti_1p3_launch_data')
+    def test_redirects_to_content_url(self, mock_get_launch_data, mock_get_content_url):
+        """
+        Test that the launch data is built when the launch starts, and that the learner is redirected.
+        """
+        mock_get_content_url.return_value = 'http://tool.example/oidc?lti_message_hint=hint'
+
+        response = self.xblock.lti_1p3_launch_handler(make_request('', 'GET'))
+
+        mock_get_content_url.assert_called_once_with(mock_get_launch_data.return_value)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.location, 'http://tool.example/oidc?lti_message_hint=hint')
+
+    @patch('lti_consumer.lti_xblock.LtiConsumerXBlock.get_lti_1p3_launch_data')
+    def test_launch_data_error(self, mock_get_launch_data):
+        """
+        Test that a 400 response is returned when the launch data can't be built.
+        """
+        mock_get_launch_data.side_effect = LtiError('unauthenticated')
+
+        response = self.xblock.lti_1p3_launch_handler(make_request('', 'GET'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('unauthenticated', response.unicode_body)
+
+    def test_lti_1p1(self):
+        """
+        Test that a 404 response is returned for LTI 1.1 blocks.
+        """
+        self.xblock.lti_version = 'lti_1p1'
+
+        response = self.xblock.lti_1p3_launch_handler(make_request('', 'GET'))
+
+        self.assertEqual(response.status_code, 404)
+
+
 class TestOutcomeServiceHandler(TestLtiConsumerXBlock):
     """
     Unit tests for LtiConsumerXBlock.outcome_service_handler()
@@ -1784,6 +1831,24 @@ class TestGetContext(TestLtiConsumerXBlock):
         if lti_version == 'lti_1p3':
             lti_api_patch.assert_called_once()
 
+    @override_settings(LTI_1P3_DEFERRED_LAUNCH_ENABLED=True)
+    @patch('lti_consumer.api.get_lti_1p3_content_url')
+    @patch('lti_consumer.lti_xblock.LtiConsumerXBlock.get_lti_1p3_launch_data')
+    def test_deferred_lti_1p3_launch(self, mock_get_lti_1p3_launch_data, lti_api_patch):
+        """
+        Test that the launch data isn't built nor cached on render when LTI 1.3 launches are deferred.
+        """
+        self.xblock.lti_version = 'lti_1p3'
+        handler_url = 'http://localhost:8005/lti_1p3_launch_handler'
+        self.xblock.runtime.handler_url = Mock(return_value=f"{handler_url}/?")
+
+        context = self.xblock._get_context_for_template()  # pylint: disable=protected-access
+
+        self.assertEqual(context['form_url'], handler_url)
+        self.xblock.runtime.handler_url.assert_called_with(self.xblock, 'lti_1p3_launch_handler')
+        mock_get_lti_1p3_launch_data.assert_not_called()
+        lti_api_patch.assert_not_called()
+
     @ddt.data('a', 'abbr', 'acronym', 'b', 'blockquote', 'code', 'em', 'i', 'li', 'ol', 'strong', 'ul', 'img')
     def test_comment_allowed_tags(self, tag):
         """
@@ -2618,39 +2683,41 @@ class TestLti1p3AccessTokenJWK(TestBaseWithPatch):
         self._load_block_patch = patcher.start()
         self._load_block_patch.return_value = self.xblock
 
+        # Tool keysets are cached process-wide.
+        tool_keyset_cache.clear()
+        TieredCache.dangerous_clear_all_tiers()
+
     def make_keyset(self, keys):
         """
-        Builds a keyset object with the given keys.
+        Builds a keyset document with the given keys.
         """
         keys_dict = {'keys': []}
         for key in keys:
             keys_dict['keys'].append(key._jwk_data)  # pylint: disable=protected-access
-        return PyJWKSet.from_dict(keys_dict)
+        return keys_dict
 
-    @patch("lti_consumer.lti_1p3.key_handlers.jwt.PyJWKClient.get_jwk_set")
-    def test_access_token_using_keyset_url(self, get_jwk_set):
+    @patch("lti_consumer.lti_1p3.key_cache.jwt.PyJWKClient.fetch_data")
+    def test_access_token_using_keyset_url(self, fetch_data):
         """
         Test request using the provider's keyset URL instead of a public key.
         """
-        # import pdb; pdb.set_trace()
-        get_jwk_set.return_value = self.make_keyset([self.key])
+        fetch_data.return_value = self.make_keyset([self.key])
         response = self.xblock.lti_1p3_access_token(self.request)
-        get_jwk_set.assert_called_once()
+        fetch_data.assert_called_once()
         self.assertEqual(response.status_code, 200)
 
-    @patch("lti_consumer.lti_1p3.key_handlers.jwt.PyJWKClient.get_jwk_set")
-    def test_access_token_using_keyset_url_with_empty_keys(self, get_jwk_set):
+    @patch("lti_consumer.lti_1p3.key_cache.jwt.PyJWKClient.fetch_data")
+    def test_access_token_using_keyset_url_with_empty_keys(self, fetch_data):
         """
         Test request where the provider's keyset URL returns an empty list of keys.
         """
-        # get_jwk_set.return_value = self.make_keyset([])
-        get_jwk_set.side_effect = jwt.exceptions.PyJWKSetError
+        fetch_data.return_value = {'keys': []}
         response = self.xblock.lti_1p3_access_token(self.request)
         self.assertEqual(response.status_code, 400)
         self.assertJSONEqual(response.content, {"error": "invalid_client"})
 
-    @patch("lti_consumer.lti_1p3.key_handlers.jwt.PyJWKClient.get_jwk_set")
-    def test_access_token_using_keyset_url_with_wrong_keys(self, get_jwk_set):
+    @patch("lti_consumer.lti_1p3.key_cache.jwt.PyJWKClient.fetch_data")
+    def test_access_token_using_keyset_url_with_wrong_keys(self, fetch_data):
         """
         Test request where the provider's keyset URL returns wrong keys.
         """
@@ -2659,7 +2726,7 @@ class TestLti1p3AccessTokenJWK(TestBaseWithPatch):
         private_jwk = json.loads(self.algo_obj.to_jwk(private_key))
         private_jwk['kid'] = 2
         key = PyJWK.from_dict(private_jwk)
-        get_jwk_set.return_value = self.make_keyset([key])
+        fetch_data.return_value = self.make_keyset([key])
         response = self.xblock.lti_1p3_access_token(self.request)
         self.assertEqual(response.status_code, 400)
         self.assertJSONEqual(response.content, {"error": "invalid_client"})
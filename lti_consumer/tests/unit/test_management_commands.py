@@ -0,0 +1,191 @@
+"""
+Unit tests for the lti_consumer management commands.
+"""
+from io import StringIO
+from unittest.mock import Mock, call, patch
+
+import ddt
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from opaque_keys.edx.keys import UsageKey
+
+from lti_consumer.models import Lti1p3PregeneratedKey, LtiAgsLineItem, LtiAgsScore, LtiConfiguration
+
+
+@patch('lti_consumer.models.generate_lti_1p3_keypair', return_value=('private-key', 'key-id', '{}'))
+class TestFillLti1p3KeyPool(TestCase):
+    """
+    Unit tests for the fill_lti_1p3_key_pool management command.
+    """
+    def test_fill_with_size(self, generate_mock):
+        """
+        Checks that the pool is filled up to the given size.
+        """
+        out = StringIO()
+
+        call_command('fill_lti_1p3_key_pool', size=3, stdout=out)
+
+        self.assertEqual(Lti1p3PregeneratedKey.objects.count(), 3)
+        self.assertEqual(generate_mock.call_count, 3)
+        self.assertIn('Generated 3 LTI 1.3 RS256 keys', out.getvalue())
+
+    @override_settings(LTI_1P3_KEY_POOL_SIZE=2)
+    def test_fill_default_size(self, _generate_mock):
+        """
+        Checks that the pool size defaults to the LTI_1P3_KEY_POOL_SIZE setting.
+        """
+        call_command('fill_lti_1p3_key_pool', stdout=StringIO())
+
+        self.assertEqual(Lti1p3PregeneratedKey.objects.count(), 2)
+
+    @patch('lti_consumer.management.commands.fill_lti_1p3_key_pool.time.sleep')
+    def test_fill_with_interval(self, sleep_mock, _generate_mock):
+        """
+        Checks that the pool is refilled every interval until the command is stopped.
+        """
+        sleep_mock.side_effect = [None, KeyboardInterrupt]
+        out = StringIO()
+
+        call_command('fill_lti_1p3_key_pool', size=1, interval=10, stdout=out)
+
+        sleep_mock.assert_called_with(10)
+        self.assertEqual(out.getvalue().count('Generated'), 2)
+        self.assertIn('Stopped filling the LTI 1.3 key pool.', out.getvalue())
+
+
+@ddt.ddt
+class TestReconcileLtiAgsGrades(TestCase):
+    """
+    Unit tests for the reconcile_lti_ags_grades management command.
+    """
+    def setUp(self):
+        super().setUp()
+        block_mock = Mock(display_name="consumer", context_id="some-context-id")
+        block_mock.lti_1p3_passport_id = "e9feb139-4e4c-4fb1-96ee-e614f1e04356"
+        models_compat_patcher = patch("lti_consumer.models.compat")
+        self.addCleanup(models_compat_patcher.stop)
+        models_compat_patcher.start().load_enough_xblock.return_value = block_mock
+        compat_patcher = patch("lti_consumer.grades.compat")
+        self.addCleanup(compat_patcher.stop)
+        self.compat_mock = compat_patcher.start()
+        self.compat_mock.get_users_from_external_user_ids.side_effect = lambda user_ids: {
+            user_id: Mock(id=int(user_id)) for user_id in user_ids if user_id != "404"
+        }
+        # The LMS has up to date grades for users 1 and 2, a stale one for user 3 and none for user 4.
+        self.compat_mock.get_module_scores.return_value = {1: (5, 10), 2: (0.4, 2), 3: (1, 10)}
+        self.block_mock = self.compat_mock.load_block_as_user.return_value
+        self.block_mock.has_score = True
+        self.block_mock.is_past_due.return_value = False
+
+        self.location = UsageKey.from_string("block-v1:course+test+2020+type@problem+block@test")
+        lti_config = LtiConfiguration.objects.create(location=self.location, version=LtiConfiguration.LTI_1P3)
+        self.line_item = LtiAgsLineItem.objects.create(
+            lti_configuration=lti_config,
+            resource_id="test",
+            resource_link_id=self.location,
+            label="test label",
+            score_maximum=100,
+        )
+        for user_id, score_given in (("1", 50), ("2", 20), ("3", 30), ("4", 40), ("404", 40), ("5", None)):
+            self.last_score = LtiAgsScore.objects.create(
+                line_item=self.line_item,
+                user_id=user_id,
+                timestamp=timezone.now(),
+                score_given=score_given,
+                score_maximum=100,
+                activity_progress=LtiAgsScore.COMPLETED,
+                grading_progress=LtiAgsScore.FULLY_GRADED if score_given else LtiAgsScore.PENDING,
+            )
+
+    @patch('lti_consumer.management.commands.reconcile_lti_ags_grades.publish_line_item_grades')
+    def test_reconcile_course(self, publish_mock):
+        """
+        Checks that only the mismatched grades are republished, in batches.
+        """
+        out = StringIO()
+
+        call_command(
+            'reconcile_lti_ags_grades', course_id='course-v1:course+test+2020', chunk_size=2, batch_size=1, stdout=out,
+        )
+
+        self.assertEqual(publish_mock.call_args_list, [
+            call(self.line_item.id, ["3"]),
+            call(self.line_item.id, ["4"]),
+        ])
+        self.assertEqual(self.compat_mock.get_users_from_external_user_ids.call_count, 3)
+        self.assertIn('Checked 5 scores, 2 mismatched', out.getvalue())
+        self.assertIn('Done: checked 5 scores, republished 2 mismatched grades.', out.getvalue())
+
+    @patch('lti_consumer.management.commands.reconcile_lti_ags_grades.publish_line_item_grades')
+    def test_reconcile_other_course(self, publish_mock):
+        """
+        Checks that the scores of other courses aren't checked.
+        """
+        out = StringIO()
+
+        call_command('reconcile_lti_ags_grades', course_id='course-v1:course+test+20', stdout=out)
+
+        publish_mock.assert_not_called()
+        self.assertIn('Done: checked 0 scores', out.getvalue())
+
+    @override_settings(LTI_AGS_GRADE_PUBLISH_BACKEND='lti_consumer.grades.CeleryGradePublishBackend')
+    @patch('lti_consumer.grades.CeleryGradePublishBackend.dispatch')
+    def test_reconcile_with_backend(self, dispatch_mock):
+        """
+        Checks that grades are republished through the grade publish backend when one is set.
+        """
+        call_command('reconcile_lti_ags_grades', line_item_id=self.line_item.id, stdout=StringIO())
+
+        dispatch_mock.assert_called_once_with(self.line_item.id, ["3", "4"])
+
+    @patch('lti_consumer.management.commands.reconcile_lti_ags_grades.publish_line_item_grades')
+    def test_dry_run_and_resume(self, publish_mock):
+        """
+        Checks that a dry run doesn't republish grades, and that runs resume after the given score.
+        """
+        out = StringIO()
+        resume_from = LtiAgsScore.objects.get(user_id="3").pk
+
+        call_command(
+            'reconcile_lti_ags_grades', line_item_id=self.line_item.id, resume_from=resume_from, dry_run=True,
+            stdout=out,
+        )
+
+        publish_mock.assert_not_called()
+        self.assertIn('Done: checked 2 scores, found 1 mismatched grades.', out.getvalue())
+
+    @patch('lti_consumer.management.commands.reconcile_lti_ags_grades.publish_line_item_grades')
+    def test_reconcile_past_due(self, publish_mock):
+        """
+        Checks that the grades of past due blocks not accepting late grades aren't reported.
+        """
+        self.block_mock.is_past_due.return_value = True
+        self.block_mock.accept_grades_past_due = False
+        out = StringIO()
+
+        call_command('reconcile_lti_ags_grades', line_item_id=self.line_item.id, stdout=out)
+
+        publish_mock.assert_not_called()
+        self.assertIn('Done: checked 5 scores, republished 0 mismatched grades.', out.getvalue())
+
+    @patch('lti_consumer.management.commands.reconcile_lti_ags_grades.find_mismatched_grades')
+    def test_interrupted(self, find_mock):
+        """
+        Checks that an interrupted run prints the score to resume from.
+        """
+        find_mock.side_effect = [[], KeyboardInterrupt]
+        out = StringIO()
+        first_chunk_end = LtiAgsScore.objects.get(user_id="2").pk
+
+        call_command('reconcile_lti_ags_grades', line_item_id=self.line_item.id, chunk_size=2, stdout=out)
+
+        self.assertIn(f'Resume with --resume-from {first_chunk_end}.', out.getvalue())
+
+    @ddt.data('not a course', 'org/course/run')
+    def test_invalid_course_id(self, course_id):
+        """
+        Checks that invalid and old-style course ids are rejected.
+        """
+        with self.assertRaises(CommandError):
+            call_command('reconcile_lti_ags_grades', course_id=course_id, stdout=StringIO())
@@ -1,20 +1,25 @@
 """
 Unit tests for LTI models.
 """
+import json
 from contextlib import contextmanager
 from datetime import datetime, timedelta, timezone
 from unittest.mock import call, patch
 
 import ddt
+import jwt
 from ccx_keys.locator import CCXBlockUsageLocator
 from Cryptodome.PublicKey import RSA
 from django.core.exceptions import ValidationError
-from edx_django_utils.cache import RequestCache
+from edx_django_utils.cache import RequestCache, TieredCache, get_cache_key
 from opaque_keys.edx.locator import CourseLocator
 
+from lti_consumer.lti_1p3.consumer_cache import consumer_template_cache
 from lti_consumer.lti_xblock import LtiConsumerXBlock
 from lti_consumer.models import (
     CourseAllowPIISharingInLTIFlag,
+    Lti1p3Passport,
+    Lti1p3PregeneratedKey,
     LtiAgsLineItem,
     LtiAgsScore,
     LtiConfiguration,
@@ -116,6 +121,99 @@ class TestLtiConfigurationModel(TestBaseWithPatch):
         self.lti_1p3_config.get_lti_consumer()
         lti_1p3_mock.assert_called()
 
+    def test_get_lti_1p3_consumer_cached(self):
+        """
+        Check that LTI 1.3 consumers are built once, and that each call gets its own clone.
+        """
+        # The first build generates the passport keys, and saving them drops the consumer again.
+        self.lti_1p3_config.get_lti_consumer()
+        first = self.lti_1p3_config.get_lti_consumer()
+        self._load_block_patch.reset_mock()
+
+        with self.assertNumQueries(0):
+            second = self.lti_1p3_config.get_lti_consumer()
+
+        self._load_block_patch.assert_not_called()
+        self.assertIsNot(first, second)
+        self.assertEqual(second.launch_url, first.launch_url)
+        self.assertEqual(second.lti_ags.get_lti_ags_launch_claim(), first.lti_ags.get_lti_ags_launch_claim())
+
+    def test_get_lti_1p3_consumer_cache_invalidated(self):
+        """
+        Check that saving a configuration or its passport rebuilds its consumer.
+        """
+        self.lti_1p3_config_db.get_lti_consumer()
+
+        self.lti_1p3_config_db.lti_1p3_launch_url = 'http://tool.example/new-launch'
+        self.lti_1p3_config_db.save()
+        self.assertEqual(self.lti_1p3_config_db.get_lti_consumer().launch_url, 'http://tool.example/new-launch')
+
+        passport = self.lti_1p3_config_db.lti_1p3_passport
+        passport.lti_1p3_signing_algorithm = 'ES256'
+        passport.save()
+        self.assertEqual(self.lti_1p3_config_db.get_lti_consumer().key_handler.algorithm, 'ES256')
+
+    def test_clean_doesnt_cache_consumer(self):
+        """
+        Check that validating unsaved changes doesn't cache a consumer built from them.
+        """
+        self.lti_1p3_config_db.get_lti_consumer()
+
+        self.lti_1p3_config_db.lti_1p3_launch_url = 'http://tool.example/unsaved-launch'
+        self.lti_1p3_config_db.clean()
+        self.lti_1p3_config_db.refresh_from_db()
+
+        self.assertEqual(self.lti_1p3_config_db.get_lti_consumer().launch_url, '')
+
+    def test_get_lti_1p3_consumer_loads_block_once(self):
+        """
+        Check that building the consumer of a configuration stored on the block loads the block only once.
+        """
+        self.lti_1p3_config.get_lti_consumer(use_cache=False)
+        self._load_block_patch.reset_mock()
+        TieredCache.dangerous_clear_all_tiers()
+
+        self.lti_1p3_config.get_lti_consumer(use_cache=False)
+
+        self._load_block_patch.assert_called_once_with(self.lti_1p3_config.location)
+
+    def test_get_resolved_config_cached(self):
+        """
+        Check that resolved configurations are shared by instances until the configuration is saved.
+        """
+        resolved_config = self.lti_1p3_config.get_resolved_config()
+        self.assertEqual(resolved_config.lti_1p3_launch_url, LAUNCH_URL)
+        self.assertEqual(resolved_config.lti_1p3_redirect_uris, [LAUNCH_URL])
+
+        self.xblock.lti_1p3_launch_url = 'http://tool.example/new-launch'
+        self.assertEqual(
+            LtiConfiguration.objects.get(pk=self.lti_1p3_config.pk).get_resolved_config().lti_1p3_launch_url,
+            LAUNCH_URL,
+        )
+
+        self.lti_1p3_config.save()
+        self.assertEqual(self.lti_1p3_config.get_resolved_config().lti_1p3_launch_url, 'http://tool.example/new-launch')
+
+    def test_get_resolved_config_cached_as_dict(self):
+        """
+        Check that resolved configurations are cached as dicts, and resolved again when they can't be decoded.
+        """
+        cache_key = get_cache_key(
+            app="lti",
+            key="resolved_config",
+            config_id=str(self.lti_1p3_config.config_id),
+            version=consumer_template_cache.get_version_stamp(self.lti_1p3_config.config_id),
+        )
+        resolved_config = self.lti_1p3_config.get_resolved_config()
+        self.assertEqual(TieredCache.get_cached_response(cache_key).value, resolved_config.to_dict())
+
+        TieredCache.set_all_tiers(cache_key, {'version': 0})
+        self._load_block_patch.reset_mock()
+
+        self.assertEqual(self.lti_1p3_config.get_resolved_config(), resolved_config)
+        self._load_block_patch.assert_called_once()
+        self.assertEqual(TieredCache.get_cached_response(cache_key).value, resolved_config.to_dict())
+
     def test_get_lti_1p3_consumer_invalid_config_store(self):
         """
         Check that NotImplementedError is raised when config_store is not a valid value.
@@ -157,7 +255,8 @@ class TestLtiConfigurationModel(TestBaseWithPatch):
             "version": LtiConfiguration.LTI_1P3,
             "lti_1p3_client_id": "test-client",
         }
-        mock_1p3.return_value = "lti_1p3_consumer"
+        # LTI 1.3 consumers are returned as clones of the cached consumer.
+        mock_1p3.return_value.clone.return_value = "lti_1p3_consumer"
         mock_1p1.return_value = "lti_1p1_consumer"
 
         result = self.lti_1p1_external.get_lti_consumer()
@@ -252,8 +351,11 @@ class TestLtiConfigurationModel(TestBaseWithPatch):
         {'config_store': LtiConfiguration.CONFIG_EXTERNAL, 'expected_value': 'external'},
     )
     @ddt.unpack
+    @patch('lti_consumer.models.external_multiple_launch_urls_enabled', return_value=False)
     @patch('lti_consumer.models.get_external_config_from_filter')
-    def test_get_lti_advantage_ags_mode(self, filter_mock, config_store, expected_value):
+    def test_get_lti_advantage_ags_mode(
+        self, filter_mock, _external_multiple_launch_urls_enabled, config_store, expected_value
+    ):
         """
         Check if LTI AGS is properly returned.
         """
@@ -335,8 +437,11 @@ class TestLtiConfigurationModel(TestBaseWithPatch):
         {'config_store': LtiConfiguration.CONFIG_EXTERNAL, 'expected_value': True},
     )
     @ddt.unpack
+    @patch('lti_consumer.models.external_multiple_launch_urls_enabled', return_value=False)
     @patch('lti_consumer.models.get_external_config_from_filter')
-    def test_get_lti_advantage_deep_linking_enabled(self, filter_mock, config_store, expected_value):
+    def test_get_lti_advantage_deep_linking_enabled(
+        self, filter_mock, _external_multiple_launch_urls_enabled, config_store, expected_value
+    ):
         """
         Check if LTI Deep Linking enabled is properly returned.
         """
@@ -353,8 +458,11 @@ class TestLtiConfigurationModel(TestBaseWithPatch):
         {'config_store': LtiConfiguration.CONFIG_EXTERNAL, 'expected_value': 'external'},
     )
     @ddt.unpack
+    @patch('lti_consumer.models.external_multiple_launch_urls_enabled', return_value=False)
     @patch('lti_consumer.models.get_external_config_from_filter')
-    def test_get_lti_advantage_deep_linking_launch_url(self, filter_mock, config_store, expected_value):
+    def test_get_lti_advantage_deep_linking_launch_url(
+        self, filter_mock, _external_multiple_launch_urls_enabled, config_store, expected_value
+    ):
         """
         Check if LTI Deep Linking launch URL is properly returned.
         """
@@ -371,8 +479,11 @@ class TestLtiConfigurationModel(TestBaseWithPatch):
         {'config_store': LtiConfiguration.CONFIG_EXTERNAL, 'expected_value': True},
     )
     @ddt.unpack
+    @patch('lti_consumer.models.external_multiple_launch_urls_enabled', return_value=False)
     @patch('lti_consumer.models.get_external_config_from_filter')
-    def test_get_lti_advantage_nrps_enabled(self, filter_mock, config_store, expected_value):
+    def test_get_lti_advantage_nrps_enabled(
+        self, filter_mock, _external_multiple_launch_urls_enabled, config_store, expected_value
+    ):
         """
         Check if LTI Deep Linking launch URL is properly returned.
         """
@@ -425,6 +536,33 @@ class TestLtiConfigurationModel(TestBaseWithPatch):
         lti_config.refresh_from_db()
         self.assertEqual(regenerated_public_key, public_key)
 
+    def test_key_accessors_dont_write(self):
+        """
+        Checks that reading existing keys doesn't issue any queries or save the passport.
+        """
+        passport = self.lti_1p3_config.lti_1p3_passport
+        # Generate the keys once.
+        _ = passport.lti_1p3_public_jwk
+
+        with patch.object(Lti1p3Passport, 'save') as save_mock, self.assertNumQueries(0):
+            _ = passport.lti_1p3_private_key
+            _ = passport.lti_1p3_private_key_id
+            public_jwk = passport.lti_1p3_public_jwk
+
+        save_mock.assert_not_called()
+        self.assertIs(passport.lti_1p3_public_jwk, public_jwk)
+
+    def test_public_jwk_cache_invalidated(self):
+        """
+        Checks that the parsed public JWK is refreshed when the stored JWK changes.
+        """
+        passport = self.lti_1p3_config.lti_1p3_passport
+        _ = passport.lti_1p3_public_jwk
+
+        passport.lti_1p3_internal_public_jwk = json.dumps({'keys': []})
+
+        self.assertEqual(passport.lti_1p3_public_jwk, {'keys': []})
+
     def test_clean(self):
         self.lti_1p3_config.config_store = self.lti_1p3_config.CONFIG_ON_XBLOCK
         self.lti_1p3_config.location = None
@@ -492,12 +630,14 @@ class TestLtiConfigurationModel(TestBaseWithPatch):
 
         assert self.lti_1p3_config_db.get_lti_1p3_redirect_uris() == expected
 
+    @patch('lti_consumer.models.external_multiple_launch_urls_enabled', return_value=False)
     @patch('lti_consumer.models.choose_lti_1p3_redirect_uris', return_value=None)
     @patch('lti_consumer.models.get_external_config_from_filter')
     def test_get_redirect_uris_with_external_config(
         self,
         get_external_config_from_filter_mock,
         choose_lti_1p3_redirect_uris,
+        _external_multiple_launch_urls_enabled,
     ):
         """
         Test get_redirect_uris with external configuration.
@@ -619,6 +759,125 @@ class TestLtiConfigurationModel(TestBaseWithPatch):
         self.assertEqual(consumer.launch_url, self.xblock.lti_1p3_launch_url)
 
 
+class TestLti1p3PregeneratedKeyModel(TestBaseWithPatch):
+    """
+    Unit tests for the pool of pre-generated LTI 1.3 keys.
+    """
+    def test_fill(self):
+        """
+        Checks that the pool is only filled up to the requested size.
+        """
+        self.assertEqual(Lti1p3PregeneratedKey.fill(2), 2)
+        self.assertEqual(Lti1p3PregeneratedKey.fill(3), 1)
+        self.assertEqual(Lti1p3PregeneratedKey.fill(1), 0)
+        self.assertEqual(Lti1p3PregeneratedKey.objects.count(), 3)
+
+    def test_claim(self):
+        """
+        Checks that claimed keys are removed from the pool, oldest first.
+        """
+        Lti1p3PregeneratedKey.fill(2)
+        oldest = Lti1p3PregeneratedKey.objects.order_by('pk').first()
+
+        claimed = Lti1p3PregeneratedKey.claim()
+
+        self.assertEqual(claimed.private_key_id, oldest.private_key_id)
+        self.assertEqual(Lti1p3PregeneratedKey.objects.count(), 1)
+
+    def test_claim_empty_pool(self):
+        """
+        Checks that nothing is returned when the pool is empty.
+        """
+        self.assertIsNone(Lti1p3PregeneratedKey.claim())
+
+    def test_claim_race(self):
+        """
+        Checks that a key deleted by another process is not returned.
+        """
+        Lti1p3PregeneratedKey.fill(1)
+
+        with patch.object(Lti1p3PregeneratedKey.objects, 'filter') as filter_mock:
+            filter_mock.return_value.delete.return_value = (0, {})
+            self.assertIsNone(Lti1p3PregeneratedKey.claim())
+
+        self.assertEqual(filter_mock.return_value.delete.call_count, Lti1p3PregeneratedKey.CLAIM_ATTEMPTS)
+
+    def test_passport_uses_pool(self):
+        """
+        Checks that new passports take their keys from the pool without generating keys.
+        """
+        Lti1p3PregeneratedKey.fill(1)
+        pregenerated_key = Lti1p3PregeneratedKey.objects.get()
+        passport = Lti1p3Passport.objects.create()
+
+        with patch('lti_consumer.models.RSA.generate') as generate_mock:
+            self.assertEqual(passport.lti_1p3_private_key_id, pregenerated_key.private_key_id)
+            self.assertEqual(passport.lti_1p3_private_key, pregenerated_key.private_key)
+            self.assertEqual(passport.lti_1p3_public_jwk, json.loads(pregenerated_key.public_jwk))
+
+        generate_mock.assert_not_called()
+        self.assertFalse(Lti1p3PregeneratedKey.objects.exists())
+
+        passport.refresh_from_db()
+        self.assertEqual(passport.lti_1p3_internal_private_key_id, pregenerated_key.private_key_id)
+
+    def test_passport_empty_pool(self):
+        """
+        Checks that keys are generated inline when the pool is empty.
+        """
+        passport = Lti1p3Passport.objects.create()
+
+        self.assertTrue(passport.lti_1p3_private_key)
+        self.assertEqual(passport.lti_1p3_public_jwk['keys'][0]['kid'], passport.lti_1p3_private_key_id)
+
+    def test_pool_per_algorithm(self):
+        """
+        Checks that keys are pooled and claimed per signing algorithm.
+        """
+        Lti1p3PregeneratedKey.fill(1, 'ES256')
+
+        self.assertIsNone(Lti1p3PregeneratedKey.claim())
+        self.assertEqual(Lti1p3PregeneratedKey.fill(1), 1)
+        claimed = Lti1p3PregeneratedKey.claim('ES256')
+        self.assertEqual(claimed.algorithm, 'ES256')
+        self.assertEqual(json.loads(claimed.public_jwk)['keys'][0]['kty'], 'EC')
+
+    def test_passport_es256_keys(self):
+        """
+        Checks that ES256 passports get EC keys, and that switching algorithms generates new keys.
+        """
+        passport = Lti1p3Passport.objects.create(lti_1p3_signing_algorithm='ES256')
+
+        self.assertEqual(passport.lti_1p3_public_jwk['keys'][0]['kty'], 'EC')
+        self.assertEqual(passport.lti_1p3_public_jwk['keys'][0]['alg'], 'ES256')
+        ec_key_id = passport.lti_1p3_private_key_id
+
+        passport.lti_1p3_signing_algorithm = 'RS256'
+
+        self.assertEqual(passport.lti_1p3_public_jwk['keys'][0]['kty'], 'RSA')
+        self.assertNotEqual(passport.lti_1p3_private_key_id, ec_key_id)
+        passport.refresh_from_db()
+        self.assertEqual(passport.lti_1p3_signing_algorithm, 'RS256')
+        self.assertIn('RSA', passport.lti_1p3_internal_public_jwk)
+
+    def test_passport_es256_consumer(self):
+        """
+        Checks that consumers of ES256 passports sign access tokens with ES256.
+        """
+        lti_config = LtiConfiguration.objects.create(
+            version=LtiConfiguration.LTI_1P3,
+            config_store=LtiConfiguration.CONFIG_ON_DB,
+            location='block-v1:course+test+2020+type@problem+block@es256',
+            lti_1p3_passport=Lti1p3Passport.objects.create(lti_1p3_signing_algorithm='ES256'),
+        )
+        consumer = lti_config.get_lti_consumer()
+
+        token = consumer.key_handler.encode_and_sign({'test': 'test'})
+
+        self.assertEqual(consumer.key_handler.algorithm, 'ES256')
+        self.assertEqual(jwt.get_unverified_header(token)['alg'], 'ES256')
+
+
 class TestLtiAgsLineItemModel(TestBaseWithPatch):
     """
     Unit tests for LtiAgsLineItem model methods.
@@ -653,7 +912,7 @@ class TestLtiAgsScoreModel(TestBaseWithPatch):
         super().setUp()
 
         # patch things related to LtiAgsScore post_save signal receiver
-        compat_mock = patch("lti_consumer.signals.signals.compat")
+        compat_mock = patch("lti_consumer.grades.compat")
         self.addCleanup(compat_mock.stop)
         self._compat_mock = compat_mock.start()
         self._compat_mock.load_block_as_user.return_value = make_xblock(
@@ -6,9 +6,12 @@ from unittest.mock import Mock, patch
 
 from ddt import data, ddt, unpack
 from django.test import TestCase
+from edx_django_utils.cache import TieredCache
 from opaque_keys.edx.keys import UsageKey
 from openedx_events.content_authoring.data import DuplicatedXBlockData, LibraryBlockData, XBlockData
+from openedx_events.content_authoring.signals import LIBRARY_BLOCK_UPDATED, XBLOCK_PUBLISHED, XBLOCK_UPDATED
 
+from lti_consumer.lti_1p3.consumer_cache import consumer_template_cache
 from lti_consumer.models import LtiAgsLineItem, LtiAgsScore, LtiConfiguration
 from lti_consumer.signals.signals import (
     delete_child_lti_configurations,
@@ -43,7 +46,7 @@ class PublishGradeOnScoreUpdateTest(TestCase):
         self._compat_mock.load_enough_xblock.return_value = self._block_mock
         self._block_mock.lti_1p3_passport_id = "e9feb139-4e4c-4fb1-96ee-e614f1e04356"
 
-        signals_compat_mock = patch("lti_consumer.signals.signals.compat")
+        signals_compat_mock = patch("lti_consumer.grades.compat")
         self.addCleanup(signals_compat_mock.stop)
         self._signals_compat_mock = signals_compat_mock.start()
         self._signals_compat_mock.get_user_from_external_user_id.return_value = Mock()
@@ -473,3 +476,120 @@ class TestDuplicateXblockLtiConfiguration(TestCase):
         """Invalid xblock_info logs error."""
         duplicate_xblock_lti_configuration(xblock_info=None)
         mock_log.error.assert_called_once_with("Received null or incorrect data for event")
+
+
+@ddt
+class TestInvalidateLtiConsumer(TestCase):
+    """
+    Tests for the signal handlers invalidating cached LTI 1.3 consumers.
+    """
+    def setUp(self):
+        super().setUp()
+        TieredCache.dangerous_clear_all_tiers()
+
+        compat_mock = patch("lti_consumer.models.compat")
+        self.addCleanup(compat_mock.stop)
+        # Blocks without a passport, so each configuration gets its own.
+        compat_mock.start().load_enough_xblock.side_effect = lambda location: Mock(
+            lti_1p3_passport_id=None,
+            display_name="consumer",
+            context_id="some-context-id",
+        )
+
+        self.lti_config = LtiConfiguration.objects.create(
+            location="block-v1:course+test+2020+type@problem+block@test",
+            version=LtiConfiguration.LTI_1P3,
+        )
+        self.other_config = LtiConfiguration.objects.create(
+            location="block-v1:course+other+2020+type@problem+block@test",
+            version=LtiConfiguration.LTI_1P3,
+        )
+        self.version_stamp = consumer_template_cache.get_version_stamp(self.lti_config.config_id)
+        self.other_version_stamp = consumer_template_cache.get_version_stamp(self.other_config.config_id)
+
+    def assert_invalidated(self, invalidated=True):
+        """
+        Check whether the cached consumer of `self.lti_config` was invalidated, and that of `self.other_config` wasn't.
+        """
+        version_stamp = consumer_template_cache.get_version_stamp(self.lti_config.config_id)
+        if invalidated:
+            self.assertNotEqual(version_stamp, self.version_stamp)
+        else:
+            self.assertEqual(version_stamp, self.version_stamp)
+        self.assertEqual(
+            consumer_template_cache.get_version_stamp(self.other_config.config_id),
+            self.other_version_stamp,
+        )
+
+    def test_config_saved(self):
+        """
+        Test that saving a configuration invalidates its consumer.
+        """
+        self.lti_config.save()
+
+        self.assert_invalidated()
+
+    def test_passport_saved(self):
+        """
+        Test that saving a passport invalidates the consumers of the configurations using it.
+        """
+        self.lti_config.lti_1p3_passport.save()
+
+        self.assert_invalidated()
+
+    def test_line_item_saved(self):
+        """
+        Test that adding a line item to a configuration invalidates its consumer.
+        """
+        LtiAgsLineItem.objects.create(lti_configuration=self.lti_config, resource_id="test", score_maximum=1)
+
+        self.assert_invalidated()
+
+    @data(
+        (XBLOCK_UPDATED, "xblock_info", XBlockData),
+        (LIBRARY_BLOCK_UPDATED, "library_block", LibraryBlockData),
+    )
+    @unpack
+    def test_block_updated(self, signal, data_name, data_class):
+        """
+        Test that updating a block invalidates the consumer of its configuration.
+        """
+        block_data = Mock(spec=data_class, usage_key=self.lti_config.location)
+
+        signal.send_event(**{data_name: block_data})
+
+        self.assert_invalidated()
+
+    def test_other_block_updated(self):
+        """
+        Test that updating another block of the course doesn't invalidate the consumer.
+        """
+        usage_key = UsageKey.from_string("block-v1:course+test+2020+type@problem+block@other")
+
+        XBLOCK_UPDATED.send_event(xblock_info=XBlockData(usage_key=usage_key, block_type="problem"))
+
+        self.assert_invalidated(False)
+
+    def test_course_published(self):
+        """
+        Test that publishing part of a course invalidates the consumers of every block in the course.
+        """
+        usage_key = UsageKey.from_string("block-v1:course+test+2020+type@vertical+block@unit")
+
+        XBLOCK_PUBLISHED.send_event(xblock_info=XBlockData(usage_key=usage_key, block_type="vertical"))
+
+        self.assert_invalidated()
+
+    def test_library_published(self):
+        """
+        Test that publishing part of a library invalidates the consumers of every block in the library.
+        """
+        self.lti_config.location = "lb:org:lib:lti_consumer:test"
+        self.lti_config.save()
+        self.version_stamp = consumer_template_cache.get_version_stamp(self.lti_config.config_id)
+        LtiConfiguration.objects.filter(pk=self.other_config.pk).update(location="lb:org:other:lti_consumer:test")
+        usage_key = UsageKey.from_string("lb:org:lib:unit:test")
+
+        XBLOCK_PUBLISHED.send_event(xblock_info=XBlockData(usage_key=usage_key, block_type="unit"))
+
+        self.assert_invalidated()
@@ -1,17 +1,27 @@
 """
 Unit tests for lti_consumer.utils module
 """
+import uuid
 from unittest.mock import Mock, patch
 
 import ddt
+from django.test import override_settings
 from django.test.testcases import TestCase
+from edx_django_utils.cache import TieredCache
 from opaque_keys.edx.locator import CourseLocator
 
+from lti_consumer.data import Lti1p3LaunchData, Lti1p3ProctoringLaunchData
 from lti_consumer.lti_1p3.constants import LTI_1P3_CONTEXT_TYPE
 from lti_consumer.utils import (
+    LTI_1P3_MESSAGE_HINT_PREFIX,
     cache_lti_1p3_launch_data,
     choose_lti_1p3_redirect_uris,
+    decode_lti_1p3_message_hint,
+    encode_lti_1p3_message_hint,
+    get_lti_1p3_launch_data_from_message_hint,
+    get_lti_1p3_message_hint,
     external_multiple_launch_urls_enabled,
+    get_cached_lti_1p3_launch_data,
     get_data_from_cache,
     get_lti_1p3_context_types_claim,
     get_lti_1p3_launch_data_cache_key,
@@ -53,6 +63,150 @@ class TestGetLti1p3ContextTypesClaim(TestCase):
             get_lti_1p3_context_types_claim(argument)
 
 
+class TestLti1p3MessageHint(TestCase):
+    """
+    Tests for the lti_message_hint utilities in the utils module.
+    """
+    def setUp(self):
+        super().setUp()
+        TieredCache.dangerous_clear_all_tiers()
+        self.launch_data = Lti1p3LaunchData(
+            user_id="1",
+            user_role="student",
+            config_id=uuid.uuid4(),
+            resource_link_id="block-v1:course+test+2020+type@problem+block@test",
+            name="Fáke Ñame",
+            context_id="course-v1:course+test+2020",
+            context_type=["course_offering"],
+            custom_parameters={"key": "value"},
+        )
+
+    def _get_expected_launch_data(self, launch_data):
+        launch_data.config_id = str(launch_data.config_id)
+        return launch_data
+
+    def test_round_trip(self):
+        """
+        Test that the launch data carried by an encoded hint is decoded back.
+        """
+        hint = encode_lti_1p3_message_hint(self.launch_data)
+
+        self.assertTrue(hint.startswith(LTI_1P3_MESSAGE_HINT_PREFIX))
+        self.assertNotIn("Fáke", hint)
+        self.assertEqual(decode_lti_1p3_message_hint(hint), self._get_expected_launch_data(self.launch_data))
+
+    def test_round_trip_proctoring_launch_data(self):
+        """
+        Test that proctoring launch data is decoded back too.
+        """
+        self.launch_data.message_type = "LtiStartProctoring"
+        self.launch_data.proctoring_launch_data = Lti1p3ProctoringLaunchData(
+            attempt_number=2,
+            start_assessment_url="http://platform.example/start",
+            assessment_control_actions=["pause"],
+        )
+
+        decoded = decode_lti_1p3_message_hint(encode_lti_1p3_message_hint(self.launch_data))
+
+        self.assertEqual(decoded, self._get_expected_launch_data(self.launch_data))
+
+    def test_round_trip_without_user_role(self):
+        """
+        Test that launch data without a user role, as sent by proctoring launches, is decoded back.
+        """
+        self.launch_data.user_role = None
+
+        decoded = decode_lti_1p3_message_hint(encode_lti_1p3_message_hint(self.launch_data))
+
+        self.assertEqual(decoded, self._get_expected_launch_data(self.launch_data))
+
+    def test_tampered_hint(self):
+        """
+        Test that tampered or malformed hints aren't decoded.
+        """
+        hint = encode_lti_1p3_message_hint(self.launch_data)
+        tampered = hint[:-2] + ('AA' if hint[-2:] != 'AA' else 'BB')
+
+        self.assertIsNone(decode_lti_1p3_message_hint(tampered))
+        self.assertIsNone(decode_lti_1p3_message_hint(LTI_1P3_MESSAGE_HINT_PREFIX + '!'))
+
+    def test_expired_hint(self):
+        """
+        Test that expired hints aren't decoded.
+        """
+        with patch('lti_consumer.utils.time.time', return_value=1000):
+            hint = encode_lti_1p3_message_hint(self.launch_data)
+
+        with patch('lti_consumer.utils.time.time', return_value=1000 + 599):
+            self.assertIsNotNone(decode_lti_1p3_message_hint(hint))
+        with patch('lti_consumer.utils.time.time', return_value=1000 + 600):
+            self.assertIsNone(decode_lti_1p3_message_hint(hint))
+
+    def test_secret_key_rotation(self):
+        """
+        Test that hints encrypted with a previous SECRET_KEY are decoded while it's a fallback.
+        """
+        with override_settings(SECRET_KEY='old-secret'):
+            hint = encode_lti_1p3_message_hint(self.launch_data)
+
+        with override_settings(SECRET_KEY='new-secret', SECRET_KEY_FALLBACKS=['old-secret']):
+            self.assertIsNotNone(decode_lti_1p3_message_hint(hint))
+        with override_settings(SECRET_KEY='new-secret', SECRET_KEY_FALLBACKS=[]):
+            self.assertIsNone(decode_lti_1p3_message_hint(hint))
+
+    def test_cached_hint(self):
+        """
+        Test that the launch data is cached by default.
+        """
+        hint = get_lti_1p3_message_hint(self.launch_data)
+
+        self.assertFalse(hint.startswith(LTI_1P3_MESSAGE_HINT_PREFIX))
+        expected_launch_data = self._get_expected_launch_data(self.launch_data)
+        self.assertEqual(get_cached_lti_1p3_launch_data(hint), expected_launch_data)
+        self.assertEqual(get_lti_1p3_launch_data_from_message_hint(hint), expected_launch_data)
+
+    @override_settings(LTI_1P3_STATELESS_MESSAGE_HINT_ENABLED=True)
+    def test_stateless_hint(self):
+        """
+        Test that the launch data isn't cached when stateless message hints are enabled.
+        """
+        hint = get_lti_1p3_message_hint(self.launch_data)
+
+        self.assertTrue(hint.startswith(LTI_1P3_MESSAGE_HINT_PREFIX))
+        self.assertIsNone(get_data_from_cache(get_lti_1p3_launch_data_cache_key(self.launch_data)))
+        self.assertEqual(
+            get_lti_1p3_launch_data_from_message_hint(hint),
+            self._get_expected_launch_data(self.launch_data),
+        )
+
+    @override_settings(LTI_1P3_STATELESS_MESSAGE_HINT_ENABLED=True)
+    def test_stateless_hint_proctoring_launch_cached(self):
+        """
+        Test that proctoring launch data is still cached, since the proctoring views read it from the cache.
+        """
+        self.launch_data.message_type = "LtiStartProctoring"
+        self.launch_data.proctoring_launch_data = Lti1p3ProctoringLaunchData(attempt_number=1)
+
+        hint = get_lti_1p3_message_hint(self.launch_data)
+
+        self.assertEqual(get_cached_lti_1p3_launch_data(hint), self._get_expected_launch_data(self.launch_data))
+
+    def test_cached_hint_without_user_role(self):
+        """
+        Test that cached proctoring launch data without a user role is read back.
+        """
+        self.launch_data.user_role = None
+        self.launch_data.message_type = "LtiStartProctoring"
+        self.launch_data.proctoring_launch_data = Lti1p3ProctoringLaunchData(attempt_number=1)
+
+        hint = cache_lti_1p3_launch_data(self.launch_data)
+
+        self.assertEqual(
+            get_lti_1p3_launch_data_from_message_hint(hint),
+            self._get_expected_launch_data(self.launch_data),
+        )
+
+
 @ddt.ddt
 class TestCacheUtilities(TestCase):
     """
@@ -99,7 +253,11 @@ class TestCacheUtilities(TestCase):
         cache_lti_1p3_launch_data(mock_launch_data)
 
         mock_get_cache_key.assert_called_with(mock_launch_data)
-        mock_set_all_tiers.assert_called_with("launch_data_cache_key", mock_launch_data, django_cache_timeout=600)
+        mock_set_all_tiers.assert_called_with(
+            "launch_data_cache_key",
+            mock_launch_data.to_compact.return_value,
+            django_cache_timeout=600,
+        )
 
     @patch('lti_consumer.utils.TieredCache.get_cached_response')
     @ddt.data(True, False)
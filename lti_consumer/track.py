@@ -1,6 +1,8 @@
 """
 Tracking for analytics events
 """
+import time
+
 from lti_consumer.plugin.compat import get_event_tracker
 
 
@@ -12,3 +14,47 @@ def track_event(event_name, data):
     if tracker:
         event_name = '.'.join(['edx', 'lti', event_name])
         tracker.emit(event_name, data)
+
+
+class PhaseTimer:
+    """
+    Record how long each phase of a request takes, and send the durations with a signal.
+
+    Phases are consecutive: `mark(phase)` records the time elapsed since the
+    previous mark (or since the timer was created) as the duration of `phase`.
+    If the signal has no receivers when the timer is created, nothing is timed
+    or sent, so instrumented code costs next to nothing unless someone listens.
+    """
+    def __init__(self, signal):
+        self.signal = signal
+        self.enabled = signal.has_listeners()
+        self.timings = {}
+        self.data = {}
+        self._last_mark = time.perf_counter() if self.enabled else None
+
+    def mark(self, phase):
+        """
+        Record the time elapsed since the previous mark as the duration of `phase`.
+        """
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.timings[phase] = self.timings.get(phase, 0) + now - self._last_mark
+        self._last_mark = now
+
+    def annotate(self, **data):
+        """
+        Add data to send along with the durations.
+        """
+        if self.enabled:
+            self.data.update(data)
+
+    def send(self, **data):
+        """
+        Send the recorded durations (in seconds, in phase order) and data with the signal.
+
+        Errors raised by receivers are only logged (by `send_robust`), so timing can't break the timed request.
+        """
+        if not self.enabled:
+            return
+        self.signal.send_robust(sender=None, timings=self.timings, **self.data, **data)
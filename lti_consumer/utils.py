@@ -1,13 +1,21 @@
 """
 Utility functions for LTI Consumer block
 """
+import base64
 import copy
+import hashlib
+import hmac
+import json
 import logging
 import re
+import time
+import zlib
 from importlib import import_module
 from urllib.parse import urlencode
 
+from Cryptodome.Cipher import AES
 from django.conf import settings
+from django.utils.encoding import force_bytes
 from edx_django_utils.cache import get_cache_key, TieredCache
 
 from lti_consumer.plugin.compat import (
@@ -16,6 +24,7 @@ from lti_consumer.plugin.compat import (
     get_database_config_waffle_flag,
     get_external_multiple_launch_urls_waffle_flag,
 )
+from lti_consumer.data import Lti1p3LaunchData
 from lti_consumer.lti_1p3.constants import LTI_1P3_CONTEXT_TYPE
 from lti_consumer.lti_1p3.exceptions import InvalidClaimValue, MissingRequiredClaim
 
@@ -24,6 +33,19 @@ log = logging.getLogger(__name__)
 SLUG_CHARACTER_CLASS = '[-a-zA-Z0-9_]'
 EXTERNAL_ID_REGEX = re.compile(rf'^({SLUG_CHARACTER_CLASS}+:{SLUG_CHARACTER_CLASS}+)$')
 
+# Number of seconds tools and the Django cache may reuse a platform public keyset.
+# Can be overridden with the LTI_1P3_PUBLIC_KEYSET_MAX_AGE setting.
+DEFAULT_LTI_1P3_PUBLIC_KEYSET_MAX_AGE = 3600
+
+# Number of seconds launch data is kept for the second leg of an LTI 1.3 launch,
+# whether it's cached or carried by the lti_message_hint.
+# Can be overridden with the LTI_1P3_MESSAGE_HINT_TTL setting.
+DEFAULT_LTI_1P3_MESSAGE_HINT_TTL = 600
+
+# Prefix of lti_message_hint values carrying encrypted launch data, which
+# tells them apart from launch data cache keys.
+LTI_1P3_MESSAGE_HINT_PREFIX = 'lmh1.'
+
 
 def _(text):
     """
@@ -315,12 +337,186 @@ def cache_lti_1p3_launch_data(launch_data):
     """
     launch_data_key = get_lti_1p3_launch_data_cache_key(launch_data)
 
-    # Insert the data into the cache with a 600 second timeout.
-    TieredCache.set_all_tiers(launch_data_key, launch_data, django_cache_timeout=600)
+    TieredCache.set_all_tiers(
+        launch_data_key,
+        launch_data.to_compact(),
+        django_cache_timeout=get_lti_1p3_message_hint_ttl(),
+    )
 
     return launch_data_key
 
 
+def get_cached_lti_1p3_launch_data(launch_data_key):
+    """
+    Return the launch_data cached by `cache_lti_1p3_launch_data` with the cache key, or None if there is none.
+
+    Arguments:
+        launch_data_key: the cache key returned by `cache_lti_1p3_launch_data`
+    """
+    cached_launch_data = get_data_from_cache(launch_data_key)
+    # Launch data pickled before the compact encoding was used.
+    if cached_launch_data is None or isinstance(cached_launch_data, Lti1p3LaunchData):
+        return cached_launch_data
+
+    try:
+        return Lti1p3LaunchData.from_compact(cached_launch_data)
+    except (TypeError, ValueError):
+        log.warning('Unable to decode the launch data cached with the cache key %s.', launch_data_key, exc_info=True)
+        return None
+
+
+def get_lti_1p3_message_hint_ttl():
+    """
+    Return the number of seconds launch data is kept for the second leg of an LTI 1.3 launch.
+    """
+    return getattr(settings, 'LTI_1P3_MESSAGE_HINT_TTL', DEFAULT_LTI_1P3_MESSAGE_HINT_TTL)
+
+
+def _get_lti_1p3_message_hint_keys():
+    """
+    Return the AES keys of stateless lti_message_hint values, derived from SECRET_KEY and its fallbacks.
+
+    The first key is used to encrypt, all of them are tried to decrypt, so rotating SECRET_KEY
+    doesn't break launches in flight.
+    """
+    secrets = [settings.SECRET_KEY, *getattr(settings, 'SECRET_KEY_FALLBACKS', [])]
+    return [
+        hmac.new(force_bytes(secret), b'lti_consumer.lti_message_hint', hashlib.sha256).digest()
+        for secret in secrets
+    ]
+
+
+def encode_lti_1p3_message_hint(launch_data):
+    """
+    Return an lti_message_hint carrying the launch data itself, so the launch gate doesn't need the cache.
+
+    The compact encoding of the launch data is serialized to JSON with an expiration time,
+    compressed and encrypted with AES-GCM, which also authenticates it. It may contain PII, so
+    it isn't only signed.
+
+    Arguments:
+        launch_data (lti_consumer.data.Lti1p3LaunchData): a class containing data necessary for an LTI 1.3 launch
+    """
+    payload = json.dumps(
+        {'exp': int(time.time()) + get_lti_1p3_message_hint_ttl(), 'data': launch_data.to_compact()},
+        separators=(',', ':'),
+    )
+
+    cipher = AES.new(_get_lti_1p3_message_hint_keys()[0], AES.MODE_GCM)
+    ciphertext, tag = cipher.encrypt_and_digest(zlib.compress(payload.encode('utf-8')))
+    token = base64.urlsafe_b64encode(cipher.nonce + tag + ciphertext).rstrip(b'=').decode('ascii')
+    return LTI_1P3_MESSAGE_HINT_PREFIX + token
+
+
+def decode_lti_1p3_message_hint(lti_message_hint):
+    """
+    Return the launch data carried by an lti_message_hint from `encode_lti_1p3_message_hint`.
+
+    Returns None if the hint can't be decrypted, was tampered with or has expired.
+    """
+    token = lti_message_hint[len(LTI_1P3_MESSAGE_HINT_PREFIX):]
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+    except ValueError:
+        return None
+    nonce, tag, ciphertext = raw[:16], raw[16:32], raw[32:]
+
+    for key in _get_lti_1p3_message_hint_keys():
+        try:
+            compressed = AES.new(key, AES.MODE_GCM, nonce=nonce).decrypt_and_verify(ciphertext, tag)
+            break
+        except ValueError:
+            continue
+    else:
+        return None
+
+    payload = json.loads(zlib.decompress(compressed))
+    if payload['exp'] <= time.time():
+        return None
+
+    try:
+        return Lti1p3LaunchData.from_compact(payload['data'])
+    except (TypeError, ValueError):
+        log.warning('Unable to decode the launch data of an lti_message_hint.', exc_info=True)
+        return None
+
+
+def get_lti_1p3_message_hint(launch_data):
+    """
+    Return the lti_message_hint used to retrieve the launch data in the second leg of an LTI 1.3 launch.
+
+    When the LTI_1P3_STATELESS_MESSAGE_HINT_ENABLED setting is on, the hint carries the launch data
+    itself. Otherwise, and for proctoring launches (the proctoring views read their launch data from
+    the cache), the launch data is cached and the hint is its cache key.
+
+    Arguments:
+        launch_data (lti_consumer.data.Lti1p3LaunchData): a class containing data necessary for an LTI 1.3 launch
+    """
+    # .. toggle_name: LTI_1P3_STATELESS_MESSAGE_HINT_ENABLED
+    # .. toggle_implementation: DjangoSetting
+    # .. toggle_default: False
+    # .. toggle_description: Makes the lti_message_hint of LTI 1.3 launches carry the launch data, compressed and
+    #    encrypted with keys derived from SECRET_KEY, instead of a key of the launch data in the cache.
+    # .. toggle_use_cases: open_edx
+    # .. toggle_creation_date: 2026-10-17
+    # .. toggle_tickets: None
+    # .. toggle_warning: Rotating SECRET_KEY without keeping the old one in SECRET_KEY_FALLBACKS invalidates the
+    #    hints of launches in progress.
+    if getattr(settings, 'LTI_1P3_STATELESS_MESSAGE_HINT_ENABLED', False) and not launch_data.proctoring_launch_data:
+        return encode_lti_1p3_message_hint(launch_data)
+    return cache_lti_1p3_launch_data(launch_data)
+
+
+def get_lti_1p3_launch_data_from_message_hint(lti_message_hint):
+    """
+    Return the launch data of an lti_message_hint from `get_lti_1p3_message_hint`, or None if it's missing.
+    """
+    if lti_message_hint.startswith(LTI_1P3_MESSAGE_HINT_PREFIX):
+        return decode_lti_1p3_message_hint(lti_message_hint)
+    return get_cached_lti_1p3_launch_data(lti_message_hint)
+
+
+def get_lti_1p3_public_keyset_max_age():
+    """
+    Return the number of seconds a platform public keyset can be cached for.
+    """
+    return getattr(settings, 'LTI_1P3_PUBLIC_KEYSET_MAX_AGE', DEFAULT_LTI_1P3_PUBLIC_KEYSET_MAX_AGE)
+
+
+def get_lti_1p3_public_keyset_cache_key(passport_id):
+    """
+    Return the cache key of the precomputed public keyset of a Lti1p3Passport.
+
+    Arguments:
+        passport_id (UUID): passport_id of the Lti1p3Passport
+    """
+    return get_cache_key(app="lti", key="public_keyset", passport_id=str(passport_id))
+
+
+def build_lti_1p3_public_keyset(public_jwk):
+    """
+    Serialize a public JWKS and return a (body, ETag) tuple.
+
+    The ETag is a strong validator derived from the serialized body, so it only
+    changes when the keys change.
+
+    Arguments:
+        public_jwk (dict): the public JWKS
+    """
+    body = json.dumps(public_jwk).encode('utf-8')
+    return body, f'"{hashlib.sha256(body).hexdigest()}"'
+
+
+def invalidate_lti_1p3_public_keyset_cache(passport_id):
+    """
+    Drop the precomputed public keyset of a Lti1p3Passport from the cache.
+
+    Arguments:
+        passport_id (UUID): passport_id of the Lti1p3Passport
+    """
+    TieredCache.delete_all_tiers(get_lti_1p3_public_keyset_cache_key(passport_id))
+
+
 def get_data_from_cache(cache_key):
     """
     Return data stored in the cache with the cache key, if it exists. If not, return none.